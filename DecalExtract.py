@@ -1,19 +1,32 @@
 import os
+import sys
+import csv
 import json
 import re
 import glob
 import time
+import queue
+import asyncio
 import datetime
+import hashlib
+import ast
+import inspect
+import bisect
+import sqlite3
+import functools
+import contextlib
+import threading
 import shutil
+import argparse
 import requests
 import getpass
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import NamedTuple
 
 import cv2
 import fitz       # PyMuPDF
 import numpy as np
-import pandas as pd
-import pdfplumber
 import DecalExtract_helper as helper
 from DecalExtract_helper import get_valid_api_key, fetch_pdf_via_api
 
@@ -22,11 +35,32 @@ from tkinter import filedialog
 # ── Configuration ──────────────────────────────────────────────────────────────
 SITE_ID         = 733
 DOWNLOAD_TIMEOUT= 8     # seconds to wait for PDF generation
-DPI             = 300
+DPI             = 300   # output resolution of the saved crops
+DETECT_DPI      = 72    # thumbnail resolution the crop detectors run on
 THICKNESS_IN    = 0.004
 MATERIAL_DENSITY= 0.035
 FACTOR          = 166
-STEP_DELAY      = 5 #whenever you need a short delay insert: time.sleep(STEP_DELAY)
+VECTOR_FIRST    = True  # try the PDF drawing list before raster detection
+VECTOR_SIZE_TOL = 0.20  # vector crop w/h vs the parsed size in points: max Σ relative diff
+PYRAMID_LEVELS  = 2     # coarse-to-fine levels for corner template matching
+MULTI_DECAL     = False # also crop every same-size decal on the sheet (--multi)
+MULTI_SIZE_TOL  = 0.20  # sibling decal w/h vs the primary crop: max Σ relative diff
+MULTI_MIN_FILL  = 0.80  # a raster sibling's own box spans ≥ this share of the primary's w and h
+RECOLOR_TOL     = 40    # gray ≤ this counts as ink when recolouring a crop
+EXPORT_LAYERS   = False # also write one transparent PNG per COLOR_MAP colour (--layers)
+
+# ── Pipeline concurrency ───────────────────────────────────────────────────────
+FETCH_MODE      = "threads"  # "threads", or "async" (aiohttp batch fetcher)
+FETCH_WORKERS   = 4     # threads / async slots downloading PDFs (network bound)
+RENDER_WORKERS  = max(1, (os.cpu_count() or 2) - 1)  # processes rendering + cropping
+MAX_PENDING_PDFS= 8     # backpressure: at most this many PDFs in flight (held in memory) at once
+KEEP_PDFS       = False # also write each download to temp_pdfs/ and keep it (--keep-pdfs)
+CUBISCAN_FLUSH_ROWS = 25  # flush cubiscan.csv to disk every N records
+
+# ── Crop results cache ─────────────────────────────────────────────────────────
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_PATH    = os.path.join(helper.PDF_CACHE_DIR, "results.sqlite")
+RESULT_CACHE_TTL     = 90 * 24 * 3600   # entries unused this long are evicted
 
 # Map keyword labels to BGR fill colors
 COLOR_MAP = {
@@ -41,26 +75,453 @@ COLOR_MAP = {
 
 def render_pdf_color_page(pdf_path, dpi=300):
     """Load the first page of PDF at `dpi` into a BGR numpy image."""
-    doc = fitz.open(pdf_path)
-    page = doc.load_page(0)
-    scale = dpi / 72
-    mat = fitz.Matrix(scale, scale)
-    pix = page.get_pixmap(matrix=mat, alpha=False)
+    if isinstance(pdf_path, DecalDocument):
+        return pdf_path.image if dpi == pdf_path.dpi else pdf_path.render(dpi)
+    with DecalDocument(pdf_path, dpi=dpi) as doc:
+        return doc.image
+
+def _pixmap_to_bgr(pix):
     arr = np.frombuffer(pix.samples, dtype=np.uint8)
     img = arr.reshape(pix.height, pix.width, pix.n)
     if pix.n == 4:
         return cv2.cvtColor(img, cv2.COLOR_RGBA2BGR)
     else:
         return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-        
+
+class WordIndex:
+    """
+    Spatial index over one page's words (DecalDocument.words dicts), built once
+    so label, dimension-line and title-block questions don't rescan the page.
+
+    - words   : all words sorted top-to-bottom (then left-to-right)
+    - postings: normalised text (stripped, lowercase) → its words sorted by
+                `bottom`, with a parallel list of bottoms for bisecting
+    """
+
+    def __init__(self, words):
+        self.words = sorted(words, key=lambda w: (w["top"], w["x0"]))
+        self.tops  = [w["top"] for w in self.words]
+        self.postings = {}
+        for w in sorted(self.words, key=lambda w: w["bottom"]):
+            hits = self.postings.setdefault(w["text"].strip().lower(), ([], []))
+            hits[0].append(w)
+            hits[1].append(w["bottom"])
+
+    def lookup(self, text):
+        """Every word whose normalised text is `text`, by bottom."""
+        hit = self.postings.get(text.lower())
+        return list(hit[0]) if hit else []
+
+    def nearest_above(self, keywords, y=None):
+        """
+        The word among `keywords` whose bottom is <= y and closest to it (the
+        lowest one on the page when y is None), or None.  On equal bottoms the
+        first word in reading order wins.
+        """
+        best = None
+        for key in keywords:
+            hit = self.postings.get(key.lower())
+            if not hit:
+                continue
+            words, bottoms = hit
+            i = len(bottoms) if y is None else bisect.bisect_right(bottoms, y)
+            if i == 0:
+                continue
+            # step back to the first word on that bottom line
+            w = words[bisect.bisect_left(bottoms, bottoms[i - 1])]
+            if best is None or (w["bottom"], -w["top"], -w["x0"]) > \
+                    (best["bottom"], -best["top"], -best["x0"]):
+                best = w
+        return best
+
+    def band(self, y0, y1):
+        """Words whose top lies in [y0, y1), top-to-bottom (e.g. a title block)."""
+        return self.words[bisect.bisect_left(self.tops, y0):bisect.bisect_left(self.tops, y1)]
+
+    def first(self, match, y0=0):
+        """Topmost word at or below `y0` for which match(text) is true, or None."""
+        for w in self.words[bisect.bisect_left(self.tops, y0):]:
+            if match(w["text"]):
+                return w
+        return None
+
+class DecalDocument:
+    """
+    A part's drawing (a file path, or the PDF's bytes), opened once.  The
+    first page's raster, text and word boxes are built on first use and
+    cached, so rendering, dimension parsing and label lookup all share one
+    PyMuPDF handle (pdfplumber is not used).
+
+    - image    : BGR render of page 0 at `dpi` (DETECT_DPI in the crop stage)
+    - analysis : PageAnalysis of `image`, scaled relative to DPI
+    - text     : page.get_text() plain text
+    - words    : page.get_text("words") as pdfplumber-style dicts
+                 {text, x0, x1, top, bottom} in PDF points, origin top-left
+    - word_index : WordIndex over `words` for label / dimension-line lookups
+    - drawings : page.get_drawings() vector paths
+    - image_boxes : bboxes (PDF points) of raster images placed on the page
+    """
+
+    def __init__(self, pdf_path, dpi=DPI):
+        self.path = pdf_path if isinstance(pdf_path, str) else None
+        self.dpi  = dpi
+        if self.path is None:           # PDF bytes straight from the download
+            self.doc = fitz.open(stream=pdf_path, filetype="pdf")
+        else:
+            self.doc = fitz.open(pdf_path)
+        self.page = self.doc.load_page(0)
+
+    def close(self):
+        self.doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def to_points(self, rect):
+        """(x0, y0, x1, y1) in `image` pixels → PDF points."""
+        k = 72 / self.dpi
+        return tuple(v * k for v in rect)
+
+    def render(self, dpi, clip=None):
+        """Render page 0 at `dpi` (uncached), optionally only the `clip`
+        rectangle (x0, y0, x1, y1) in PDF points."""
+        scale = dpi / 72
+        if clip is not None:
+            clip = fitz.Rect(clip) & self.page.rect
+        pix = self.page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, alpha=False)
+        return _pixmap_to_bgr(pix)
+
+    @functools.cached_property
+    def image(self):
+        return self.render(self.dpi)
+
+    @functools.cached_property
+    def analysis(self):
+        return PageAnalysis(self.image, scale=self.dpi / DPI)
+
+    @functools.cached_property
+    def text(self):
+        return self.page.get_text() or ""
+
+    @functools.cached_property
+    def words(self):
+        return [
+            {"text": w[4], "x0": w[0], "top": w[1], "x1": w[2], "bottom": w[3]}
+            for w in self.page.get_text("words")
+        ]
+
+    @functools.cached_property
+    def word_index(self):
+        return WordIndex(self.words)
+
+    @functools.cached_property
+    def drawings(self):
+        return self.page.get_drawings()
+
+    @functools.cached_property
+    def image_boxes(self):
+        return [fitz.Rect(info["bbox"]) for info in self.page.get_image_info()]
+
+@contextlib.contextmanager
+def open_document(src, dpi=DPI):
+    """Yield `src` if it is already a DecalDocument, else open (and close) it."""
+    if isinstance(src, DecalDocument):
+        yield src
+    else:
+        with DecalDocument(src, dpi=dpi) as doc:
+            yield doc
+
+def _bracket_corner(path, max_len=72):
+    """
+    If `path` is a crop-mark bracket — two short perpendicular lines sharing an
+    endpoint — return that shared corner as a fitz.Point, else None.
+    """
+    lines = [it for it in path["items"] if it[0] == "l"]
+    if len(lines) != 2 or len(path["items"]) != 2:
+        return None
+    (_, a0, a1), (_, b0, b1) = lines
+    for p, q in ((a0, a1), (a1, a0)):
+        for r, t in ((b0, b1), (b1, b0)):
+            if abs(p.x - r.x) > 0.5 or abs(p.y - r.y) > 0.5:
+                continue
+            va, vb = q - p, t - r
+            horiz_a = abs(va.y) < 0.5 and abs(va.x) > 0.5
+            vert_a  = abs(va.x) < 0.5 and abs(va.y) > 0.5
+            horiz_b = abs(vb.y) < 0.5 and abs(vb.x) > 0.5
+            vert_b  = abs(vb.x) < 0.5 and abs(vb.y) > 0.5
+            if not ((horiz_a and vert_b) or (vert_a and horiz_b)):
+                return None
+            if abs(va) > max_len or abs(vb) > max_len:
+                return None
+            return p
+    return None
+
+def detect_vector_crop(doc, expected_ar=None, target_wh_pt=None,
+                       ar_tol=0.10, min_side_pt=18, max_page_frac=0.80,
+                       size_tol=VECTOR_SIZE_TOL):
+    """
+    Find the decal rectangle from the PDF's own vector content, without
+    rendering anything.  Candidates, all in PDF points:
+      1) border rectangles: 're' items and closed multi-segment paths (rounded
+         borders), padded by half their stroke width
+      2) crop-mark brackets: if ≥4 are found, the box spanned by their corners
+      3) placed raster images (decal artwork embedded as a picture)
+    Rectangles smaller than `min_side_pt` or covering more than `max_page_frac`
+    of the page (sheet frames) are ignored.
+
+    Without a parsed aspect ratio only the bracket box is trusted.  Otherwise
+    candidates must match `expected_ar` within `ar_tol` and, when
+    `target_wh_pt` (width, height) is known, be within `size_tol` of it
+    (Σ relative diff, the size term refine_crop_rect minimises); the closest
+    wins, or the largest if no size is known.  A rectangle of the right shape
+    but the wrong size is not the decal, so none left → None.
+    Returns (x0, y0, x1, y1) in points, or None → use the raster detectors.
+    """
+    borders, bracket_box = _vector_rects(doc, min_side_pt, max_page_frac)
+
+    if not expected_ar:
+        return tuple(bracket_box) if bracket_box is not None else None
+
+    cands = borders + ([bracket_box] if bracket_box is not None else [])
+    cands = [r for r in cands
+             if abs(r.width / r.height - expected_ar) / expected_ar <= ar_tol]
+    if not cands:
+        return None
+
+    if target_wh_pt:
+        tw, th = target_wh_pt
+        size_diff = {id(r): abs(r.width - tw) / tw + abs(r.height - th) / th for r in cands}
+        sized = [r for r in cands if size_diff[id(r)] <= size_tol]
+        if not sized:
+            print(f"   · Vector rects match the aspect ratio but not the parsed size "
+                  f"({tw:.0f}×{th:.0f} pt ±{size_tol:.0%}) → raster detection")
+            return None
+        best = min(sized, key=lambda r: size_diff[id(r)])
+    else:
+        best = max(cands, key=lambda r: abs(r))
+    return tuple(best)
+
+def _vector_rects(doc, min_side_pt=18, max_page_frac=0.80):
+    """
+    Usable vector rectangles of page 0 (points): border rects / closed paths
+    and placed images, plus the crop-mark bracket box (or None).
+    """
+    page_area = abs(doc.page.rect)
+
+    def _usable(r):
+        return (r.width >= min_side_pt and r.height >= min_side_pt
+                and abs(r) <= page_area * max_page_frac)
+
+    borders, corners = [], []
+    for path in doc.drawings:
+        corner = _bracket_corner(path)
+        if corner is not None:
+            corners.append(corner)
+            continue
+        half = (path.get("width") or 0) / 2
+        rects = [fitz.Rect(it[1]) for it in path["items"] if it[0] == "re"]
+        rects += [it[1].rect for it in path["items"] if it[0] == "qu"]
+        if not rects and path.get("closePath") and len(path["items"]) >= 4:
+            rects.append(fitz.Rect(path["rect"]))
+        for r in rects:
+            r = fitz.Rect(r.x0 - half, r.y0 - half, r.x1 + half, r.y1 + half)
+            if _usable(r):
+                borders.append(r)
+
+    bracket_box = None
+    if len(corners) >= 4:
+        bracket_box = fitz.Rect(min(c.x for c in corners), min(c.y for c in corners),
+                                max(c.x for c in corners), max(c.y for c in corners))
+        if not _usable(bracket_box):
+            bracket_box = None
+
+    return borders + [r for r in doc.image_boxes if _usable(r)], bracket_box
+
+class PageAnalysis:
+    """
+    Shared ink analysis of one rendered page.  Every crop detector needs the
+    same gray → threshold(250) → ink-blob pass; this builds each piece once,
+    on first use, and every detector accepts it in place of an image.
+
+    - color      : BGR page (None when built from a gray frame)
+    - gray       : grayscale page
+    - thresh     : inverse-threshold mask (ink = 255, background = 0)
+    - ink        : same mask as 0/1 uint8, ready for summing
+    - filled     : `thresh` with enclosed holes filled, so each blob is solid
+    - components : (labels, stats, centroids) of cv2.connectedComponentsWithStats
+                   on `filled` — one call, background row dropped
+    - boxes      : (N,4) int array of blob bounding rects (x, y, w, h)
+    - areas      : (N,) float array of the cv2.contourArea of each blob's outline
+    - centroids  : (N,2) float array of blob centroids (x, y)
+
+    Filling the holes first makes the blobs exactly the regions a
+    findContours(RETR_EXTERNAL) pass outlines: marks nested inside a frame
+    belong to the frame.  Areas stay contourArea (enclosed pixels less the
+    half-pixel rim) rather than the component pixel counts, which weigh thin
+    strokes more heavily and would change which blob is the largest.  They
+    are counted, not traced: the outline runs through pixel centres, so it
+    encloses every 2×2 cell of blob pixels whole and every cell with three
+    of them by half; the component pixel counts less a correction summed
+    over the cells on each blob's rim (one bincount) give exactly that.
+    Only blob_perimeters() traces outlines, for the blobs it is asked about.
+
+    Detector pixel parameters (min_area, tol, pad, …) are tuned at DPI.  When
+    the page is a thumbnail, `scale` = render dpi / DPI and detectors convert
+    their parameters through px() / area_px().
+    """
+    INK_THRESH = 250
+
+    def __init__(self, img, scale=1.0):
+        if img.ndim == 2:
+            self.color = None
+            self.__dict__['gray'] = img
+        else:
+            self.color = img
+        self.shape = img.shape[:2]
+        self.scale = scale
+
+    def px(self, v):
+        """A length in DPI pixels → pixels on this page (at least 1)."""
+        return max(1, int(round(v * self.scale)))
+
+    def area_px(self, a):
+        """An area in DPI pixels² → pixels² on this page."""
+        return a * self.scale * self.scale
+
+    @functools.cached_property
+    def gray(self):
+        return cv2.cvtColor(self.color, cv2.COLOR_BGR2GRAY)
+
+    @functools.cached_property
+    def bgr(self):
+        """Color page for debug drawing, even when built from gray."""
+        if self.color is not None:
+            return self.color
+        return cv2.cvtColor(self.gray, cv2.COLOR_GRAY2BGR)
+
+    @functools.cached_property
+    def thresh(self):
+        _, th = cv2.threshold(self.gray, self.INK_THRESH, 255, cv2.THRESH_BINARY_INV)
+        return th
+
+    @functools.cached_property
+    def ink(self):
+        return (self.thresh > 0).astype(np.uint8)
+
+    @functools.cached_property
+    def ink_integral(self):
+        """(H+1, W+1) summed-area table of `ink`: any box's ink count in O(1)."""
+        return cv2.integral(self.ink, sdepth=cv2.CV_32S)
+
+    @functools.cached_property
+    def filled(self):
+        # flood the outside background (4-connected, as findContours sees it)
+        # from a 1px frame; whatever background is left is enclosed by ink
+        bg = cv2.copyMakeBorder(cv2.bitwise_not(self.thresh), 1, 1, 1, 1,
+                                cv2.BORDER_CONSTANT, value=255)
+        cv2.floodFill(bg, None, (0, 0), 0)
+        return cv2.bitwise_or(self.thresh, bg[1:-1, 1:-1])
+
+    @functools.cached_property
+    def components(self):
+        _, labels, stats, centroids = cv2.connectedComponentsWithStats(
+            self.filled, connectivity=8, ltype=cv2.CV_32S)
+        return labels, stats[1:], centroids[1:]
+
+    @property
+    def n_blobs(self):
+        return len(self.components[1])
+
+    @functools.cached_property
+    def boxes(self):
+        return self.components[1][:, :4].astype(np.int64)
+
+    @functools.cached_property
+    def areas(self):
+        # Every pixel is a corner of four 2×2 cells, so with k blob corners per
+        # cell, pixels = Σ k/4 while the outline encloses Σ w(k), w = 0, 0, 0,
+        # ½, 1.  Their difference, min(k, 4 - k) / 4 per cell, is zero away
+        # from the blob's rim: correct the CC_STAT_AREA counts by the rim only.
+        H, W = self.shape
+        _, f = cv2.threshold(self.filled, 0, 1, cv2.THRESH_BINARY)
+        f = cv2.copyMakeBorder(f, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+        pairs = cv2.add(f[:, :-1], f[:, 1:])
+        k = cv2.add(pairs[:-1], pairs[1:])            # (H+1, W+1) cells
+        idx = np.flatnonzero((k > 0) & (k < 4))
+        ys, xs = np.divmod(idx, W + 1)
+        # the cell's corners are pixels (ys-1 … ys, xs-1 … xs); any set ones
+        # are 8-adjacent, so they share one label, which the max picks out
+        y0, y1 = np.maximum(ys - 1, 0), np.minimum(ys, H - 1)
+        x0, x1 = np.maximum(xs - 1, 0), np.minimum(xs, W - 1)
+        labels = self.components[0]
+        cell_label = np.maximum(np.maximum(labels[y0, x0], labels[y0, x1]),
+                                np.maximum(labels[y1, x0], labels[y1, x1]))
+        kk = k.ravel()[idx]
+        rim = np.bincount(cell_label, weights=np.minimum(kk, 4 - kk),
+                          minlength=self.n_blobs + 1)[1:]
+        return self.components[1][:, cv2.CC_STAT_AREA] - rim / 4
+
+    @functools.cached_property
+    def centroids(self):
+        return self.components[2]
+
+    def blob_contour(self, i):
+        """Outer outline of blob `i`, traced on its own label mask on first use."""
+        cache = self.__dict__.setdefault('_contours', {})
+        c = cache.get(i)
+        if c is None:
+            x, y, w, h = self.boxes[i].tolist()
+            mask = (self.components[0][y:y + h, x:x + w] == i + 1).astype(np.uint8)
+            mask = cv2.copyMakeBorder(mask, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+            cnts, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                       offset=(x - 1, y - 1))
+            c = cache[i] = max(cnts, key=len)   # one component → one outline
+        return c
+
+    def blob_perimeters(self, idx):
+        """Closed outline length (cv2.arcLength) of each blob in `idx`."""
+        return np.array([cv2.arcLength(self.blob_contour(i), True)
+                         for i in np.asarray(idx).tolist()], dtype=np.float64)
+
+    @functools.cached_property
+    def quadrants(self):
+        """Corner-search ROIs (x1, y1, x2, y2) keyed by template quad name."""
+        H, W = self.shape
+        return {
+            'top_left':     (0,     0,    W//2, H//2),
+            'top_right':    (W//2,  0,    W,    H//2),
+            'bottom_left':  (0,     H//2, W//2, H),
+            'bottom_right': (W//2,  H//2, W,    H),
+        }
+
+    def quadrant_edges(self, quad, levels=PYRAMID_LEVELS):
+        """
+        Canny edges of one quadrant as a pyramid [full, ½, ¼, …], computed once
+        per page and shared by every template set.
+        """
+        cache = self.__dict__.setdefault('_quad_edges', {})
+        pyr = cache.get(quad)
+        if pyr is None or len(pyr) <= levels:
+            x1, y1, x2, y2 = self.quadrants[quad]
+            pyr = build_pyramid(cv2.Canny(self.gray[y1:y2, x1:x2], 50, 150), levels)
+            cache[quad] = pyr
+        return pyr
+
+def as_page(img):
+    """Accept either a PageAnalysis or a raw BGR/gray image."""
+    return img if isinstance(img, PageAnalysis) else PageAnalysis(img)
+
 def find_union_of_ink_contours(img_color, min_area=500, pad_pct=0.05, dbg_dir=None, dbg_name=None):
     """
-    Instrumented “union of all ink” fallback.  Detect every non-white contour ≥ min_area,
-    print out its area and bounding box, then union them all and pad by pad_pct.
+    Instrumented “union of all ink” fallback.  Take every ink blob ≥ min_area,
+    report how many were kept, then union them all and pad by pad_pct.
 
     Parameters:
-    - img_color : np.ndarray (BGR) of the full-page image
-    - min_area   : int  → discard any contour whose area < this (default 500)
+    - img_color : np.ndarray (BGR) of the full-page image, or its PageAnalysis
+    - min_area   : int  → discard any blob whose area < this (default 500)
     - pad_pct    : float→ pad the final union-outwards by pad_pct * (width/height)
     - dbg_dir    : str  → (optional) path to your debugging folder (e.g. 'debugging')
     - dbg_name   : str  → (optional) base filename for the debug image (e.g. 'part1234')
@@ -69,50 +530,30 @@ def find_union_of_ink_contours(img_color, min_area=500, pad_pct=0.05, dbg_dir=No
     - (x0p, y0p, x1p, y1p) or None
     """
 
-    import cv2
-    import numpy as np
-    import os
-
-    # 0) Prepare gray + threshold mask (inverse: ink = white=255, background=0)
-    gray = cv2.cvtColor(img_color, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
+    # 0-1) Shared ink analysis (inverse: ink = white=255, background=0)
+    page = as_page(img_color)
+    min_area = page.area_px(min_area)
+    total = page.n_blobs
 
-    # 1) Find all external contours on that mask
-    cnts, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    total_cnts = len(cnts)
-    print(f"      · [DEBUG] find_union_of_ink_contours: found {total_cnts} total contours")
-
-    if not cnts:
-        print("         → No contours found at all.")
+    if not total:
+        print("      · [DEBUG] find_union_of_ink_contours: no ink blobs found at all.")
         return None
 
-    # 2) Keep only contours whose area >= min_area
-    big_boxes = []
-    for idx, c in enumerate(cnts):
-        area = cv2.contourArea(c)
-        x, y, w, h = cv2.boundingRect(c)
-
-        print(f"         → Contour #{idx}: area={area:.0f}, bbox=({x},{y},{w},{h})")
-        if area < min_area:
-            print(f"            (discarded, area < {min_area})")
-            continue
-
-        print(f"            (accepted)")
-        big_boxes.append((x, y, w, h))
+    # 2) Keep only blobs whose area >= min_area
+    big_boxes = page.boxes[page.areas >= min_area]
+    print(f"      · [DEBUG] find_union_of_ink_contours: {len(big_boxes)} of {total} "
+          f"blobs ≥ min_area({min_area:.0f})")
 
-    if not big_boxes:
-        print(f"      · [DEBUG] No contours ≥ min_area({min_area}) → return None")
+    if not len(big_boxes):
         return None
 
     # 3) Union all those bounding rects into one big box
-    x0 = min(box[0] for box in big_boxes)
-    y0 = min(box[1] for box in big_boxes)
-    x1 = max(box[0] + box[2] for box in big_boxes)
-    y1 = max(box[1] + box[3] for box in big_boxes)
+    x0, y0 = big_boxes[:, :2].min(axis=0).tolist()
+    x1, y1 = (big_boxes[:, :2] + big_boxes[:, 2:]).max(axis=0).tolist()
     print(f"      · [DEBUG] Union of accepted boxes = ({x0}, {y0}, {x1}, {y1}) before padding")
 
     # 4) Pad that union OUTWARDS by pad_pct in each direction
-    img_h, img_w = img_color.shape[:2]
+    img_h, img_w = page.shape
     rect_w = x1 - x0
     rect_h = y1 - y0
     pad_x = int(rect_w * pad_pct)
@@ -132,9 +573,9 @@ def find_union_of_ink_contours(img_color, min_area=500, pad_pct=0.05, dbg_dir=No
     #    and the final padded union in RED.  Uncomment if you want to save it.
     if dbg_dir and dbg_name:
         try:
-            debug_vis = img_color.copy()
+            debug_vis = page.bgr.copy()
             # draw each accepted box in GREEN:
-            for (bx, by, bw, bh) in big_boxes:
+            for (bx, by, bw, bh) in big_boxes.tolist():
                 cv2.rectangle(debug_vis,
                               (bx, by),
                               (bx + bw, by + bh),
@@ -163,58 +604,352 @@ def extract_color_label(pdf_path):
     # TODO: open pdfplumber, search for the crop-band label and return lowercase key
     return 'green'
     
-def load_template_sets(root='templates'):
+class TemplateSet(NamedTuple):
+    """One set of corner-mark templates: edge maps, crop-corner offsets and
+    each edge map's coarse-to-fine pyramid, all keyed by quad name."""
+    templates: dict
+    offsets:   dict
+    pyramids:  dict
+
+def build_pyramid(edges, levels=PYRAMID_LEVELS):
+    """[edges, pyrDown(edges), …] — `levels` extra halvings."""
+    pyr = [edges]
+    for _ in range(levels):
+        h, w = pyr[-1].shape
+        if min(h, w) < 2:
+            break
+        pyr.append(cv2.pyrDown(pyr[-1]))
+    return pyr
+
+MIN_PYRAMID_TPL = 8     # never match a template smaller than this (px) at a coarse level
+REFINE_MARGIN   = 3     # px searched around the up-scaled coarse hit at each finer level
+COARSE_PEAKS    = 3     # coarse-level hits carried down to full resolution
+
+def _refine_match(roi_pyr, tpl_pyr, lvl, loc):
+    """Walk one coarse hit at `lvl` down to level 0, re-matching a small window each step."""
+    val = None
+    for lvl in range(lvl - 1, -1, -1):
+        roi, tpl = roi_pyr[lvl], tpl_pyr[lvl]
+        th, tw = tpl.shape
+        rh, rw = roi.shape
+        cx, cy = loc[0] * 2, loc[1] * 2
+        sx0 = max(0, min(cx - REFINE_MARGIN, rw - tw))
+        sy0 = max(0, min(cy - REFINE_MARGIN, rh - th))
+        sx1 = min(rw, cx + REFINE_MARGIN + tw)
+        sy1 = min(rh, cy + REFINE_MARGIN + th)
+        res = cv2.matchTemplate(roi[sy0:sy1, sx0:sx1], tpl, cv2.TM_CCOEFF_NORMED)
+        _, val, _, l = cv2.minMaxLoc(res)
+        loc = (sx0 + l[0], sy0 + l[1])
+    return val, loc
+
+def match_pyramid(roi_pyr, tpl_pyr):
+    """
+    Coarse-to-fine TM_CCOEFF_NORMED match.  The full search runs only at the
+    coarsest level where the template is still ≥ MIN_PYRAMID_TPL; the best
+    COARSE_PEAKS hits there are each re-matched in a small window at every
+    finer level, and the best full-resolution score wins.
+    Returns (max_val, (x, y)) at full resolution.
     """
-    Look under root/set1…setN for quad-templates (top_left, top_right, bottom_left, bottom_right).
-    We now consider jpg/jpeg/png extensions. Returns a list of (templates, offsets).
+    th0, tw0 = tpl_pyr[0].shape
+    rh0, rw0 = roi_pyr[0].shape
+    if th0 > rh0 or tw0 > rw0:
+        raise ValueError("template larger than search region")
+
+    lvl = min(len(roi_pyr), len(tpl_pyr)) - 1
+    while lvl > 0:
+        th, tw = tpl_pyr[lvl].shape
+        rh, rw = roi_pyr[lvl].shape
+        if min(th, tw) >= MIN_PYRAMID_TPL and th <= rh and tw <= rw:
+            break
+        lvl -= 1
+
+    res = cv2.matchTemplate(roi_pyr[lvl], tpl_pyr[lvl], cv2.TM_CCOEFF_NORMED)
+    if lvl == 0:
+        _, val, _, loc = cv2.minMaxLoc(res)
+        return val, loc
+
+    # take the top peaks, suppressing each one's template-sized neighbourhood
+    th, tw = tpl_pyr[lvl].shape
+    best = (-2.0, (0, 0))
+    for _ in range(COARSE_PEAKS):
+        _, peak, _, loc = cv2.minMaxLoc(res)
+        if peak <= -1.0:
+            break
+        hit = _refine_match(roi_pyr, tpl_pyr, lvl, loc)
+        if hit[0] > best[0]:
+            best = hit
+        x, y = loc
+        res[max(0, y - th//2):y + th//2 + 1, max(0, x - tw//2):x + tw//2 + 1] = -1.0
+    return best
+
+def match_corner(page, quad, tset):
+    """Best match of `tset`'s `quad` template on the page → (score, (x, y) crop corner)."""
+    x1, y1, _, _ = page.quadrants[quad]
+    tpl_pyr = tset.pyramids[quad]
+    val, loc = match_pyramid(page.quadrant_edges(quad, len(tpl_pyr) - 1), tpl_pyr)
+    offx, offy = tset.offsets[quad]
+    return val, (x1 + loc[0] + offx, y1 + loc[1] + offy)
+
+# ── Template bank ──────────────────────────────────────────────────────────────
+# Corner templates are compiled once into root/.bank.npy (every edge map and
+# pyramid level, flattened into one uint8 array) plus root/.bank.json (where
+# each map lives, its offset, and the mtime/size/sha256 of every source image).
+# Besides the DPI maps the bank holds each set resized to every scale in
+# TEMPLATE_BANK_SCALES (the DETECT_DPI thumbnails the detectors run on), so
+# runs memory-map ready-to-match pyramids instead of decoding, Canny-ing and
+# resizing each image, and render workers re-open the same file rather than
+# unpickling copies.
+TEMPLATE_QUADS = ('top_left', 'top_right', 'bottom_left', 'bottom_right')
+TEMPLATE_EXTS  = ('jpg', 'jpeg', 'png')
+TEMPLATE_BANK  = '.bank'   # → root/.bank.npy + root/.bank.json
+TEMPLATE_BANK_VERSION = 2  # bump when the edge/pyramid recipe changes
+TEMPLATE_BANK_SCALES  = (DETECT_DPI / DPI,)   # page scales compiled besides DPI itself
+
+def _scale_key(scale):
+    return f"{round(scale, 4):g}"
+
+class TemplateBank(list):
     """
-    quad_names = ['top_left','top_right','bottom_left','bottom_right']
-    sets = []
+    TemplateSets whose arrays are read-only views into a memory-mapped bank,
+    plus `scaled`: the same sets pre-resized per _scale_key(scale).
+    Pickles as its file path, so a process-pool initializer just re-maps it.
+    """
+    def __init__(self, sets, npy_path, scaled=None):
+        super().__init__(sets)
+        self.npy_path = npy_path
+        self.scaled   = scaled or {}
+
+    def __reduce__(self):
+        return (open_template_bank, (self.npy_path,))
+
+def _template_sources(root):
+    """[(set_name, {quad: path})] for each complete set under root/set*."""
+    found = []
     for folder in sorted(glob.glob(os.path.join(root, 'set*'))):
-        tpl_dict, off_dict = {}, {}
-        for quad in quad_names:
-            for ext in ('jpg','jpeg','png'):
+        paths = {}
+        for quad in TEMPLATE_QUADS:
+            for ext in TEMPLATE_EXTS:
                 path = os.path.join(folder, f"{quad}.{ext}")
                 if os.path.exists(path):
-                    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-                    edges = cv2.Canny(img, 50, 150)
-                    h, w = edges.shape
-                    tpl_dict[quad] = edges
-                    # offsets inside the small crop marks
-                    if quad == 'top_left':
-                        off_dict[quad] = (w-1, h-1)
-                    elif quad == 'top_right':
-                        off_dict[quad] = (0,   h-1)
-                    elif quad == 'bottom_left':
-                        off_dict[quad] = (w-1, 0)
-                    else:  # bottom_right
-                        off_dict[quad] = (0,   0)
+                    paths[quad] = path
                     break
-        if len(tpl_dict) == 4:
-            sets.append((tpl_dict, off_dict))
+        if len(paths) == 4:
+            found.append((os.path.basename(folder), paths))
+    return found
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+def _bank_is_fresh(index, sources, root):
+    """
+    True if `index` was compiled from exactly these source images.  Files whose
+    mtime/size moved are re-hashed; a matching sha256 just refreshes the stamp
+    in `index` (returned as the second value so the caller can rewrite it).
+    """
+    if not index or index.get('version') != TEMPLATE_BANK_VERSION \
+            or index.get('pyramid_levels') != PYRAMID_LEVELS \
+            or index.get('scales') != [_scale_key(sc) for sc in TEMPLATE_BANK_SCALES]:
+        return False, False
+    recorded = index.get('sources', {})
+    current  = {os.path.relpath(p, root): p
+                for _, paths in sources for p in paths.values()}
+    if set(recorded) != set(current):
+        return False, False
+    if [name for name, _ in sources] != [s['name'] for s in index.get('sets', [])]:
+        return False, False
+    touched = False
+    for rel, path in current.items():
+        stamp = _source_stamp(path)
+        rec   = recorded[rel]
+        if rec.get('mtime_ns') == stamp['mtime_ns'] and rec.get('size') == stamp['size']:
+            continue
+        if _file_sha256(path) != rec.get('sha256'):
+            return False, False
+        rec.update(stamp)
+        touched = True
+    return True, touched
+
+def compile_template_bank(sources, root):
+    """Decode + edge-detect (+ resize) every source template → (flat uint8 array, index)."""
+    chunks, offset = [], 0
+    index = {'version': TEMPLATE_BANK_VERSION, 'pyramid_levels': PYRAMID_LEVELS,
+             'scales': [_scale_key(sc) for sc in TEMPLATE_BANK_SCALES],
+             'sources': {}, 'sets': []}
+
+    def _add(edges, offset_xy):
+        nonlocal offset
+        levels = []
+        for lvl in build_pyramid(edges):
+            h, w = lvl.shape
+            levels.append([offset, h, w])
+            chunks.append(np.ascontiguousarray(lvl).ravel())
+            offset += h * w
+        return {'offset': list(offset_xy), 'levels': levels}
+
+    for name, paths in sources:
+        entry = {'name': name, 'quads': {},
+                 'scaled': {_scale_key(sc): {} for sc in TEMPLATE_BANK_SCALES}}
+        for quad, path in paths.items():
+            img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                raise ValueError(f"Unreadable template image {path}")
+            edges = cv2.Canny(img, 50, 150)
+            entry['quads'][quad] = _add(edges, _corner_offset(quad, edges))
+            for sc in TEMPLATE_BANK_SCALES:
+                small = _scale_edges(edges, sc)
+                entry['scaled'][_scale_key(sc)][quad] = _add(small, _corner_offset(quad, small))
+            index['sources'][os.path.relpath(path, root)] = {
+                **_source_stamp(path), 'sha256': _file_sha256(path)}
+        index['sets'].append(entry)
+    index['size'] = offset
+    flat = np.concatenate(chunks) if chunks else np.zeros(0, np.uint8)
+    return flat, index
+
+def _set_from_quads(flat, quads):
+    tpl_dict, off_dict, pyramids = {}, {}, {}
+    for quad, q in quads.items():
+        pyramids[quad] = [flat[o:o + h * w].reshape(h, w) for o, h, w in q['levels']]
+        tpl_dict[quad] = pyramids[quad][0]
+        off_dict[quad] = tuple(q['offset'])
+    return TemplateSet(tpl_dict, off_dict, pyramids)
+
+def _sets_from_bank(flat, index):
+    return [_set_from_quads(flat, entry['quads']) for entry in index['sets']]
+
+def _scaled_sets_from_bank(flat, index):
+    """{_scale_key: [TemplateSet, …]} for every pre-resized scale in the bank."""
+    return {key: [_set_from_quads(flat, entry['scaled'][key]) for entry in index['sets']]
+            for key in index['scales']}
+
+def _read_bank_index(json_path):
+    try:
+        with open(json_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def open_template_bank(npy_path):
+    """Memory-map a compiled bank (no freshness check — see load_template_sets)."""
+    index = _read_bank_index(npy_path[:-len('.npy')] + '.json')
+    if index is None:
+        raise FileNotFoundError(f"Template bank index missing for {npy_path}")
+    flat = np.load(npy_path, mmap_mode='r')
+    if flat.dtype != np.uint8 or flat.shape != (index['size'],):
+        raise ValueError(f"Template bank {npy_path} does not match its index")
+    return TemplateBank(_sets_from_bank(flat, index), npy_path,
+                        _scaled_sets_from_bank(flat, index))
+
+def _write_template_bank(flat, index, npy_path, json_path):
+    """Write array then index, each via rename, so readers never see a half bank."""
+    tmp = npy_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, flat)
+    os.replace(tmp, npy_path)
+    _write_bank_index(index, json_path)
+
+def _write_bank_index(index, json_path):
+    tmp = json_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, json_path)
 
-    if not sets:
+def load_template_sets(root='templates'):
+    """
+    Corner templates from root/set1…setN (top_left, top_right, bottom_left,
+    bottom_right as jpg/jpeg/png), served from the compiled bank in root.
+    The bank is rebuilt when a set is added/removed or a source image's
+    content changes; if root is read-only the sets are built in memory.
+    Returns a list of TemplateSet.
+    """
+    sources = _template_sources(root)
+    if not sources:
         raise FileNotFoundError("No complete template-sets found under "+root)
-    return sets
 
-def detect_with_one_set(img_gray, templates, offsets):
+    npy_path  = os.path.abspath(os.path.join(root, TEMPLATE_BANK + '.npy'))
+    json_path = npy_path[:-len('.npy')] + '.json'
+    index = _read_bank_index(json_path)
+    fresh, touched = _bank_is_fresh(index, sources, root)
+    if fresh and os.path.exists(npy_path):
+        try:
+            if touched:
+                _write_bank_index(index, json_path)
+            return open_template_bank(npy_path)
+        except (OSError, ValueError):
+            pass                                    # damaged bank → rebuild
+
+    flat, index = compile_template_bank(sources, root)
+    try:
+        _write_template_bank(flat, index, npy_path, json_path)
+    except OSError as e:
+        print(f"   · [WARN] Could not write template bank ({e}); using in-memory templates")
+        return _sets_from_bank(flat, index)
+    print(f"   · Compiled template bank ({len(index['sets'])} sets) → {npy_path}")
+    return open_template_bank(npy_path)
+
+def _corner_offset(quad, edges):
+    """Offset of the crop corner inside a corner-mark template."""
+    h, w = edges.shape
+    if quad == 'top_left':
+        return (w-1, h-1)
+    elif quad == 'top_right':
+        return (0,   h-1)
+    elif quad == 'bottom_left':
+        return (w-1, 0)
+    else:  # bottom_right
+        return (0,   0)
+
+def _scale_edges(edges, scale):
+    """A DPI edge map resized by `scale`; any ink in a shrunk cell stays an edge pixel."""
+    h, w = edges.shape
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    small = cv2.resize(edges, size, interpolation=cv2.INTER_AREA)
+    return np.where(small > 0, 255, 0).astype(np.uint8)
+
+_SCALED_TEMPLATE_SETS = {}
+
+def scale_template_sets(template_sets, scale):
+    """
+    Template edge maps are cut from DPI renders; resize them to match a page
+    rendered at scale*DPI (see _scale_edges).  A TemplateBank compiled for
+    that scale serves its memory-mapped sets directly; anything else is
+    resized here and memoized per (template_sets, scale).
+    """
+    if scale == 1.0:
+        return template_sets
+    if isinstance(template_sets, TemplateBank) and _scale_key(scale) in template_sets.scaled:
+        return template_sets.scaled[_scale_key(scale)]
+    key = (id(template_sets), round(scale, 4))
+    hit = _SCALED_TEMPLATE_SETS.get(key)
+    if hit is not None and hit[0] is template_sets:
+        return hit[1]
+    scaled = []
+    for tset in template_sets:
+        tpl_dict, off_dict = {}, {}
+        for quad, edges in tset.templates.items():
+            tpl_dict[quad] = _scale_edges(edges, scale)
+            off_dict[quad] = _corner_offset(quad, tpl_dict[quad])
+        pyramids = {q: build_pyramid(e) for q, e in tpl_dict.items()}
+        scaled.append(TemplateSet(tpl_dict, off_dict, pyramids))
+    _SCALED_TEMPLATE_SETS[key] = (template_sets, scaled)
+    return scaled
+
+def detect_with_one_set(img_gray, templates, offsets, pyramids=None):
     """Run matchTemplate for each of the 4 corners in this single set."""
-    H, W = img_gray.shape
-    rois = {
-        'top_left':     (0,     0,   W//2,   H//2),
-        'top_right':    (W//2,  0,   W,      H//2),
-        'bottom_left':  (0,     H//2,W//2,   H),
-        'bottom_right': (W//2,  H//2,W,      H)
-    }
+    page = as_page(img_gray)
+    if pyramids is None:
+        pyramids = {q: build_pyramid(e) for q, e in templates.items()}
+    tset = TemplateSet(templates, offsets, pyramids)
     dets = {}
     for q in templates:
-        x1, y1, x2, y2 = rois[q]
-        roi = img_gray[y1:y2, x1:x2]
-        edges_roi = cv2.Canny(roi, 50, 150)
-        res = cv2.matchTemplate(edges_roi, templates[q], cv2.TM_CCOEFF_NORMED)
-        _, _, _, loc = cv2.minMaxLoc(res)
-        offx, offy = offsets[q]
-        dets[q] = (x1 + loc[0] + offx, y1 + loc[1] + offy)
+        _, dets[q] = match_corner(page, q, tset)
     return dets
     
 def find_nearby_blob_group(
@@ -224,66 +959,45 @@ def find_nearby_blob_group(
     pad: int    = 20
 ) -> tuple[int,int,int,int] | None:
     """
-    Locate ALL non-white contours in img_color. Pick the single largest contour
-    (by area), then find any other contours whose bottom‐edge is within `tol` pixels
-    of that largest contour's bottom edge. If at least two contours qualify, union
+    Locate ALL ink blobs in img_color. Pick the single largest blob
+    (by box area), then find any other blobs whose bottom‐edge is within `tol` pixels
+    of that largest blob's bottom edge. If at least two blobs qualify, union
     their bounding boxes into one rectangle, pad by `pad` pixels on each side, and return it.
     Otherwise return None.
 
-    - min_area : ignore any contour whose w*h < min_area
-    - tol      : vertical tolerance (pixels) to group bottoms of contours
+    - min_area : ignore any blob whose w*h < min_area
+    - tol      : vertical tolerance (pixels) to group bottoms of blobs
     - pad      : pad (pixels) to expand the unioned bounding box (clamped)
     """
-    import cv2
-    import numpy as np
-
-    # 1) Grayscale + threshold → every pixel < 250 becomes “ink” (255 in mask), white → 0.
-    gray = cv2.cvtColor(img_color, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
-
-    # 2) Find all external contours
-    cnts, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    if not cnts:
+    # 1-2) Shared ink analysis (pixel < 250 → ink)
+    page = as_page(img_color)
+    if not page.n_blobs:
         return None
+    min_area, tol, pad = page.area_px(min_area), page.px(tol), page.px(pad)
 
     # 3) Keep only those whose bounding‐rect area >= min_area
-    boxes = []
-    for c in cnts:
-        x, y, w, h = cv2.boundingRect(c)
-        if w*h < min_area:
-            continue
-        boxes.append((x, y, w, h))
+    b = page.boxes
+    b = b[b[:, 2] * b[:, 3] >= min_area]
 
-    if len(boxes) < 2:
+    if len(b) < 2:
         return None
 
     # 4) Identify the largest box by area (w*h)
-    main = max(boxes, key=lambda b: b[2]*b[3])
-    mx, my, mw, mh = main
-    main_bottom = my + mh
-
-    # 5) Gather any other box whose bottom is within tol pixels of main_bottom
-    group = [main]
-    for (x, y, w, h) in boxes:
-        if (x, y, w, h) == main:
-            continue
-        bottom = y + h
-        if abs(bottom - main_bottom) <= tol:
-            group.append((x, y, w, h))
+    bottoms = b[:, 1] + b[:, 3]
+    main_bottom = bottoms[int(np.argmax(b[:, 2] * b[:, 3]))]
+
+    # 5) Gather every box whose bottom is within tol pixels of main_bottom
+    group = b[np.abs(bottoms - main_bottom) <= tol]
 
     if len(group) < 2:
         return None
 
     # 6) Union all group‐boxes into a single bounding rectangle
-    xs = [b[0] for b in group] + [b[0] + b[2] for b in group]
-    ys = [b[1] for b in group] + [b[1] + b[3] for b in group]
-    x0 = min(xs)
-    y0 = min(ys)
-    x1 = max(xs)
-    y1 = max(ys)
+    x0, y0 = group[:, :2].min(axis=0).tolist()
+    x1, y1 = (group[:, :2] + group[:, 2:]).max(axis=0).tolist()
 
     # 7) Apply uniform padding → clamp within image
-    img_h, img_w = img_color.shape[:2]
+    img_h, img_w = page.shape
     x0p = max(x0 - pad, 0)
     y0p = max(y0 - pad, 0)
     x1p = min(x1 + pad, img_w)
@@ -293,46 +1007,35 @@ def find_nearby_blob_group(
 
 def crop_blob_bbox(img_gray):
     """Return bounding box (x0,y0,x1,y1) of the largest dark blob."""
-    _, th = cv2.threshold(img_gray, 250, 255, cv2.THRESH_BINARY_INV)
-    cnts, _ = cv2.findContours(th, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    if not cnts:
+    page = as_page(img_gray)
+    if not page.n_blobs:
         return None
-    c = max(cnts, key=cv2.contourArea)
-    x, y, w, h = cv2.boundingRect(c)
+    x, y, w, h = page.boxes[int(np.argmax(page.areas))].tolist()
     return (x, y, x + w, y + h)
     
 def detect_enclosed_box(img_gray, min_area=5000):
     """
-    Find the contour with the largest perimeter in a binary‐inverted version of img_gray,
+    Find the ink blob with the largest perimeter in a binary‐inverted version of img_gray,
     then return its bounding‐rectangle. This reliably catches a single rounded‐corner border
     even if the top edge is lightly anti‐aliased.
-    - img_gray: a BGR→Gray frame (numpy array)
-    - min_area: ignore tiny contours smaller than this (pixels^2)
+    - img_gray: a BGR→Gray frame (numpy array), or its PageAnalysis
+    - min_area: ignore tiny blobs smaller than this (pixels^2)
     Returns (x0, y0, x1, y1) or None.
     """
-    # 1) Invert threshold so that nearly‐black border+ink → white (255), background → 0
-    _, thresh = cv2.threshold(img_gray, 250, 255, cv2.THRESH_BINARY_INV)
-
-    # 2) Find all external contours on that mask (CHAIN_APPROX_NONE to preserve curves)
-    cnts, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
-
-    best_contour = None
-    best_peri = 0
-
-    for c in cnts:
-        area = cv2.contourArea(c)
-        if area < min_area:
-            continue  # ignore tiny specks
-        peri = cv2.arcLength(c, True)
-        if peri > best_peri:
-            best_peri = peri
-            best_contour = c
+    # 1-2) Shared inverted-threshold mask + ink blobs
+    page = as_page(img_gray)
+    if not page.n_blobs:
+        return None
 
-    if best_contour is None:
+    # ignore tiny specks, then take the longest perimeter (outlines are only
+    # traced for the blobs that survive the area filter)
+    keep = np.flatnonzero(page.areas >= page.area_px(min_area))
+    if not len(keep):
         return None
+    idx = keep[int(np.argmax(page.blob_perimeters(keep)))]
 
-    # 3) Return the bounding‐rectangle of that “longest perimeter” contour
-    x, y, w, h = cv2.boundingRect(best_contour)
+    # 3) Return the bounding‐rectangle of that “longest perimeter” blob
+    x, y, w, h = page.boxes[idx].tolist()
     return (x, y, x + w, y + h)
 
 def rect_intersection(a, b):
@@ -348,14 +1051,15 @@ def detect_best_crop(img_color, template_sets):
     Try each template-set; score by how much of the  blob
     sits inside the resulting crop. Return the best (x0,y0,x1,y1).
     """
-    gray = cv2.cvtColor(img_color, cv2.COLOR_BGR2GRAY)
-    blob_box = crop_blob_bbox(gray) or (0, 0, gray.shape[1], gray.shape[0])
+    page = as_page(img_color)
+    gray = page.gray
+    blob_box = crop_blob_bbox(page) or (0, 0, gray.shape[1], gray.shape[0])
     blob_area = (blob_box[2] - blob_box[0]) * (blob_box[3] - blob_box[1])
 
     best_score, best_rect = -1, (0, 0, gray.shape[1], gray.shape[0])
-    for templates, offsets in template_sets:
+    for tset in template_sets:
         try:
-            corners = detect_with_one_set(gray, templates, offsets)
+            corners = detect_with_one_set(page, *tset)
             # compute average-rectangle
             tl, tr = corners['top_left'], corners['top_right']
             bl, br = corners['bottom_left'], corners['bottom_right']
@@ -389,32 +1093,29 @@ def select_all_crop_candidates(img_color, template_sets, penalty_thresh=0.1):
     whose penalty (edge-ink on crop border) < penalty_thresh,
     all having virtually the same aspect ratio.
     """
-    gray = cv2.cvtColor(img_color, cv2.COLOR_BGR2GRAY)
-    _, blob = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
-    blob = (blob > 0).astype(np.uint8)
-    H, W = gray.shape
-    cands = []
+    page = as_page(img_color)
+    rects = []
 
-    for tpl, offs in template_sets:
+    for tset in template_sets:
         try:
-            corners = detect_with_one_set(gray, tpl, offs)
+            corners = detect_with_one_set(page, *tset)
             x0 = int((corners['top_left'][0] + corners['bottom_left'][0]) / 2)
             x1 = int((corners['top_right'][0] + corners['bottom_right'][0]) / 2)
             y0 = int((corners['top_left'][1] + corners['top_right'][1]) / 2)
             y1 = int((corners['bottom_left'][1] + corners['bottom_right'][1]) / 2)
         except:
             continue
+        if x1 > x0 and y1 > y0:
+            rects.append((x0, y0, x1, y1))
 
-        # penalty = ink on 5-pixel wide border
-        e = 5
-        top    = blob[y0:y0 + e, x0:x1]
-        bot    = blob[y1 - e:y1, x0:x1]
-        left   = blob[y0:y1, x0:x0 + e]
-        right  = blob[y0:y1, x1 - e:x1]
-        penalty = float(top.sum() + bot.sum() + left.sum() + right.sum()) / ((x1 - x0) * (y1 - y0))
-        if penalty > penalty_thresh or x1 <= x0 or y1 <= y0:
-            continue
-        cands.append(((x1 - x0) / (y1 - y0), (x0, y0, x1, y1)))
+    # penalty = ink on 5-pixel wide border, per unit of box area
+    cands = []
+    if rects:
+        r = np.array(rects, dtype=np.int64)
+        area = (r[:, 2] - r[:, 0]) * (r[:, 3] - r[:, 1])
+        penalty = score_border_ink(page.ink_integral, r, page.px(5)) / area
+        cands = [((x1 - x0) / (y1 - y0), (x0, y0, x1, y1))
+                 for (x0, y0, x1, y1), p in zip(rects, penalty) if p <= penalty_thresh]
 
     if not cands:
         return []
@@ -428,82 +1129,134 @@ def select_all_crop_candidates(img_color, template_sets, penalty_thresh=0.1):
                 boxes.append(box)
     return sorted(boxes, key=lambda b: b[0])
     
-def recolor_layer(image, color_bgr):
+def ink_alpha(image, tol=RECOLOR_TOL):
     """
-    Make every true‐black pixel → color_bgr, everything else transparent.
-    Returns 4-channel BGRA.
+    Alpha mask of the ink in a BGR (or gray) crop: 255 where gray <= tol, else 0.
+    Shared by every colour layer made from the same crop.
     """
-    bgr = image.copy()
-    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
-    alpha = (gray == 0).astype(np.uint8) * 255
-    # overlay fill color where alpha=255
-    for c in range(3):
-        bgr[:, :, c] = np.where(alpha == 255, color_bgr[c], 0)
-    return cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA)
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, alpha = cv2.threshold(gray, tol, 255, cv2.THRESH_BINARY_INV)
+    return alpha
 
+def _ink_words(alpha):
+    """
+    Alpha (0/255 uint8) → one int32 per pixel, 0 or all-ones (-1), so a whole
+    BGRA pixel can be filled by a single AND with the packed colour.
+    """
+    return alpha.view(np.int8).astype(np.int32)
 
-def parse_dimensions_from_pdf(pdf_path):
+def _fill_layer(words, color_bgr, out):
+    packed = np.array((*color_bgr, 255), np.uint8).view(np.int32)[0]
+    np.bitwise_and(words, packed, out=out.view(np.int32)[:, :, 0])
+    return out
+
+def recolor_layer(image, color_bgr, tol=RECOLOR_TOL, out=None):
     """
-    Scan the first page of pdf for:
-      1) “Dimensions (h x w): 1.25" x 5.75"”
-      2) “OVER ALL LENGTH IS 14 INCHES”
-      3) “450 mm x 129 mm”  (millimeters → inches)
-      4) any free “#″ x #″” fallback (inches)
+    Make every ink pixel (gray <= tol) → color_bgr, everything else transparent.
+    Returns 4-channel BGRA, written in one pass into `out` (h×w×4 uint8) if given.
+    """
+    words = _ink_words(ink_alpha(image, tol))
+    if out is None:
+        out = np.empty(words.shape + (4,), np.uint8)
+    return _fill_layer(words, color_bgr, out)
 
-    Returns:
-      - (height_in, width_in) in inches as floats,
-      - OR (length_in, None) if only an “OVER ALL LENGTH” was present,
-      - OR (0.0, 0.0) if nothing parseable found.
-
-    Notes:
-      • If you find an “mm” match, you convert each number with / 25.4 → inch.
-      • This order of checks ensures that “mm” lines get priority over a generic “#″ x #″” fallback.
-    """
-    import pdfplumber
-    import re
-
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        page = pdf.pages[0]
-        text = page.extract_text() or ""
-
-    # 1) Explicit (h x w) in inches
-    m = re.search(
-        r'Dimensions\s*\(\s*h\s*[x×]\s*w\s*\)\s*:\s*([\d.]+)\s*["”]?\s*[x×]\s*([\d.]+)\s*["”]?',
-        text, re.IGNORECASE
-    )
-    if m:
-        return float(m.group(1)), float(m.group(2))
+def recolor_layers(image, colors=None, tol=RECOLOR_TOL):
+    """
+    Every COLOR_MAP variant of one crop, keyed by colour name.
 
-    # 2) “OVER ALL LENGTH IS 14 INCHES”
-    m2 = re.search(
-        r'OVER\s*ALL\s*LENGTH\s*(?:IS|=)\s*([\d.]+)\s*INCH',
-        text, re.IGNORECASE
-    )
-    if m2:
-        length_in = float(m2.group(1))
-        return length_in, None
-
-    # 3) Millimeter line: “450 mm x 129 mm” (may use lowercase mm or uppercase MM)
-    mmm = re.search(
-        r'([\d.]+)\s*mm\s*[x×]\s*([\d.]+)\s*mm',
-        text, re.IGNORECASE
-    )
-    if mmm:
-        # Convert each mm → inches by dividing by 25.4
-        h_mm = float(mmm.group(1))
-        w_mm = float(mmm.group(2))
-        h_in = h_mm / 25.4
-        w_in = w_mm / 25.4
-        return h_in, w_in
-
-    # 4) Any free “#″ x #″” fallback (inches)
-    m3 = re.search(r'([\d.]+)\s*["”]\s*[x×]\s*([\d.]+)\s*["”]?', text)
-    if m3:
-        return float(m3.group(1)), float(m3.group(2))
-
-    # Nothing matched
-    return 0.0, 0.0
+    The ink mask is thresholded once and all layers are filled into a single
+    preallocated (n, h, w, 4) buffer, so five layers cost about one recolor.
+    """
+    colors = COLOR_MAP if colors is None else colors
+    words = _ink_words(ink_alpha(image, tol))
+    buf = np.empty((len(colors),) + words.shape + (4,), np.uint8)
+    return {name: _fill_layer(words, bgr, buf[k])
+            for k, (name, bgr) in enumerate(colors.items())}
+
+def export_color_layers(image, out_dir, stem, tol=RECOLOR_TOL):
+    """
+    Write <stem>.<colour>.png (BGRA) for every COLOR_MAP entry; returns the paths.
+    """
+    paths = []
+    for name, layer in recolor_layers(image, tol=tol).items():
+        path = os.path.join(out_dir, f"{stem}.{name}.png")
+        cv2.imwrite(path, layer)
+        paths.append(path)
+    return paths
+
+
+class Dimensions(NamedTuple):
+    """
+    Decal size read from a drawing's text, always in inches.
+
+    - height_in, width_in : 0.0 when unknown (an overall length fills only height)
+    - units      : 'in' or 'mm' as written on the drawing, None if nothing matched
+    - source     : name of the DIMENSION_PATTERNS entry that matched, or None
+    - confidence : that pattern's trust (0.0 when nothing matched)
+    - span       : (start, end) of the match in the page text, or None
+    """
+    height_in:  float
+    width_in:   float
+    units:      str = None
+    source:     str = None
+    confidence: float = 0.0
+    span:       tuple = None
+
+NO_DIMENSIONS = Dimensions(0.0, 0.0)
+
+_NUM = r'([\d.]+)'   # validated by float(); a stray '.' just isn't a hit
+
+# (name, regex, units, confidence) in priority order: the first pattern that
+# matches anywhere wins, at its first occurrence in the text.
+DIMENSION_PATTERNS = (
+    # 1) “Dimensions (h x w): 1.25" x 5.75"”
+    ('hw_label', re.compile(
+        rf'Dimensions\s*\(\s*h\s*[x×]\s*w\s*\)\s*:\s*{_NUM}\s*["”]?\s*[x×]\s*{_NUM}\s*["”]?',
+        re.IGNORECASE), 'in', 1.0),
+    # 2) “OVER ALL LENGTH IS 14 INCHES” (height only)
+    ('overall_length', re.compile(
+        rf'OVER\s*ALL\s*LENGTH\s*(?:IS|=)\s*{_NUM}\s*INCH',
+        re.IGNORECASE), 'in', 0.5),
+    # 3) “450 mm x 129 mm”
+    ('mm_pair', re.compile(
+        rf'{_NUM}\s*mm\s*[x×]\s*{_NUM}\s*mm',
+        re.IGNORECASE), 'mm', 0.8),
+    # 4) any free “#″ x #″”
+    ('inch_pair', re.compile(
+        rf'{_NUM}\s*["”]\s*[x×]\s*{_NUM}\s*["”]?'), 'in', 0.6),
+)
+
+def extract_dimensions(text):
+    """
+    Match `text` against DIMENSION_PATTERNS in priority order and return the
+    first hit as a Dimensions (NO_DIMENSIONS if none).
+
+    The patterns are tried one after another rather than as one combined
+    alternation: the first two start with a literal that the regex engine
+    jumps to directly, and the usual "Dimensions (h x w)" line ends the search
+    after that one cheap scan (see bench_dimensions.py).
+    """
+    for name, rx, units, conf in DIMENSION_PATTERNS:
+        for m in rx.finditer(text):
+            try:
+                h, w = ([float(v) for v in m.groups()] + [0.0])[:2]
+            except ValueError:          # e.g. “. x 2"” — try the next occurrence
+                continue
+            if units == 'mm':
+                h, w = h / 25.4, w / 25.4
+            return Dimensions(h, w, units, name, conf, m.span())
+    return NO_DIMENSIONS
+
+
+def parse_dimensions_from_pdf(pdf_path):
+    """
+    Dimensions of the decal in pdf_path's first-page text layer (see
+    DIMENSION_PATTERNS for what is recognised).  mm values are converted to
+    inches; an “OVER ALL LENGTH” gives height only (width_in 0.0).
+    pdf_path may also be an open DecalDocument; its cached text is reused.
+    """
+    with open_document(pdf_path) as doc:
+        return extract_dimensions(doc.text)
     
 def extract_color_label(pdf_path: str,
                         crop_y0: float = None) -> str:
@@ -512,58 +1265,31 @@ def extract_color_label(pdf_path: str,
     ('green','yellow','red','blue','black').  If crop_y0 is provided,
     only consider labels whose bottom is <= crop_y0 (i.e. text above
     the decal).  Return the closest label to crop_y0, or 'black' as default.
+    pdf_path may also be an open DecalDocument.
     """
-    keywords = set(COLOR_MAP.keys())
-    best = None
-    best_bottom = -1
-
-    with pdfplumber.open(pdf_path) as pdf:
-        page = pdf.pages[0]
-        # each word has: text, x0,x1,top,bottom
-        for w in page.extract_words():
-            txt = w["text"].strip().lower()
-            if txt in keywords:
-                btm = float(w["bottom"])
-                # if crop_y0 given, ignore words below the decal region
-                if crop_y0 is not None and btm > crop_y0:
-                    continue
-                # pick the word whose bottom is closest to crop_y0
-                if crop_y0 is None or btm > best_bottom:
-                    best_bottom = btm
-                    best = txt
+    with open_document(pdf_path) as doc:
+        best = doc.word_index.nearest_above(COLOR_MAP.keys(), crop_y0)
+
+    return best["text"].strip().lower() if best else "black"
 
-    return best or "black"
-                            
 def crop_full_logo(pdf_path, dpi=300, margin_pt=5):
     """
     Find the “…mm” dimension line in the PDF and return
     its top‐Y in pixels (minus a small margin). If nothing
-    is found, returns None.
+    is found, returns None.  pdf_path may also be an open DecalDocument.
     """
-    with pdfplumber.open(pdf_path) as pdf:
-        words = pdf.pages[0].extract_words()
-    dims = [w for w in words if w["text"].lower().endswith("mm")]
-    if not dims:
+    with open_document(pdf_path) as doc:
+        dim = doc.word_index.first(lambda t: t.lower().endswith("mm"))
+    if dim is None:
         return None
-    dim_top_pt = min(w["top"] for w in dims)
-    return int((dim_top_pt - margin_pt) * dpi / 72)
+    return int((dim["top"] - margin_pt) * dpi / 72)
 
 def match_one_corner(img_color, tpl_edges, offset, quadrant):
-    gray = cv2.cvtColor(img_color, cv2.COLOR_BGR2GRAY)
-    H, W = gray.shape
-    rois = {
-        'top-left':    (0,     0,     W//2,  H//2),
-        'top-right':   (W//2,  0,     W,     H//2),
-        'bottom-left': (0,     H//2,  W//2,  H),
-        'bottom-right':(W//2,  H//2,  W,     H),
-    }
-    x1, y1, x2, y2 = rois[quadrant]
-    roi = gray[y1:y2, x1:x2]
-    edges_roi = cv2.Canny(roi, 50, 150)
-    res = cv2.matchTemplate(edges_roi, tpl_edges, cv2.TM_CCOEFF_NORMED)
-    _, _, _, maxloc = cv2.minMaxLoc(res)
-    ox, oy = offset
-    return (x1 + maxloc[0] + ox, y1 + maxloc[1] + oy)
+    page = as_page(img_color)
+    quad = quadrant.replace('-', '_')
+    tset = TemplateSet({quad: tpl_edges}, {quad: offset}, {quad: build_pyramid(tpl_edges)})
+    _, corner = match_corner(page, quad, tset)
+    return corner
 
 def select_best_crop_box(img_color, template_sets, expected_ratio=None, edge=5, ar_weight=1000):
     """
@@ -573,39 +1299,24 @@ def select_best_crop_box(img_color, template_sets, expected_ratio=None, edge=5,
       • corner-template match-confidence (>= 0.85)
     Return the (x0,y0,x1,y1) with the lowest total_score.
     """
-    gray = cv2.cvtColor(img_color, cv2.COLOR_BGR2GRAY)
-    # everything below 250 is “ink”
-    _, blob = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
-    blob = (blob > 0).astype(np.uint8)
+    page = as_page(img_color)
+    edge = page.px(edge)
+    H, W = page.shape
 
-    candidates = []
-    H, W = blob.shape
+    boxes, ar_penalties = [], []
 
-    for templates, offsets in template_sets:
+    for tset in template_sets:
         try:
             # 1) Try to detect all four corner-brackets with high confidence
+            #    (quadrant edges + pyramids are shared across template sets)
             corners = {}
             for quad in ('top_left','top_right','bottom_left','bottom_right'):
-                # matchTemplate returns (minVal, maxVal, minLoc, maxLoc)
-                # but we want to inspect maxVal to ensure it >= 0.85
-                x1, y1, x2, y2 = {
-                    'top_left':      (0,     0,    W//2,  H//2),
-                    'top_right':     (W//2,  0,    W,     H//2),
-                    'bottom_left':   (0,     H//2, W//2,  H),
-                    'bottom_right':  (W//2,  H//2, W,     H),
-                }[quad]
-                roi = gray[y1:y2, x1:x2]
-                edges_roi = cv2.Canny(roi, 50, 150)
-                res = cv2.matchTemplate(edges_roi, templates[quad], cv2.TM_CCOEFF_NORMED)
-                _, maxVal, _, maxLoc = cv2.minMaxLoc(res)
+                maxVal, corners[quad] = match_corner(page, quad, tset)
 
                 # **(a)** If confidence < 0.85, abort this template-set entirely
                 if maxVal < 0.85:
                     raise ValueError(f"{quad} corner match too weak ({maxVal:.2f})")
 
-                offx, offy = offsets[quad]
-                corners[quad] = (x1 + maxLoc[0] + offx, y1 + maxLoc[1] + offy)
-
             # 2) Average the four corners into a rectangle
             tl, tr = corners['top_left'], corners['top_right']
             bl, br = corners['bottom_left'], corners['bottom_right']
@@ -625,14 +1336,7 @@ def select_best_crop_box(img_color, template_sets, expected_ratio=None, edge=5,
         if x1n <= x0n or y1n <= y0n:
             continue
 
-        # 4) Compute border-ink penalty (5px wide)
-        top    = blob[y0n:y0n+edge, x0n:x1n]
-        bottom = blob[y1n-edge:y1n, x0n:x1n]
-        left   = blob[y0n:y1n, x0n:x0n+edge]
-        right  = blob[y0n:y1n, x1n-edge:x1n]
-        penalty = int(top.sum() + bottom.sum() + left.sum() + right.sum())
-
-        # 5) Strict aspect-ratio penalty
+        # 4) Strict aspect-ratio penalty
         w_rect = float(x1n - x0n)
         h_rect = float(y1n - y0n)
         ar = (w_rect / h_rect) if (h_rect > 0) else 0
@@ -646,16 +1350,17 @@ def select_best_crop_box(img_color, template_sets, expected_ratio=None, edge=5,
         else:
             ar_penalty = 0
 
-        total_score = penalty + ar_penalty
-        candidates.append((total_score, (x0n, y0n, x1n, y1n)))
+        boxes.append((x0n, y0n, x1n, y1n))
+        ar_penalties.append(ar_penalty)
 
-    # 6) If no “good” corner-based candidate, fallback
-    if not candidates:
+    # 5) If no “good” corner-based candidate, fallback
+    if not boxes:
         raise RuntimeError("No valid crop candidates found")
 
-    # 7) Pick the rectangle with the lowest combined score
-    _, best_box = min(candidates, key=lambda t: t[0])
-    return best_box
+    # 6) Border-ink penalty (5px wide) for all survivors at once; pick the
+    #    rectangle with the lowest combined score
+    total = score_border_ink(page.ink_integral, boxes, edge) + np.asarray(ar_penalties)
+    return boxes[int(np.argmin(total))]
 
 def wait_for_login(driver, timeout=300):
     """
@@ -668,58 +1373,38 @@ def wait_for_login(driver, timeout=300):
 
 def find_horizontal_aligned_union(img_color, min_area=2000, tol=250, pad_pct=0.05, min_ratio=0.5):
     """
-    Group only those “big” contours (area ≥ min_area) whose vertical centers
-    lie within `tol` pixels of the largest contour’s center AND whose aspect
+    Group only those “big” blobs (area ≥ min_area) whose vertical centers
+    lie within `tol` pixels of the largest blob’s center AND whose aspect
     ratio (width/height) ≥ min_ratio.  Then return the union of those bounding
-    boxes, padded by pad_pct.  If no suitable contour ≥ min_area is found, return None.
+    boxes, padded by pad_pct.  If no suitable blob ≥ min_area is found, return None.
     """
 
-    gray = cv2.cvtColor(img_color, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
-    cnts, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    # 1) Collect all contours with area >= min_area
-    big = []
-    for c in cnts:
-        area = cv2.contourArea(c)
-        if area < min_area:
-            continue
-        x, y, w, h = cv2.boundingRect(c)
-        cy = y + (h / 2)
-        ratio = float(w) / float(h) if h > 0 else 0.0
-        big.append({'bbox': (x, y, x + w, y + h), 'area': area, 'cy': cy, 'ratio': ratio})
+    page = as_page(img_color)
+    min_area, tol = page.area_px(min_area), page.px(tol)
 
-    if not big:
+    # 1) Collect all blobs with area >= min_area
+    big = page.areas >= min_area
+    if not big.any():
         return None
+    b, areas = page.boxes[big], page.areas[big]
+    cy = b[:, 1] + b[:, 3] / 2
+    ratio = b[:, 2] / np.maximum(b[:, 3], 1)
 
-    # 2) Find the single largest contour (“main blob”)
-    main = max(big, key=lambda b: b['area'])
-    cy_main = main['cy']
+    # 2) Find the single largest blob (“main blob”)
+    main = int(np.argmax(areas))
 
-    # 3) Always include the main blob.  Then group any other ‘big’ contour whose
+    # 3) Always include the main blob.  Then group any other ‘big’ blob whose
     #    vertical center is within tol AND whose aspect ratio >= min_ratio.
-    group = [main]
-    for entry in big:
-        if entry is main:
-            continue
-        if abs(entry['cy'] - cy_main) <= tol and entry['ratio'] >= min_ratio:
-            group.append(entry)
+    in_group = (np.abs(cy - cy[main]) <= tol) & (ratio >= min_ratio)
+    in_group[main] = True
+    group = b[in_group]
 
     # 4) Compute union of all bounding boxes in that group
-    xs = []
-    ys = []
-    for entry in group:
-        x0_, y0_, x1_, y1_ = entry['bbox']
-        xs.extend([x0_, x1_])
-        ys.extend([y0_, y1_])
-
-    x0u = min(xs)
-    y0u = min(ys)
-    x1u = max(xs)
-    y1u = max(ys)
+    x0u, y0u = group[:, :2].min(axis=0).tolist()
+    x1u, y1u = (group[:, :2] + group[:, 2:]).max(axis=0).tolist()
 
     # 5) Pad the union‐box by pad_pct on all sides (clamp to image edges)
-    h_img, w_img = img_color.shape[:2]
+    h_img, w_img = page.shape
     rect_w = x1u - x0u
     rect_h = y1u - y0u
     pad_x = int(rect_w * pad_pct)
@@ -798,99 +1483,186 @@ def download_pdf_via_api(part_number: str, pdf_dir: str, API_KEY: str) -> str:
     print(f"   · [API] Downloaded PDF → {out_path}")
     return out_path
     
+class InkCluster(NamedTuple):
+    """One group of neighbouring ink blobs (see find_ink_clusters)."""
+    rect:    tuple       # (x0, y0, x1, y1) union of the members' boxes
+    members: np.ndarray  # indices into PageAnalysis.boxes / .areas
+    area:    float       # summed contour area of the members
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+class _BoxGrid:
+    """Bucket index of boxes (x0, y0, x1, y1) on a square grid of `cell` px."""
+    def __init__(self, x0, y0, x1, y1, cell):
+        self.cell = max(1, int(cell))
+        self.buckets = {}
+        c = self.cell
+        for i, (a, b, e, f) in enumerate(zip((x0 // c).tolist(), (y0 // c).tolist(),
+                                             (x1 // c).tolist(), (y1 // c).tolist())):
+            for cx in range(a, e + 1):
+                for cy in range(b, f + 1):
+                    self.buckets.setdefault((cx, cy), []).append(i)
+
+    def query(self, x0, y0, x1, y1):
+        """Indices of boxes registered in any bucket the region touches."""
+        c, found = self.cell, []
+        for cx in range(int(x0) // c, int(x1) // c + 1):
+            for cy in range(int(y0) // c, int(y1) // c + 1):
+                found.extend(self.buckets.get((cx, cy), ()))
+        return np.unique(np.asarray(found, dtype=np.int64))
+
+SWEEP_PAIR_CHUNK = 1 << 21   # candidate pairs materialised per sweep-line batch
+
+def _near_pairs(X0, Y0, X1, Y1, prox):
+    """
+    Sweep-line over boxes sorted by x0: every (i, j) whose x-ranges come within
+    `prox` and whose y-ranges overlap.  Candidates are the boxes starting before
+    x1[i] + prox, found with searchsorted and filtered as NumPy arrays.
+    """
+    order = np.argsort(X0, kind='stable')
+    sx0 = X0[order]
+    n = len(order)
+    hi = np.searchsorted(sx0, X1[order] + prox, side='right')
+    counts = np.maximum(hi - np.arange(n) - 1, 0)
+    start = 0
+    while start < n:
+        csum = np.cumsum(counts[start:])
+        stop = start + max(1, int(np.searchsorted(csum, SWEEP_PAIR_CHUNK, side='right')))
+        c = counts[start:stop]
+        src = np.repeat(np.arange(start, stop), c)
+        first = np.repeat(np.cumsum(c) - c, c)
+        dst = src + 1 + (np.arange(len(src)) - first)
+        i, j = order[src], order[dst]
+        keep = (Y1[j] >= Y0[i]) & (Y0[j] <= Y1[i])
+        yield i[keep], j[keep]
+        start = stop
+
+def _grown_strips(grid, old, new):
+    """Grid candidates in region `new` minus region `old` (None: all of `new`)."""
+    if old is None:
+        return grid.query(*new)
+    ox0, oy0, ox1, oy1 = old
+    nx0, ny0, nx1, ny1 = new
+    parts = []
+    if nx0 < ox0: parts.append(grid.query(nx0, ny0, ox0, ny1))
+    if nx1 > ox1: parts.append(grid.query(ox1, ny0, nx1, ny1))
+    if ny0 < oy0: parts.append(grid.query(nx0, ny0, nx1, oy0))
+    if ny1 > oy1: parts.append(grid.query(nx0, oy1, nx1, ny1))
+    return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+def find_ink_clusters(img_color, min_area=500, proximity_px=50, limit=None):
+    """
+    Group every ink blob of area >= min_area into clusters.  A cluster grows
+    from its largest box by absorbing any box whose x-range comes within
+    `proximity_px` of the cluster's extent and whose y-range overlaps it, until
+    nothing more is near (the rule find_grouped_union_of_ink_contours always
+    used).  Boxes that are near each other directly always end up together, so
+    those pairs are first joined with a union-find fed by a sweep-line, and
+    growth then absorbs whole pairwise groups found through a grid-bucket
+    index — close to linear in the blob count instead of quadratic.
+    Clusters are seeded largest box first; each box belongs to one cluster.
+    Returns [InkCluster] in seed order (the first holds the largest box),
+    stopping after `limit` clusters if given.
+    """
+    page = as_page(img_color)
+    if not page.n_blobs:
+        return []
+    min_area, prox = page.area_px(min_area), page.px(proximity_px)
+
+    keep = np.flatnonzero(page.areas >= min_area)
+    if not len(keep):
+        return []
+    b = page.boxes[keep]
+    X0, Y0 = b[:, 0], b[:, 1]
+    X1, Y1 = X0 + b[:, 2], Y0 + b[:, 3]
+
+    def near(idx, x0, y0, x1, y1):
+        gap = np.maximum(np.maximum(X0[idx] - x1, x0 - X1[idx]), 0)
+        return (gap <= prox) & (Y1[idx] >= y0) & (Y0[idx] <= y1)
+
+    # 1) pairwise neighbours → union-find groups
+    uf = _UnionFind(len(keep))
+    for pi, pj in _near_pairs(X0, Y0, X1, Y1, prox):
+        for i, j in zip(pi.tolist(), pj.tolist()):
+            uf.union(i, j)
+    groups = {}
+    for i in range(len(keep)):
+        groups.setdefault(uf.find(i), []).append(i)
+    root = np.array([uf.find(i) for i in range(len(keep))])
+
+    # 2) grow clusters from the largest remaining box, absorbing whole groups
+    grid = _BoxGrid(X0, Y0, X1, Y1, 2 * prox)
+    assigned = np.zeros(len(keep), dtype=bool)
+    order = np.lexsort((X0, -(b[:, 2] * b[:, 3])))
+    clusters = []
+    for seed in order.tolist():
+        if assigned[seed]:
+            continue
+        members = list(groups[root[seed]])
+        assigned[members] = True
+        gx0, gy0 = int(X0[members].min()), int(Y0[members].min())
+        gx1, gy1 = int(X1[members].max()), int(Y1[members].max())
+        seen = None
+        while True:
+            # only the strips the search region grew by can hold new neighbours
+            region = (gx0 - prox, gy0, gx1 + prox, gy1)
+            cand = _grown_strips(grid, seen, region)
+            seen = region
+            cand = cand[~assigned[cand]]
+            hit = cand[near(cand, gx0, gy0, gx1, gy1)]
+            if not len(hit):
+                break
+            for r in set(root[hit].tolist()):
+                g = groups[r]
+                members.extend(g)
+                assigned[g] = True
+                gx0, gy0 = min(gx0, int(X0[g].min())), min(gy0, int(Y0[g].min()))
+                gx1, gy1 = max(gx1, int(X1[g].max())), max(gy1, int(Y1[g].max()))
+        idx = keep[np.asarray(members)]
+        clusters.append(InkCluster((gx0, gy0, gx1, gy1), idx, float(page.areas[idx].sum())))
+        if limit and len(clusters) >= limit:
+            break
+    return clusters
+
 def find_grouped_union_of_ink_contours(img_color, min_area=500, pad_pct=0.05, proximity_px=50):
     """
     1) Threshold `img_color` so that any pixel <250→foreground (ink).
-    2) Find all external contours in that thresholded mask.
-    3) Keep only those contours whose area >= min_area.
-    4) Cluster together any contours whose bounding boxes come within
-       `proximity_px` pixels horizontally (and that overlap vertically at all).
+    2) Find all ink blobs (connected components, holes filled) in that mask.
+    3) Keep only those blobs whose area >= min_area.
+    4) Cluster together any blobs whose bounding boxes come within
+       `proximity_px` pixels horizontally (and that overlap vertically at all)
+       — see find_ink_clusters — and take the cluster of the largest box.
     5) Compute one big bounding box around that cluster (group) and then pad it
        outward by pad_pct * (width_of_group) horizontally and pad_pct * (height_of_group) vertically.
     Returns (x0, y0, x1, y1) or None if no contour was found.
     """
 
-    # Step 1: Create a binary “ink mask”
-    gray = cv2.cvtColor(img_color, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
-
-    # Step 2: Find all external contours
-    cnts, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    if not cnts:
-        return None
-
-    # Step 3: Filter by area >= min_area
-    boxes = []
-    for c in cnts:
-        area = cv2.contourArea(c)
-        if area < min_area:
-            continue
-        x, y, w, h = cv2.boundingRect(c)
-        boxes.append((x, y, w, h))
-    if not boxes:
+    # Steps 1-4: Shared ink analysis, clustered on a grid index
+    page = as_page(img_color)
+    clusters = find_ink_clusters(page, min_area=min_area, proximity_px=proximity_px, limit=1)
+    if not clusters:
         return None
 
-    # Step 4: Sort boxes by x-coordinate (left edge)
-    boxes = sorted(boxes, key=lambda b: b[0])
-
-    # We'll form a single “cluster” by starting from the largest‐area contour,
-    # then absorbing any other box whose bounding box’s x-range comes within
-    # proximity_px, AND whose y-range overlaps at all.  (This guarantees we pull
-    # in the entire disconnected logo, but nothing extremely far away.)
-    # First, identify the “largest” blob by area.
-    #    (We know each box is (x, y, w, h).)
-    areas = [w*h for (x,y,w,h) in boxes]
-    largest_idx = int(np.argmax(areas))
-    gx, gy, gw, gh = boxes[largest_idx]
-
-    # Our “group’s bounding rect so far”:
-    group_x0 = gx
-    group_y0 = gy
-    group_x1 = gx + gw
-    group_y1 = gy + gh
-
-    # Now attempt to absorb any other contours that lie “close enough.”
-    # We do a single pass over all boxes (including ones on either side).  If a box’s
-    # x‐range [x, x+w] is within proximity_px of our current group’s [group_x0, group_x1],
-    # and its y‐range [y, y+h] overlaps at all with our group’s [group_y0, group_y1],
-    # we absorb it and expand our group.  We repeat until no new box can be absorbed.
-    absorbed = True
-    used = set([largest_idx])
-
-    while absorbed:
-        absorbed = False
-        for i, (x, y, w, h) in enumerate(boxes):
-            if i in used:
-                continue
-            # Horizontal proximity check:
-            #    We say “close enough” if box’s x is within proximity_px of group_x1,
-            #    OR if group_x0 is within proximity_px of box’s x+w.
-            bx0, bx1 = x, x + w
-            dist_horiz = 0
-            if bx1 < group_x0:
-                dist_horiz = group_x0 - bx1
-            elif bx0 > group_x1:
-                dist_horiz = bx0 - group_x1
-            else:
-                dist_horiz = 0  # they overlap horizontally already
-
-            # Vertical overlap check: do they share any y-range?
-            #    (i.e. box’s y..y+h intersects group_y0..group_y1)
-            vy0, vy1 = y, y + h
-            overlap_vert = not (vy1 < group_y0 or vy0 > group_y1)
-
-            if dist_horiz <= proximity_px and overlap_vert:
-                # absorb it
-                used.add(i)
-                absorbed = True
-                group_x0 = min(group_x0, x)
-                group_y0 = min(group_y0, y)
-                group_x1 = max(group_x1, x + w)
-                group_y1 = max(group_y1, y + h)
+    # The group is the cluster grown from the largest box (by w*h)
+    group_x0, group_y0, group_x1, group_y1 = clusters[0].rect
 
     # At this point, (group_x0, group_y0) … (group_x1, group_y1) covers
-    # all contours in that cluster.  Now pad this bounding box outward by pad_pct:
-    img_h, img_w = img_color.shape[:2]
+    # all blobs in that cluster.  Now pad this bounding box outward by pad_pct:
+    img_h, img_w = page.shape
     gw = group_x1 - group_x0
     gh = group_y1 - group_y0
     pad_x = int(gw * pad_pct)
@@ -914,80 +1686,1115 @@ def find_aligned_blob_group(img_color, min_area=10000, tol=10, pad=20):
     bottom-y are within tol pixels of each other. If ≥2 found,
     return their combined bbox padded by `pad`. Else None.
     """
-    gray = cv2.cvtColor(img_color, cv2.COLOR_BGR2GRAY)
-    _, th = cv2.threshold(gray, 250, 255, cv2.THRESH_BINARY_INV)
-    cnts, _ = cv2.findContours(th, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    boxes = []
-    for c in cnts:
-        x, y, w, h = cv2.boundingRect(c)
-        if w * h < min_area:
-            continue
-        boxes.append((x, y, w, h))
+    page = as_page(img_color)
+    min_area, tol, pad = page.area_px(min_area), page.px(tol), page.px(pad)
+    b = page.boxes
+    b = b[b[:, 2] * b[:, 3] >= min_area]
 
-    if len(boxes) < 2:
+    if len(b) < 2:
         return None
 
-    bottoms = [y + h for x, y, w, h in boxes]
-    avg_b = sum(bottoms) / len(bottoms)
-    group = [b for b in boxes if abs((b[1] + b[3]) - avg_b) <= tol]
+    bottoms = b[:, 1] + b[:, 3]
+    group = b[np.abs(bottoms - bottoms.mean()) <= tol]
 
     if len(group) < 2:
         return None
 
-    xs = [x for x, y, w, h in group] + [x + w for x, y, w, h in group]
-    ys = [y for x, y, w, h in group] + [y + h for x, y, w, h in group]
-    x0 = max(min(xs) - pad, 0)
-    y0 = max(min(ys) - pad, 0)
-    x1 = min(max(xs) + pad, img_color.shape[1])
-    y1 = min(max(ys) + pad, img_color.shape[0])
+    x0, y0 = group[:, :2].min(axis=0).tolist()
+    x1, y1 = (group[:, :2] + group[:, 2:]).max(axis=0).tolist()
+    x0 = max(x0 - pad, 0)
+    y0 = max(y0 - pad, 0)
+    x1 = min(x1 + pad, page.shape[1])
+    y1 = min(y1 + pad, page.shape[0])
     return (x0, y0, x1, y1)
 
-def main(input_sheet, output_root, seq=105):
+# ── Candidate scoring ──────────────────────────────────────────────────────────
+# Border-ink penalties come from the page's summed-area table, so any number of
+# candidate rectangles is scored in one vectorized pass at O(1) per rectangle.
+
+def box_ink(integral, x0, y0, x1, y1):
+    """Ink count of boxes [x0,x1)×[y0,y1) (array args), clipped to the page like a slice."""
+    H, W = integral.shape[0] - 1, integral.shape[1] - 1
+    x0 = np.clip(x0, 0, W); x1 = np.clip(x1, x0, W)
+    y0 = np.clip(y0, 0, H); y1 = np.clip(y1, y0, H)
+    # widen only the gathered corners: the int32 table itself is never copied
+    return (integral[y1, x1].astype(np.int64) - integral[y0, x1] -
+            integral[y1, x0] + integral[y0, x0])
+
+def score_border_ink(integral, rects, edge):
+    """
+    Ink px on the `edge`-wide top/bottom/left/right strips of each rect
+    (corners counted in two strips, as the four-slice sum always did).
+    rects : (N, 4) x0, y0, x1, y1  →  (N,) int64
+    """
+    r = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+    x0, y0, x1, y1 = r.T
+    return (box_ink(integral, x0, y0,        x1,        y0 + edge) +
+            box_ink(integral, x0, y1 - edge, x1,        y1) +
+            box_ink(integral, x0, y0,        x0 + edge, y1) +
+            box_ink(integral, x1 - edge, y0, x1,        y1))
+
+# ── Crop detector cascade ──────────────────────────────────────────────────────
+# Raster fallbacks, tried cheapest first.  `cost` is a relative run-time
+# estimate (measured on the DETECT_DPI thumbnail); `confidence` says whether a
+# clean hit from that detector may end the search on its own.  The cascade
+# stops at the first candidate from a detector with confidence ≥
+# CASCADE_MIN_CONFIDENCE whose aspect ratio and border ink are both within
+# limits; every candidate found up to then is scored and the best one wins.
+# Frame/corner-mark detectors (≥ CASCADE_TRUSTED) draw ink on their own
+# border by construction, so for them the aspect-ratio check alone suffices.
+CASCADE_AR_TOL         = 0.10  # |ar - expected| / expected
+CASCADE_MAX_BORDER_INK = 0.02  # ink px on the 5px crop border / crop area
+CASCADE_MIN_CONFIDENCE = 0.5
+CASCADE_TRUSTED        = 0.9
+REFINE_CROP            = True  # nudge each detector's pick to a cleaner, target-sized box
+REFINE_RADIUS          = 24    # px at DPI any crop edge may move during refinement
+REFINE_PASSES          = 2     # alternating x / y search passes
+
+class CropDetector(NamedTuple):
+    name:       str
+    cost:       float
+    confidence: float
+    run:        object   # (page, ctx) → list of (x0, y0, x1, y1)
+
+class CropContext(NamedTuple):
+    """Per-page inputs the detectors share."""
+    expected_ar:   float | None
+    template_sets: list
+    dbg_dir:       str | None
+    dbg_name:      str | None
+
+def _detect_bracket(page, ctx):
+    # an enclosing frame is only trusted when the drawing's dims confirm it
+    if not ctx.expected_ar:
+        return []
+    rect = detect_enclosed_box(page, min_area=5000)
+    return [rect] if rect else []
+
+def _detect_templates(page, ctx):
+    try:
+        return [select_best_crop_box(page, scale_template_sets(ctx.template_sets, page.scale),
+                                     ctx.expected_ar)]
+    except Exception:
+        return []
+
+def _detect_nearby_blob(page, ctx):
+    r = find_nearby_blob_group(page, min_area=1000, tol=50, pad=20)
+    return [r] if r else []
+
+def _detect_horizontal_union(page, ctx):
+    r = find_horizontal_aligned_union(page, min_area=2000, tol=250, pad_pct=0.05)
+    return [r] if r else []
+
+def _detect_grouped_union(page, ctx):
+    r = find_grouped_union_of_ink_contours(page, min_area=500, pad_pct=0.05)
+    return [r] if r else []
+
+def _detect_ink_union(page, ctx):
+    r = find_union_of_ink_contours(page, min_area=500, pad_pct=0.05,
+                                   dbg_dir=ctx.dbg_dir, dbg_name=ctx.dbg_name)
+    return [r] if r else []
+
+CROP_DETECTORS = [
+    CropDetector('bracket',          1.0, 0.95, _detect_bracket),
+    CropDetector('nearby_blob',      1.5, 0.6,  _detect_nearby_blob),
+    CropDetector('horizontal_union', 1.5, 0.6,  _detect_horizontal_union),
+    CropDetector('ink_union',        2.0, 0.2,  _detect_ink_union),   # catch-all, never exits
+    CropDetector('grouped_union',    4.0, 0.5,  _detect_grouped_union),
+    CropDetector('templates',       10.0, 0.9,  _detect_templates),
+]
+MULTI_UNION_DETECTORS = ('horizontal_union', 'ink_union', 'grouped_union')
+
+def score_crop_candidates(page, rects, expected_ar=None, target_wh=None):
+    """
+    Score candidate boxes on the thumbnail in one pass:
+      • rejected if degenerate or its aspect ratio is off by > CASCADE_AR_TOL
+      • size_score  : relative distance from the target size in px (0 if unknown)
+      • border_ink  : ink px on the 5px border, normalised by the box area
+    Returns (score, border_ink, ok) arrays; score = size_score + border_ink * 0.5,
+    lower is better, and only entries with ok set are valid.
+    """
+    r = np.rint(np.asarray(rects, dtype=np.float64)).astype(np.int64).reshape(-1, 4)
+    w = (r[:, 2] - r[:, 0]).astype(np.float64)
+    h = (r[:, 3] - r[:, 1]).astype(np.float64)
+    ok = (w > 0) & (h > 0)
+    safe_h = np.where(ok, h, 1.0)
+
+    if expected_ar:
+        ok &= np.abs(w / safe_h - expected_ar) / expected_ar <= CASCADE_AR_TOL
+
+    size_score = 0.0
+    if target_wh:
+        target_w, target_h = target_wh
+        size_score = np.abs(w - target_w) / target_w + np.abs(h - target_h) / target_h
+
+    pen = score_border_ink(page.ink_integral, r, page.px(5))
+    border_ink = pen / np.where(ok, w * h, 1.0)
+    return size_score + border_ink * 0.5, border_ink, ok
+
+def _refine_cost(page, rects, target_wh, origin, edge, radius):
+    """
+    Local-search objective for (N, 4) int rects: the inked fraction of the
+    border strips, plus relative distance from the target size when known.
+    A small quadratic pull towards `origin` keeps ties (all-white borders)
+    in place and splits any resize evenly between opposite edges.  Rects
+    leaving the page, or with an edge more than `radius` px from `origin`,
+    cost inf.
+    """
+    w = rects[:, 2] - rects[:, 0]
+    h = rects[:, 3] - rects[:, 1]
+    ink = score_border_ink(page.ink_integral, rects, edge)
+    cost = ink / np.maximum(2 * (w + h) * edge, 1).astype(np.float64)
+    if target_wh:
+        target_w, target_h = target_wh
+        cost = cost + np.abs(w - target_w) / target_w + np.abs(h - target_h) / target_h
+    cost = cost + 1e-5 * ((rects - origin) ** 2).sum(axis=1)
+    H, W = page.shape
+    bad = ((w <= 2 * edge) | (h <= 2 * edge) | (rects[:, 0] < 0) | (rects[:, 1] < 0)
+           | (rects[:, 2] > W) | (rects[:, 3] > H)
+           | (np.abs(rects - origin) > radius).any(axis=1))
+    cost[bad] = np.inf
+    return cost
+
+def refine_crop_rect(page, rect, target_wh=None, radius=REFINE_RADIUS, passes=REFINE_PASSES):
+    """
+    Local search around `rect` (x0, y0, x1, y1 on the page): each pass moves
+    the left/right edges jointly, then top/bottom, to the offsets of lowest
+    _refine_cost — every offset pair scored in one vectorized call on the
+    ink integral.  Later passes search around the current box, but no edge
+    ever ends more than ±radius (px at DPI) from where it started, nor off
+    the page.  Each edge is then placed to sub-pixel precision by fitting a
+    parabola through its cost at -1/0/+1 px.  Returns the refined rect as floats.
+    """
+    r, edge = page.px(radius), page.px(5)
+    H, W = page.shape
+    origin = np.rint(np.asarray(rect, dtype=np.float64)).astype(np.int64)
+    origin = np.clip(origin, 0, [W, H, W, H])
+    cur = origin.copy()
+
+    d = np.arange(-r, r + 1)
+    da, db = (a.ravel() for a in np.meshgrid(d, d, indexing='ij'))
+    for _ in range(passes):
+        moved = False
+        for lo, hi in ((0, 2), (1, 3)):
+            cands = np.repeat(cur[None], da.size, axis=0)
+            cands[:, lo] += da
+            cands[:, hi] += db
+            cost = _refine_cost(page, cands, target_wh, origin, edge, r)
+            k = int(np.argmin(cost))
+            if np.isfinite(cost[k]) and (cands[k] != cur).any():
+                cur, moved = cands[k], True
+        if not moved:
+            break
+
+    out = cur.astype(np.float64)
+    for i in range(4):
+        probe = np.repeat(cur[None], 3, axis=0)
+        probe[:, i] += (-1, 0, 1)
+        c = _refine_cost(page, probe, target_wh, origin, edge, r)
+        denom = c[0] - 2 * c[1] + c[2]
+        if np.isfinite(c).all() and denom > 0:
+            out[i] += float(np.clip(0.5 * (c[0] - c[2]) / denom, -0.5, 0.5))
+    return tuple(float(v) for v in out)
+
+def run_crop_cascade(page, ctx, target_wh=None, detectors=CROP_DETECTORS, trace=None,
+                     refine=REFINE_CROP):
+    """
+    Run `detectors` cheapest first until one yields a trusted, clean candidate.
+    With `refine`, each detector's best box (or, if none passes the AR check
+    but the target size is known, its closest one) is also offered refined by
+    refine_crop_rect, so a near miss can end the cascade instead of falling
+    through to the costlier detectors.  Trusted frame/corner-mark boxes are
+    left as found: their edges sit on the marks by construction.
+    Returns (score, rect, detector_name) for the best candidate seen, or None.
+    `trace` (a dict) collects which detectors ran / produced a usable box.
+    """
+    trace = {} if trace is None else trace
+    ran, hits = trace.setdefault('ran', []), trace.setdefault('hits', [])
+    best = None
+    for det in sorted(detectors, key=lambda d: d.cost):
+        ran.append(det.name)
+        rects = [tuple(int(v) for v in rect) for rect in det.run(page, ctx)]
+        if not rects:
+            continue
+        scores, border_ink, ok = score_crop_candidates(page, rects, ctx.expected_ar, target_wh)
+        if refine and det.confidence < CASCADE_TRUSTED:
+            if ok.any():
+                seed = int(np.argmin(np.where(ok, scores, np.inf)))
+            elif target_wh:
+                r = np.asarray(rects)
+                seed = int(np.argmin(np.where((r[:, 2] > r[:, 0]) & (r[:, 3] > r[:, 1]),
+                                              scores, np.inf)))
+            else:
+                seed = None
+            if seed is not None:
+                rects.append(refine_crop_rect(page, rects[seed], target_wh))
+                scores, border_ink, ok = score_crop_candidates(page, rects, ctx.expected_ar,
+                                                               target_wh)
+        if not ok.any():
+            continue
+        hits.append(det.name)
+        k = int(np.argmin(np.where(ok, scores, np.inf)))
+        if best is None or scores[k] < best[0]:
+            best = (float(scores[k]), rects[k], det.name)
+        done = bool(ctx.expected_ar) and (
+            det.confidence >= CASCADE_TRUSTED or
+            (det.confidence >= CASCADE_MIN_CONFIDENCE
+             and bool((ok & (border_ink <= CASCADE_MAX_BORDER_INK)).any())))
+        if done and len(ran) < len(detectors):
+            print(f"   · [OK] {det.name} crop met the AR/border-ink thresholds; "
+                  f"skipping {len(detectors) - len(ran)} costlier detector(s)")
+            break
+    return best
+
+# ── Multi-decal sheets ─────────────────────────────────────────────────────────
+# Left/right pairs and colour variants are drawn side by side at the same size.
+# Once the primary crop is known, its siblings are the other boxes of the same
+# size (within MULTI_SIZE_TOL) that overlap neither it nor each other.
+
+def _same_size(w, h, ref_w, ref_h, tol=MULTI_SIZE_TOL):
+    return abs(w - ref_w) / ref_w + abs(h - ref_h) / ref_h <= tol
+
+def _disjoint(rects, taken):
+    """Greedily keep rects (in preference order) that overlap nothing kept or taken."""
+    kept = []
+    for r in rects:
+        if all(rect_intersection(r, t) == 0 for t in taken + kept):
+            kept.append(r)
+    return kept
+
+def find_vector_siblings(doc, primary):
+    """Vector rects (points) the same size as `primary` elsewhere on the sheet."""
+    rects, _ = _vector_rects(doc)
+    pw, ph = primary[2] - primary[0], primary[3] - primary[1]
+    same = [tuple(r) for r in rects if _same_size(r.width, r.height, pw, ph)]
+    same.sort(key=lambda r: abs(r[2] - r[0] - pw) / pw + abs(r[3] - r[1] - ph) / ph)
+    return _disjoint(same, [tuple(primary)])
+
+def find_raster_siblings(page, ctx, primary):
+    """
+    Thumbnail rects the same size as `primary` elsewhere on the sheet.  Each
+    sibling needs evidence of its own, not just room for a box of that size:
+      • corner-template boxes from select_all_crop_candidates
+      • bracket frames: one ink blob whose box spans at least MULTI_MIN_FILL
+        of the primary's width and height
+    and its box must match the primary's aspect ratio within CASCADE_AR_TOL.
+    Loose ink (a title block, a note) never qualifies.
+    """
+    pw, ph = primary[2] - primary[0], primary[3] - primary[1]
+    ar = pw / ph
+
+    def fits(w, h):
+        return (w >= pw * MULTI_MIN_FILL and h >= ph * MULTI_MIN_FILL
+                and abs(w / h - ar) / ar <= CASCADE_AR_TOL and _same_size(w, h, pw, ph))
+
+    cands = []
+    if ctx.template_sets:
+        tsets = scale_template_sets(ctx.template_sets, page.scale)
+        cands += [tuple(r) for r in select_all_crop_candidates(page, tsets)
+                  if fits(r[2] - r[0], r[3] - r[1])]
+
+    if page.n_blobs:
+        frames = [(x, y, x + w, y + h) for x, y, w, h in page.boxes.tolist() if fits(w, h)]
+        frames.sort(key=lambda r: abs(r[2] - r[0] - pw) / pw + abs(r[3] - r[1] - ph) / ph)
+        cands += frames
+    return _disjoint(cands, [tuple(primary)])
+
+def crop_decal_from_pdf(pdf_path, template_sets, dbg_dir=None, dbg_name=None, trace=None):
+    """
+    Render + crop stage for one part: render the first page, parse the
+    dimensions and run the crop fallbacks.
+    Returns (crop_img, h_in, w_in).  If `trace` (a dict) is given it receives
+    'detector' (the winning detector), 'ran' and 'hits', plus what the results
+    cache stores: 'dims', 'rects_pt' and 'uses_templates'.
+    """
+    with DecalDocument(pdf_path, dpi=DETECT_DPI) as doc:
+        crops, h_in, w_in = _crop_decal(doc, template_sets, dbg_dir, dbg_name,
+                                        {} if trace is None else trace)
+    return crops[0], h_in, w_in
+
+def crop_all_decals_from_pdf(pdf_path, template_sets, dbg_dir=None, dbg_name=None, trace=None):
+    """
+    Multi-decal variant of crop_decal_from_pdf: the primary crop plus every
+    same-size sibling on the sheet, all rendered from one open document.
+    Returns ([crop_img, …] in reading order, h_in, w_in).
+    """
+    with DecalDocument(pdf_path, dpi=DETECT_DPI) as doc:
+        return _crop_decal(doc, template_sets, dbg_dir, dbg_name,
+                           {} if trace is None else trace, multi=True)
+
+def _reading_order(rects):
+    """Top-to-bottom rows (a row = centres within half a box height), left to right."""
+    rects = sorted(rects, key=lambda r: (r[1] + r[3]) / 2)
+    rows, out = [], []
+    for r in rects:
+        if rows and (r[1] + r[3]) / 2 - (rows[-1][0][1] + rows[-1][0][3]) / 2 <= (r[3] - r[1]) / 2:
+            rows[-1].append(r)
+        else:
+            rows.append([r])
+    for row in rows:
+        out += sorted(row, key=lambda r: r[0])
+    return out
+
+def _crop_decal(doc, template_sets, dbg_dir, dbg_name, trace, multi=False):
+    # a) Parse dimensions
+    dims = parse_dimensions_from_pdf(doc)
+    h_in, w_in = dims.height_in, dims.width_in
+    expected_ar = (w_in / h_in) if (h_in and w_in) else None
+
+    # b) Log what was read (width is 0.0, never None, when only a length is known)
+    ar_log = f"{expected_ar:.2f}" if expected_ar is not None else "None"
+    print(f"    · Parsed dims → h_in={h_in:.2f}, w_in={w_in:.2f}, expected_ar={ar_log} "
+          f"({dims.source or 'no match'})")
+
+    # c) Vector-first: take the crop straight from the drawing operators and
+    #     render only that clip; raster detection below is the fallback.
+    trace.setdefault('ran', [])
+    trace.setdefault('hits', [])
+    if VECTOR_FIRST:
+        trace['ran'].append('vector')
+        target_pt = (w_in * 72, h_in * 72) if (h_in and w_in) else None
+        rect_pt = detect_vector_crop(doc, expected_ar, target_pt)
+        if rect_pt is not None:
+            print(f"   · [OK] Vector crop (pt): {tuple(round(v, 1) for v in rect_pt)}")
+            trace['hits'].append('vector')
+            trace['detector'] = 'vector'
+            rects_pt = [rect_pt]
+            if multi:
+                rects_pt = _reading_order(rects_pt + find_vector_siblings(doc, rect_pt))
+                print(f"   · Multi-decal: {len(rects_pt)} same-size decal(s) on the sheet")
+            trace['crops'] = len(rects_pt)
+            trace.update(dims=dims, rects_pt=rects_pt, uses_templates=False)
+            return [doc.render(DPI, clip=r) for r in rects_pt], h_in, w_in
+
+    # d) Every raster detector runs on the DETECT_DPI thumbnail and only the
+    #    chosen rectangle is rendered at DPI.
+    page = doc.analysis
+    h_img, w_img = page.shape
+
+    # e) Detector cascade, cheapest first, scored on AR / size / border ink
+    target_wh = (w_in * doc.dpi, h_in * doc.dpi) if (h_in and w_in) else None
+    ctx  = CropContext(expected_ar, template_sets, dbg_dir, dbg_name)
+    best = run_crop_cascade(page, ctx, target_wh, trace=trace)
+
+    # f) If nothing passed, full‐page margin
+    if best is None:
+        m = int(0.01 * min(h_img, w_img))
+        best_rect = (m, m, w_img-m, h_img-m)
+        trace['detector'] = 'full_page'
+        print("   · No candidate passed filters → full-page margin crop.")
+    else:
+        best_score, best_rect, trace['detector'] = best
+        print(f"   · Chosen best crop: {tuple(round(v, 1) for v in best_rect)} via {trace['detector']} "
+              f"(score={best_score:.2f})")
+
+    # g) Multi-decal: every same-size sibling of the chosen box (a full-page or
+    #    union crop spans whatever ink is there, so it has no size to match)
+    rects = [best_rect]
+    uses_templates = 'templates' in trace['ran']
+    if multi and trace['detector'] in MULTI_UNION_DETECTORS + ('full_page',):
+        print(f"   · Multi-decal: {trace['detector']} crop has no decal size to match; "
+              f"sibling search skipped")
+    elif multi:
+        rects = _reading_order(rects + find_raster_siblings(page, ctx, best_rect))
+        uses_templates = True
+        print(f"   · Multi-decal: {len(rects)} same-size decal(s) on the sheet")
+    trace['crops'] = len(rects)
+
+    # h) Perform final crop: render only the chosen rectangle(s) at DPI
+    rects_pt = [doc.to_points(r) for r in rects]
+    trace.update(dims=dims, rects_pt=rects_pt, uses_templates=uses_templates)
+    return [doc.render(DPI, clip=r) for r in rects_pt], h_in, w_in
+
+# ── Crop results cache ─────────────────────────────────────────────────────────
+# Drawings rarely change between runs, so the outcome of parsing + detection is
+# kept per PDF content hash.  A hit only renders the stored clip(s) at DPI.
+
+# module constants that shape a crop; their values join the code version
+RESULT_CACHE_PARAMS = (
+    'DPI', 'DETECT_DPI', 'VECTOR_FIRST', 'VECTOR_SIZE_TOL',
+    'PYRAMID_LEVELS', 'MIN_PYRAMID_TPL', 'REFINE_MARGIN', 'COARSE_PEAKS',
+    'MULTI_SIZE_TOL', 'MULTI_MIN_FILL', 'MULTI_UNION_DETECTORS',
+    'CASCADE_AR_TOL', 'CASCADE_MAX_BORDER_INK', 'CASCADE_MIN_CONFIDENCE', 'CASCADE_TRUSTED',
+    'REFINE_CROP', 'REFINE_RADIUS', 'REFINE_PASSES',
+)
+
+# the crop stage's entry point: every module-level function/class reachable from
+# it (directly, or through module globals such as CROP_DETECTORS) decides the
+# crop, and its source joins the code version, so edits elsewhere in the module
+# (CLI, journal, writers) keep the cache
+RESULT_CACHE_ROOT  = '_crop_decal'
+CROP_CODE_VERSION = 1   # bump for crop changes outside this module (e.g. a dependency)
+
+def _global_refs(node):
+    """Names `node` reads that are not bound locally (args, assignments) inside it."""
+    local, declared = set(), set()
+    for n in ast.walk(node):
+        if isinstance(n, ast.Name) and not isinstance(n.ctx, ast.Load):
+            local.add(n.id)
+        elif isinstance(n, ast.arg):
+            local.add(n.arg)
+        elif isinstance(n, (ast.Global, ast.Nonlocal)):
+            declared.update(n.names)
+    if not isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+        local = set()   # a module-level assignment binds globals
+    local -= declared
+    return {n.id for n in ast.walk(node)
+            if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load) and n.id not in local}
+
+@functools.lru_cache(maxsize=None)
+def crop_code_names():
+    """Sorted names of the module-level functions/classes reachable from RESULT_CACHE_ROOT."""
+    tree = ast.parse(inspect.getsource(sys.modules[__name__]))
+    nodes = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            nodes[node.name] = node
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for t in targets:
+                if isinstance(t, ast.Name):
+                    nodes.setdefault(t.id, node)
+    seen, todo = set(), [RESULT_CACHE_ROOT]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        todo += [n for n in _global_refs(nodes[name]) if n in nodes and n not in seen]
+    # constants are hashed by value (RESULT_CACHE_PARAMS), code by source
+    return tuple(sorted(n for n in seen if isinstance(nodes[n], (ast.FunctionDef, ast.ClassDef))))
+
+@functools.lru_cache(maxsize=None)
+def _crop_source_sha256():
+    h = hashlib.sha256()
+    for name in crop_code_names():
+        h.update(inspect.getsource(globals()[name]).encode())
+    return h.hexdigest()
+
+def crop_code_version():
+    """
+    Hash of CROP_CODE_VERSION, the source of the crop_code_names() objects,
+    the current RESULT_CACHE_PARAMS values, the dimension patterns and the
+    cascade order: a change to how crops are found gives a new version,
+    unrelated edits do not.
+    """
+    params = {name: globals()[name] for name in RESULT_CACHE_PARAMS}
+    # compiled regexes don't serialize: their pattern text and flags stand in
+    params['DIMENSION_PATTERNS'] = [(name, rx.pattern, rx.flags, units, conf)
+                                    for name, rx, units, conf in DIMENSION_PATTERNS]
+    params['CROP_DETECTORS'] = [(d.name, d.cost, d.confidence) for d in CROP_DETECTORS]
+    params['CROP_CODE_VERSION'] = CROP_CODE_VERSION
+    h = hashlib.sha256(_crop_source_sha256().encode())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+def template_fingerprint(template_sets):
+    """Hash of the corner templates' pixels, offsets and order."""
+    h = hashlib.sha256()
+    for tset in template_sets:
+        for quad in sorted(tset.templates):
+            tpl = np.ascontiguousarray(tset.templates[quad])
+            h.update(f"{quad}{tpl.shape}{tset.offsets[quad]}".encode())
+            h.update(tpl.tobytes())
+    return h.hexdigest()[:16]
+
+class CachedCrop(NamedTuple):
+    dims:     Dimensions
+    rects_pt: list      # [(x0, y0, x1, y1), …] in PDF points, reading order
+    detector: str
+
+class ResultCache:
+    """
+    Persistent crop results per drawing: a SQLite table keyed by the PDF's
+    SHA-256, the crop_code_version() and single/multi mode, holding the parsed
+    Dimensions, the crop rectangle(s) in PDF points and the winning detector.
+
+    Results that consulted the corner templates also record the
+    template_fingerprint() they were made with, so a template change misses
+    only those entries; the rest stay valid.  Entries unused for `ttl`
+    seconds are dropped when the cache is opened.  One connection per
+    process (render workers each open their own).
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, ttl=RESULT_CACHE_TTL):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS crops (
+                sha256       TEXT NOT NULL,
+                code_version TEXT NOT NULL,
+                multi        INTEGER NOT NULL,
+                templates    TEXT,
+                dims         TEXT NOT NULL,
+                rects_pt     TEXT NOT NULL,
+                detector     TEXT,
+                created      REAL NOT NULL,
+                used         REAL NOT NULL,
+                PRIMARY KEY (sha256, code_version, multi)
+            )""")
+        self._db.execute("DELETE FROM crops WHERE used < ?", (time.time() - ttl,))
+        self._db.commit()
+
+    def get(self, sha, multi, templates):
+        """The CachedCrop for this drawing, or None (absent, or made with other templates)."""
+        row = self._db.execute(
+            "SELECT templates, dims, rects_pt, detector FROM crops "
+            "WHERE sha256 = ? AND code_version = ? AND multi = ?",
+            (sha, crop_code_version(), int(multi))).fetchone()
+        if row is None or (row[0] is not None and row[0] != templates):
+            return None
+        self._db.execute(
+            "UPDATE crops SET used = ? WHERE sha256 = ? AND code_version = ? AND multi = ?",
+            (time.time(), sha, crop_code_version(), int(multi)))
+        self._db.commit()
+        dims = json.loads(row[1])
+        dims[-1] = tuple(dims[-1]) if dims[-1] else None
+        return CachedCrop(Dimensions(*dims), [tuple(r) for r in json.loads(row[2])], row[3])
+
+    def put(self, sha, multi, trace, templates):
+        """
+        Store the crop described by a _crop_decal trace.  `templates` is the
+        current fingerprint; it is kept only if the trace used the templates.
+        """
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO crops VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sha, crop_code_version(), int(multi),
+             templates if trace.get('uses_templates') else None,
+             json.dumps(list(trace['dims'])), json.dumps([list(r) for r in trace['rects_pt']]),
+             trace.get('detector'), now, now))
+        self._db.commit()
+
+_result_cache = None   # False once it could not be opened in this process
+
+def get_result_cache():
+    """This process's ResultCache, or None when disabled or it can't be opened."""
+    global _result_cache
+    if not RESULT_CACHE_ENABLED:
+        return None
+    if _result_cache is None:
+        try:
+            # the code version reads the module source, which a frozen or
+            # .pyc-only build does not ship: no version, no cache
+            crop_code_version()
+            _result_cache = ResultCache()
+        except (OSError, TypeError, sqlite3.Error) as e:
+            print(f"   · [WARN] Results cache unavailable ({e}); detecting every part")
+            _result_cache = False
+    return _result_cache or None
+
+# ── Part pipeline ──────────────────────────────────────────────────────────────
+# Stage 1 (threads)  : fetch_pdf_via_api → PDF bytes (temp_pdfs/ with --keep-pdfs)
+#        (or asyncio): helper.fetch_pdfs_async when FETCH_MODE == "async"
+# Stage 2 (processes): render + crop     → crop array, dims
+# Stage 3 (caller)   : write JPG, record
+# The feeder takes one of MAX_PENDING_PDFS slots before each download and the
+# writer hands it back once the part is recorded, so no more PDFs are held.
+
+_WORKER_TEMPLATES = None
+_WORKER_TEMPLATE_FP = None
+
+def _init_render_worker(template_sets):
+    """
+    Process-pool initializer: keep the template sets (and their fingerprint)
+    resident per worker.  A TemplateBank arrives as its file path and is
+    memory-mapped here.
+    """
+    global _WORKER_TEMPLATES, _WORKER_TEMPLATE_FP
+    _WORKER_TEMPLATES = template_sets
+    _WORKER_TEMPLATE_FP = template_fingerprint(template_sets)
+
+def process_part_pdf(pdf_path, part, dbg_dir, multi=False):
+    """
+    Stage 2 entry point (runs inside a worker process).  `pdf_path` is the
+    downloaded PDF's bytes, or its path when PDFs are kept on disk.  An
+    unchanged drawing found in the results cache is only rendered; otherwise
+    the crop stage runs and its outcome is cached.
+    """
+    cache = get_result_cache()
+    sha   = None
+    if cache:
+        sha = (_file_sha256(pdf_path) if isinstance(pdf_path, str)
+               else hashlib.sha256(pdf_path).hexdigest())
+    hit   = None
+    if cache:
+        try:
+            hit = cache.get(sha, multi, _WORKER_TEMPLATE_FP)
+        except sqlite3.Error as e:
+            # e.g. "database is locked" by another render worker: just a miss
+            print(f"   · [WARN] Could not read the cached crop for {part}: {e}")
+    if hit is not None:
+        print(f"   · [CACHE] {part}: {len(hit.rects_pt)} crop(s) via {hit.detector} reused")
+        with DecalDocument(pdf_path, dpi=DETECT_DPI) as doc:
+            crops = [doc.render(DPI, clip=r) for r in hit.rects_pt]
+        trace = {'detector': hit.detector, 'crops': len(crops), 'cached': True}
+        return crops, hit.dims.height_in, hit.dims.width_in, trace
+
+    trace = {}
+    if multi:
+        crops, h_in, w_in = crop_all_decals_from_pdf(pdf_path, _WORKER_TEMPLATES, dbg_dir=dbg_dir,
+                                                     dbg_name=part, trace=trace)
+    else:
+        crop_img, h_in, w_in = crop_decal_from_pdf(pdf_path, _WORKER_TEMPLATES, dbg_dir=dbg_dir,
+                                                   dbg_name=part, trace=trace)
+        crops = [crop_img]
+    if cache:
+        try:
+            cache.put(sha, multi, trace, _WORKER_TEMPLATE_FP)
+        except sqlite3.Error as e:
+            print(f"   · [WARN] Could not cache the crop for {part}: {e}")
+    return crops, h_in, w_in, trace
+
+def run_part_pipeline(parts, tmp_dir, dbg_dir, template_sets,
+                      fetch_workers=FETCH_WORKERS,
+                      render_workers=RENDER_WORKERS,
+                      max_pending=MAX_PENDING_PDFS,
+                      fetch_mode=FETCH_MODE,
+                      multi=MULTI_DECAL):
+    """
+    Drive `parts` (an iterable of (part, tms)) through the download and
+    render/crop stages concurrently.  Yields, in completion order:
+
+        (i, part, tms, pdf, result, error)
+
+    - pdf is the downloaded PDF's bytes, or with `tmp_dir` the path of the
+      copy written there; None when there is no document for the part
+    - result is ([crop_img, …], h_in, w_in, trace) from process_part_pdf, or None
+      (one crop, or with `multi` every same-size decal on the sheet)
+    - error is the exception raised by a stage, or None; a fetch that fails
+      (network, HTTP, DNS) carries its error, while a part the API has no
+      document for has neither a result nor an error
+
+    The consumer is the writer stage: the PDF slot is released once it has
+    handled a result, so at most `max_pending` PDFs are held at a time.
+
+    A part the API refuses with a 403 is not yielded: the new key is asked for
+    here, on the consumer's thread, and the part is fetched again with it (on
+    the download threads, in either fetch_mode).  Other parts the old key
+    failed are re-fetched the same way without asking again.
+
+    An error reading `parts` (e.g. a corrupt sheet) ends the input; the parts
+    already handed out are still yielded, then the error is raised here.
+
+    fetch_mode "async" replaces the download thread pool with one event loop
+    running helper.fetch_pdfs_async (`fetch_workers` parts in flight).
+    """
+    results  = queue.Queue()
+    slots    = threading.Semaphore(max_pending)
+    stop     = threading.Event()
+    fetch_pool  = ThreadPoolExecutor(max_workers=fetch_workers)
+    render_pool = ProcessPoolExecutor(max_workers=render_workers,
+                                      initializer=_init_render_worker,
+                                      initargs=(template_sets,))
+
+    def _rendered(job, fut):
+        try:
+            results.put((*job, fut.result(), None))
+        except Exception as e:
+            results.put((*job, None, e))
+
+    def _render(i, part, tms, pdf):
+        try:
+            fut = render_pool.submit(process_part_pdf, pdf, part, dbg_dir, multi)
+        except Exception as e:
+            results.put((i, part, tms, pdf, None, e))
+            return
+        fut.add_done_callback(functools.partial(_rendered, (i, part, tms, pdf)))
+
+    def _fetch(i, part, tms):
+        try:
+            pdf = fetch_pdf_via_api(part, tmp_dir)
+        except Exception as e:
+            results.put((i, part, tms, None, None, e))
+            return
+        if not pdf:
+            results.put((i, part, tms, None, None, None))
+            return
+        _render(i, part, tms, pdf)
+
+    def _gated():
+        """
+        Enumerate `parts`, taking a PDF slot before handing each one out.  An
+        error reading them ends the input and goes to the consumer.
+        """
+        try:
+            for i, (part, tms) in enumerate(parts):
+                while not slots.acquire(timeout=0.5):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                yield i, part, tms
+        except Exception as e:
+            results.put(e)
+
+    def _feed():
+        n = 0
+        try:
+            for i, part, tms in _gated():
+                fetch_pool.submit(_fetch, i, part, tms)
+                n += 1
+        finally:
+            results.put(n)   # an int marks the end of the input: total submitted
+
+    def _feed_async():
+        jobs = {}   # part → [(i, tms), …] still waiting on a download
+        n = 0
+
+        def _parts():
+            nonlocal n
+            for i, part, tms in _gated():
+                jobs.setdefault(part, []).append((i, tms))
+                n += 1
+                yield part
+
+        async def _consume():
+            async for part, res in helper.fetch_pdfs_async(_parts(), tmp_dir,
+                                                           concurrency=fetch_workers):
+                i, tms = jobs[part].pop(0)
+                if isinstance(res, Exception):
+                    # reported as 'failed', exactly like a raise in the thread fetcher
+                    results.put((i, part, tms, None, None, res))
+                elif not res:
+                    results.put((i, part, tms, None, None, None))
+                else:
+                    _render(i, part, tms, res)
+
+        try:
+            asyncio.run(_consume())
+        except Exception as e:
+            # e.g. aiohttp missing: fail whatever was already handed out
+            for part, waiting in jobs.items():
+                for i, tms in waiting:
+                    results.put((i, part, tms, None, None, e))
+        finally:
+            results.put(n)
+
+    feeder = threading.Thread(target=_feed_async if fetch_mode == "async" else _feed,
+                              name="part-feeder", daemon=True)
+    feeder.start()
+
+    total, seen, feed_error = None, 0, None
+    try:
+        while total is None or seen < total:
+            item = results.get()
+            if isinstance(item, int):
+                total = item
+                continue
+            if isinstance(item, Exception):
+                feed_error = item
+                continue
+            if isinstance(item[5], helper.ApiKeyRejected):
+                # the first rejection prompts for a new key here on the caller's
+                # thread, later ones with the same key do not; either way the
+                # part keeps its slot and is fetched again
+                helper.replace_api_key(item[5].key)
+                fetch_pool.submit(_fetch, *item[:3])
+                continue
+            seen += 1
+            try:
+                yield item
+            finally:
+                slots.release()
+        if feed_error is not None:
+            raise feed_error
+    finally:
+        stop.set()
+        fetch_pool.shutdown(wait=True, cancel_futures=True)
+        render_pool.shutdown(wait=True, cancel_futures=True)
+
+def _cell_str(value):
+    """Spreadsheet cell → clean string (integral floats lose their '.0')."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def _iter_sheet_rows(path):
+    """Yield raw (part, tms) pairs from an .xlsx/.csv/.txt parts list."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        import openpyxl
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            # first row is the header; only the PART and TMS columns are read
+            for row in ws.iter_rows(min_row=2, max_col=2, values_only=True):
+                row = tuple(row) + (None, None)
+                yield _cell_str(row[0]), _cell_str(row[1])
+        finally:
+            wb.close()
+    elif ext == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            next(reader, None)   # header
+            for row in reader:
+                row = row + ['', '']
+                yield _cell_str(row[0]), _cell_str(row[1])
+    else:
+        # plain text: one part per line, optional TMS after a tab/comma/space;
+        # a "PART …" header line is recognised by its text wherever it sits
+        # (after blank lines, or behind a stray BOM of a concatenated file)
+        with open(path, encoding='utf-8-sig') as f:
+            for line in f:
+                line = line.replace('\ufeff', '').strip()
+                if not line or line.startswith('#'):
+                    continue
+                fields = re.split(r'\s*[\t,]\s*', line) if re.search(r'[\t,]', line) else line.split()
+                fields = fields + ['', '']
+                if fields[0].upper() == 'PART':
+                    continue
+                yield fields[0], fields[1]
+
+def iter_parts(path):
+    """
+    Lazily read (part, tms) pairs from the first two columns of a parts list
+    (.xlsx via openpyxl read-only mode, .csv, or plain text), skipping blank
+    rows.  A part number that appears again is dropped so it is fetched and
+    processed only once.
+    """
+    seen = set()
+    for part, tms in _iter_sheet_rows(path):
+        if not part:
+            continue
+        if part in seen:
+            print(f"· Duplicate part {part} (TMS={tms}) skipped")
+            continue
+        seen.add(part)
+        yield part, tms
+
+class RunJournal:
+    """
+    Append-only record of a run, so a crash costs only the parts in flight.
+
+    out_dir/run.json      : how the run was started (sheet, seq, timestamp)
+    out_dir/journal.jsonl : one line per finished part —
+                            {part, tms, status, record, error}
+                            status is 'ok', 'missing' (no document) or 'failed';
+                            record is a list when a multi-decal sheet gave
+                            several crops (one Cubiscan row each)
+
+    Each line is flushed as soon as the writer stage finishes a part.
+    """
+    META_NAME    = 'run.json'
+    JOURNAL_NAME = 'journal.jsonl'
+
+    def __init__(self, out_dir):
+        self.meta_path    = os.path.join(out_dir, self.META_NAME)
+        self.journal_path = os.path.join(out_dir, self.JOURNAL_NAME)
+        self._fh = None
+
+    def write_meta(self, **meta):
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    def read_meta(self):
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def entries(self):
+        """Yield every complete journal line; a torn line (crash mid-write) is skipped."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def append(self, part, tms, status, record, error=None):
+        if self._fh is None:
+            torn = False
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path):
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b'\n'
+            self._fh = open(self.journal_path, 'a', encoding='utf-8')
+            if torn:
+                self._fh.write('\n')   # seal a line cut short by a crash
+        self._fh.write(json.dumps({'part': part, 'tms': tms, 'status': status,
+                                   'record': record, 'error': error},
+                                  default=str) + '\n')
+        self._fh.flush()
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+class CubiscanWriter:
+    """
+    Streams Cubiscan records to cubiscan/cubiscan.csv as the writer stage
+    produces them, so memory stays flat on any sheet size.  Rows are flushed
+    every `flush_every` records (and on close), so a crashed run still leaves
+    a readable CSV up to the last flush.
+    """
+    FILE_NAME = 'cubiscan.csv'
+    COLUMNS = ['ITEM_ID', 'NET_LENGTH', 'NET_WIDTH', 'NET_HEIGHT', 'NET_WEIGHT',
+               'NET_VOLUME', 'IMAGE_FILE_NAME', 'UPDATED', 'TIME_STAMP',
+               'SITE_ID', 'FACTOR']
+
+    def __init__(self, cub_dir, flush_every=CUBISCAN_FLUSH_ROWS):
+        self.path = os.path.join(cub_dir, self.FILE_NAME)
+        self.flush_every = max(1, flush_every)
+        self.rows = 0
+        self._fh = open(self.path, 'w', newline='', encoding='utf-8')
+        self._csv = csv.DictWriter(self._fh, fieldnames=self.COLUMNS, extrasaction='ignore')
+        self._csv.writeheader()
+        self._fh.flush()
+
+    def write(self, record):
+        self._csv.writerow(record)
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+class DetectorStats:
+    """
+    Tallies the crop traces of a run so the cascade order can be tuned:
+    per detector, how often it ran, how often it produced a usable
+    (AR-passing) box, and how often its box was the one saved.  Parts served
+    from the results cache ran nothing, so they are kept out of those rates
+    and reported on their own line (by the detector that originally won).
+    """
+    def __init__(self):
+        self.parts  = 0
+        self.runs   = {}
+        self.hits   = {}
+        self.wins   = {}
+        self.cached = {}
+
+    def add(self, trace):
+        name = trace.get('detector')
+        if trace.get('cached'):
+            self.cached[name] = self.cached.get(name, 0) + 1
+            return
+        self.parts += 1
+        for ran in trace.get('ran', ()):
+            self.runs[ran] = self.runs.get(ran, 0) + 1
+        for hit in trace.get('hits', ()):
+            self.hits[hit] = self.hits.get(hit, 0) + 1
+        if name:
+            self.wins[name] = self.wins.get(name, 0) + 1
+
+    def report(self):
+        lines = []
+        if self.parts:
+            lines.append(f"· Crop detectors over {self.parts} parts (hit rate = usable box / runs):")
+            names = list(self.runs) + [n for n in self.wins if n not in self.runs]
+            for name in names:
+                runs, hits, wins = self.runs.get(name, 0), self.hits.get(name, 0), self.wins.get(name, 0)
+                rate = f"{hits / runs:4.0%}" if runs else "   –"
+                lines.append(f"    {name:<17} ran {runs:>4}  hit {hits:>4} ({rate})  won {wins:>4}")
+        if self.cached:
+            by = ", ".join(f"{n} {k}" for n, k in sorted(self.cached.items(),
+                                                          key=lambda kv: -kv[1]))
+            lines.append(f"· {sum(self.cached.values())} part(s) reused a cached crop ({by})")
+        return lines
+
+def _journal_key(part, tms):
+    return (str(part), str(tms))
+
+def main(input_sheet, output_root, seq=105, resume_dir=None, multi=MULTI_DECAL,
+         layers=EXPORT_LAYERS, keep_pdfs=KEEP_PDFS):
+    """
+    Process every row of `input_sheet` into a fresh decal_output_<date>[_N]
+    folder under `output_root`.  With `resume_dir`, continue that earlier run
+    instead: parts its journal marks 'ok' or 'missing' are skipped, failed
+    ones are retried, and the sheet/seq/timestamp/multi/layers come from its run.json.
+    With `multi`, every same-size decal on a sheet is saved as
+    <tms>.<part>.<seq>.<k>.jpg with one Cubiscan record each.
+    With `layers`, each crop also gets a transparent PNG per COLOR_MAP colour
+    under layers/.  Downloads stay in memory; `keep_pdfs` also writes each one
+    to temp_pdfs/ and leaves it there for debugging.
+    """
     # 1) grab the key exactly once from the helper
     api_key = get_valid_api_key()    # this also sets DecalExtract_helper.API_KEY internally
     if not api_key.strip():
         print("[ERROR] No API key provided; exiting.")
         sys.exit(1)
+    # one keep-alive connection per fetch thread
+    helper.configure_session(pool_size=max(FETCH_WORKERS, helper.HTTP_POOL_SIZE))
 
     # ─── Prepare output directories ────────────────────────────────────────────
-    today     = datetime.datetime.now().strftime('%m%d%Y')
-    base_name = f"decal_output_{today}"
-    out_dir   = os.path.join(output_root, base_name)
-    idx = 1
-    while os.path.exists(out_dir):
-        out_dir = os.path.join(output_root, f"{base_name}_{idx}")
-        idx += 1
-    os.makedirs(out_dir)
+    if resume_dir:
+        out_dir = resume_dir
+        journal = RunJournal(out_dir)
+        meta    = journal.read_meta()
+        input_sheet = input_sheet or meta['input_sheet']
+        seq     = meta.get('seq', seq)
+        multi   = meta.get('multi', multi)
+        layers  = meta.get('layers', layers)
+        ts      = meta['time_stamp']
+    else:
+        today     = datetime.datetime.now().strftime('%m%d%Y')
+        base_name = f"decal_output_{today}"
+        out_dir   = os.path.join(output_root, base_name)
+        idx = 1
+        while os.path.exists(out_dir):
+            out_dir = os.path.join(output_root, f"{base_name}_{idx}")
+            idx += 1
+        os.makedirs(out_dir)
+        journal = RunJournal(out_dir)
+        ts      = datetime.datetime.now().strftime('%Y%m%d_%H%M') + '00'
+        journal.write_meta(input_sheet=os.path.abspath(input_sheet), seq=seq, time_stamp=ts,
+                           multi=multi, layers=layers)
     imgs_dir = os.path.join(out_dir, 'images')
     dbg_dir  = os.path.join(out_dir, 'debugging')
     cub_dir  = os.path.join(out_dir, 'cubiscan')
-    tmp_dir  = os.path.join(out_dir, 'temp_pdfs')
-    for d in (imgs_dir, dbg_dir, cub_dir, tmp_dir):
+    tmp_dir  = os.path.join(out_dir, 'temp_pdfs') if keep_pdfs else None
+    lyr_dir  = os.path.join(out_dir, 'layers')
+    for d in (imgs_dir, dbg_dir, cub_dir, tmp_dir, lyr_dir if layers else None):
+        if d is None:
+            continue
         os.makedirs(d, exist_ok=True)
 
     # ─── Load templates once ───────────────────────────────────────────────────
     template_sets = load_template_sets('templates')
     print(f"· Loaded {len(template_sets)} template sets for corner detection")
 
-    # ─── Read parts list ───────────────────────────────────────────────────────
-    df = pd.read_excel(input_sheet, dtype=str)
-    df.columns = df.columns.str.upper()
-    df.rename(columns={df.columns[0]: 'PART', df.columns[1]: 'TMS'}, inplace=True)
-    records = []
-    ts = datetime.datetime.now().strftime('%Y%m%d_%H%M') + '00'
-
-    # ─── Loop over each row ────────────────────────────────────────────────────
-    for i, row in df.iterrows():
-        original_part = row['PART'].strip()
-        tms           = row['TMS']
+    # ─── Read parts list (streamed, de-duplicated) ─────────────────────────────
+    parts = iter_parts(input_sheet)
+    records = CubiscanWriter(cub_dir)
+    detectors = DetectorStats()
+    started = time.monotonic()
+    n_ok = n_missing = n_failed = 0
+
+    # ─── Resume: replay the journal, skip what already finished ───────────────
+    #     (the journal is the source of truth; cubiscan.csv is rebuilt from it)
+    if resume_dir:
+        done = set()
+        for entry in journal.entries():
+            key = _journal_key(entry['part'], entry['tms'])
+            if entry['status'] in ('ok', 'missing') and key not in done:
+                done.add(key)
+                recs = entry['record']
+                for rec in (recs if isinstance(recs, list) else [recs]):
+                    records.write(rec)
+        print(f"· Resuming {out_dir}: {len(done)} parts already finished")
+        parts = (p for p in parts if _journal_key(*p) not in done)
+
+    # ─── Writer stage: consume parts as the pipeline finishes them ────────────
+    for i, original_part, tms, pdf, result, err in run_part_pipeline(
+            parts, tmp_dir, dbg_dir, template_sets, multi=multi):
         print(f"[{i}] ➡️ Processing part={original_part}, TMS={tms}")
 
-        # 1) Download PDF via API
-        pdf_path = fetch_pdf_via_api(original_part, tmp_dir)
-        if not pdf_path:
-            print(f"    · No document found for {original_part}; skipping.")
-            records.append({
+        if err is not None or result is None:
+            if err is not None:
+                n_failed += 1
+                print(f"    · [ERROR] {original_part}: {type(err).__name__}: {err}")
+            else:
+                n_missing += 1
+                print(f"    · No document found for {original_part}; skipping.")
+            record = {
                 'ITEM_ID':        original_part,
                 'NET_LENGTH':     0,
                 'NET_WIDTH':      0,
@@ -997,161 +2804,101 @@ def main(input_sheet, output_root, seq=105):
                 'TIME_STAMP':     ts,
                 'SITE_ID':        SITE_ID,
                 'FACTOR':         FACTOR,
-            })
+            }
+            records.write(record)
+            journal.append(original_part, tms, 'failed' if err is not None else 'missing',
+                           record, error=f"{type(err).__name__}: {err}" if err is not None else None)
             continue
 
-        print(f"    · PDF downloaded → {pdf_path}")
-
-        # a) Render first page to BGR image & build “ink” mask
-        img = render_pdf_color_page(pdf_path, dpi=DPI)
-        h_img, w_img = img.shape[:2]
-
-        # b) Parse dimensions
-        h_in, w_in = parse_dimensions_from_pdf(pdf_path)
-        # if parse only returned a length (w_in=None), coerce to 0.0 so math still works
-        if w_in is None:
-            w_in = 0.0
-        expected_ar = (w_in / h_in) if (h_in and w_in) else None
-        
-        # c) Guard logging so we never try to format None as a float
-        w_log  = f"{w_in:.2f}"       if w_in        is not None else "None"
-        ar_log = f"{expected_ar:.2f}" if expected_ar is not None else "None"
-        print(f"    · Parsed dims → h_in={h_in:.2f}, w_in={w_log}, expected_ar={ar_log}")
-
-        # d) Crop logic (unified fallbacks)
-        print("   · Attempting bracket crop…")
-        gray_for_rect = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        rect = detect_enclosed_box(gray_for_rect, min_area=5000)
-
-        candidates = []
-        # 1) bracket if it matches aspect-ratio
-        if rect and expected_ar:
-            w0, h0 = rect[2]-rect[0], rect[3]-rect[1]
-            ar0 = w0/float(h0) if h0 else 0
-            if abs(ar0 - expected_ar)/expected_ar < 0.10:
-                print(f"   · [OK] Using bracket crop: {rect}")
-                candidates = [rect]
-        # if no bracket, collect all other fallbacks:
-        if not candidates:
-            # 2) corner‐templates
-            try:
-                tpl_rect = select_best_crop_box(img, template_sets, expected_ar)
-                candidates.append(tpl_rect)
-            except:
-                pass
-
-            # 3) legacy multiband (if still needed)
-            if img.shape[1] > img.shape[0] * 1.8:
-                try:
-                    for mb in legacy_multiband_crop(img, return_all=True):
-                        candidates.append(mb)
-                except:
-                    pass
-
-            # 4) nearby‐blob grouping
-            r = find_nearby_blob_group(img, min_area=1000, tol=50, pad=20)
-            if r: candidates.append(r)
-
-            # 5) horizontal‐union
-            r = find_horizontal_aligned_union(img, min_area=2000, tol=250, pad_pct=0.05)
-            if r: candidates.append(r)
-
-            # 6) clustered‐contour union
-            r = find_grouped_union_of_ink_contours(img, min_area=500, pad_pct=0.05)
-            if r: candidates.append(r)
-
-            # 7) union‐of‐all‐ink fallback
-            r = find_union_of_ink_contours(img, min_area=500, pad_pct=0.05,
-                                           dbg_dir=dbg_dir, dbg_name=original_part)
-            if r: candidates.append(r)
-
-        # e) Score all candidates and pick the best
-        target_w = int(w_in * DPI) if w_in else None
-        target_h = int(h_in * DPI) if h_in else None
-
-        best_score = float('inf')
-        best_rect  = None
-
-        for (x0,y0,x1,y1) in candidates:
-            w, h = x1-x0, y1-y0
-            if w<=0 or h<=0: 
-                continue
-
-            # AR check
-            if expected_ar:
-                ar = w/float(h)
-                if abs(ar - expected_ar)/expected_ar > 0.10:
-                    continue
-
-            # size proximity
-            size_score = 0.0
-            if target_w and target_h:
-                size_score = abs(w-target_w)/target_w + abs(h-target_h)/target_h
-
-            # border‐ink penalty (5px border)
-            e = 5
-            top    = mask_all[y0:y0+e,   x0:x1]
-            bottom = mask_all[y1-e:y1,   x0:x1]
-            left   = mask_all[y0:y1,    x0:x0+e]
-            right  = mask_all[y0:y1,    x1-e:x1]
-            pen = float(top.sum() + bottom.sum() + left.sum() + right.sum())
-            norm_pen = pen / float((w*h) or 1)
-
-            total_score = size_score + norm_pen * 0.5
-            if total_score < best_score:
-                best_score = total_score
-                best_rect  = (x0,y0,x1,y1)
-
-        # f) If nothing passed, full‐page margin
-        if best_rect is None:
-            m = int(0.01 * min(h_img, w_img))
-            best_rect = (m, m, w_img-m, h_img-m)
-            print("   · No candidate passed filters → full-page margin crop.")
-        else:
-            print(f"   · Chosen best crop: {best_rect} (score={best_score:.2f})")
-
-        # g) Perform final crop
-        x0, y0, x1, y1 = best_rect
-        crop_img = img[y0:y1, x0:x1]
-
-        # ─── Save the cropped image ─────────────────────────────────────────────
-        print(f"   · Final crop size: {crop_img.shape[1]}×{crop_img.shape[0]}")
-        jpg_name = f"{tms}.{original_part}.{seq}.jpg"
-        out_jpg  = os.path.join(imgs_dir, jpg_name)
-        cv2.imwrite(out_jpg, crop_img)
-        print(f"   · Writing JPEG → {out_jpg}")
-
-        # ─── Clean up & record ──────────────────────────────────────────────────
-        os.remove(pdf_path)
-        time.sleep(STEP_DELAY)
+        print(f"    · PDF downloaded → {helper.describe_pdf(pdf)}")
+        crops, h_in, w_in, trace = result
+        detectors.add(trace)
 
+        # ─── Save the cropped image(s) ──────────────────────────────────────────
+        #     a single decal keeps the classic name; a multi-decal sheet is indexed
         vol = h_in * w_in * THICKNESS_IN
         wgt = vol * MATERIAL_DENSITY
-        records.append({
-            'ITEM_ID':         original_part,
-            'NET_LENGTH':      h_in,
-            'NET_WIDTH':       w_in,
-            'NET_HEIGHT':      THICKNESS_IN,
-            'NET_WEIGHT':      wgt,
-            'NET_VOLUME':      vol,
-            'IMAGE_FILE_NAME': jpg_name,
-            'UPDATED':         'Y',
-            'TIME_STAMP':      ts,
-            'SITE_ID':         SITE_ID,
-            'FACTOR':          FACTOR,
-        })
+        part_records = []
+        for k, crop_img in enumerate(crops, 1):
+            print(f"   · Final crop size: {crop_img.shape[1]}×{crop_img.shape[0]}")
+            suffix   = f".{k}" if len(crops) > 1 else ""
+            jpg_name = f"{tms}.{original_part}.{seq}{suffix}.jpg"
+            out_jpg  = os.path.join(imgs_dir, jpg_name)
+            cv2.imwrite(out_jpg, crop_img)
+            print(f"   · Writing JPEG → {out_jpg}")
+            if layers:
+                pngs = export_color_layers(crop_img, lyr_dir, os.path.splitext(jpg_name)[0])
+                print(f"   · Wrote {len(pngs)} colour layers → {lyr_dir}")
+            part_records.append({
+                'ITEM_ID':         original_part,
+                'NET_LENGTH':      h_in,
+                'NET_WIDTH':       w_in,
+                'NET_HEIGHT':      THICKNESS_IN,
+                'NET_WEIGHT':      wgt,
+                'NET_VOLUME':      vol,
+                'IMAGE_FILE_NAME': jpg_name,
+                'UPDATED':         'Y',
+                'TIME_STAMP':      ts,
+                'SITE_ID':         SITE_ID,
+                'FACTOR':          FACTOR,
+            })
+
+        # ─── Record ─────────────────────────────────────────────────────────────
+        for record in part_records:
+            records.write(record)
+        journal.append(original_part, tms, 'ok',
+                       part_records if len(part_records) > 1 else part_records[0])
+        n_ok += 1
         print(f"[{i}] ✅ Done\n")
 
+    journal.close()
+    records.close()
+    print(f"· Wrote {records.rows} Cubiscan records → {records.path}")
+
+    # ─── Run summary ───────────────────────────────────────────────────────────
+    elapsed = time.monotonic() - started
+    api = helper.THROTTLE.summary()
+    print(f"· Run summary: {n_ok} cropped, {n_missing} without document, "
+          f"{n_failed} failed in {elapsed:.0f}s")
+    print(f"· API: {api['requests']} calls at {api['rate_per_s']:.2f}/s, "
+          f"latency≈{api['latency_s']*1000:.0f}ms, {api['pushbacks']} pushbacks (429/503), "
+          f"throttle {api['state']} (spacing {api['delay_s']:.2f}s)")
+    for line in detectors.report():
+        print(line)
+
 if __name__ == '__main__':
-    root = tk.Tk()
-    root.withdraw()
-    
-    sheet = filedialog.askopenfilename(
-    title="Select Excel file",
-    filetypes=[("Excel files", "*.xlsx")]
-    )
-    
-    out_root = filedialog.askdirectory(
-        title="Select output directory"
-    )
-    main(sheet, out_root, seq=105)
+    parser = argparse.ArgumentParser(description="Extract decal crops from part drawings.")
+    parser.add_argument('sheet', nargs='?', help="parts list (asked for if omitted)")
+    parser.add_argument('out_root', nargs='?', help="output directory (asked for if omitted)")
+    parser.add_argument('--resume', metavar='OUT_DIR',
+                        help="continue an interrupted run in this decal_output_* folder")
+    parser.add_argument('--seq', type=int, default=105)
+    parser.add_argument('--multi', action='store_true', default=MULTI_DECAL,
+                        help="save every same-size decal on a sheet as indexed images")
+    parser.add_argument('--layers', action='store_true', default=EXPORT_LAYERS,
+                        help="also export a transparent PNG per COLOR_MAP colour")
+    parser.add_argument('--keep-pdfs', action='store_true', default=KEEP_PDFS,
+                        help="write downloaded PDFs to temp_pdfs/ and keep them (debugging)")
+    args = parser.parse_args()
+
+    if args.resume:
+        main(args.sheet, None, seq=args.seq, resume_dir=args.resume, keep_pdfs=args.keep_pdfs)
+        sys.exit(0)
+
+    sheet, out_root = args.sheet, args.out_root
+    if not (sheet and out_root):
+        root = tk.Tk()
+        root.withdraw()
+
+    if not sheet:
+        sheet = filedialog.askopenfilename(
+        title="Select parts list",
+        filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("Text files", "*.txt")]
+        )
+
+    if not out_root:
+        out_root = filedialog.askdirectory(
+            title="Select output directory"
+        )
+    main(sheet, out_root, seq=args.seq, multi=args.multi, layers=args.layers,
+         keep_pdfs=args.keep_pdfs)
@@ -1,14 +1,167 @@
 import os
 import json
+import asyncio
 import getpass
+import hashlib
+import shutil
 import socket
+import sqlite3
 import requests
+import threading
 import time
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 KEY_FILE = os.path.expanduser("~/.decal_api_key.json")
 API_ENDPOINT = "https://hal4ecrr1k.execute-api.us-east-1.amazonaws.com/prod/get_current_drawing"
 API_KEY = None
 
+# ── HTTP connection pool ───────────────────────────────────────────────────────
+HTTP_POOL_SIZE = 8      # keep-alive connections per host (≥ concurrent fetchers)
+HTTP_RETRIES   = 4      # retries on RETRY_STATUSES / connection errors
+HTTP_BACKOFF   = 0.5    # seconds; waits 0.5, 1, 2, 4… (Retry-After wins if sent)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session      = None
+_session_lock = threading.RLock()
+_dns_checked  = False
+
+def configure_session(pool_size: int = HTTP_POOL_SIZE,
+                      retries: int = HTTP_RETRIES,
+                      backoff: float = HTTP_BACKOFF) -> requests.Session:
+    """
+    (Re)build the shared keep-alive Session used for both the signed-URL POST
+    and the PDF download.  One HTTPAdapter pool per host, `pool_size` deep, so
+    every fetch thread reuses an open TLS connection instead of handshaking
+    per part.  429/5xx answers are retried with exponential backoff.
+    """
+    global _session
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    with _session_lock:
+        old, _session = _session, session
+    if old is not None:
+        old.close()
+    return session
+
+def get_session() -> requests.Session:
+    """Return the shared Session, building it with the defaults on first use."""
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                configure_session()
+    return _session
+
+# ── Adaptive API throttle ──────────────────────────────────────────────────────
+PUSHBACK_STATUSES = (429, 503)
+
+class AdaptiveThrottle:
+    """
+    Pacing for signed-URL calls shared by every fetch thread/task.  Runs at full
+    speed (no spacing) while the API is healthy; each 429/503 — including ones
+    absorbed by the session's retries — multiplies the spacing between calls by
+    `backoff` (at least `base`, or the server's Retry-After), and each clean
+    response shrinks it by `recover` until it drops back to zero.
+
+    reserve() books the caller's start time and returns how long to wait;
+    record() feeds back latency and status.  Thread-safe.
+    """
+
+    def __init__(self, base=0.25, backoff=2.0, recover=0.8, max_delay=30.0, alpha=0.2):
+        self.base      = base
+        self.backoff   = backoff
+        self.recover   = recover
+        self.max_delay = max_delay
+        self.alpha     = alpha
+        self.delay     = 0.0
+        self.latency   = None      # EWMA seconds
+        self.requests  = 0
+        self.pushbacks = 0
+        self.started   = time.monotonic()
+        self._next     = 0.0
+        self._lock     = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.delay
+            return start - now
+
+    def wait(self):
+        pause = self.reserve()
+        if pause > 0:
+            time.sleep(pause)
+
+    def record(self, latency, status, retry_after=None, pushbacks=0, retried=0):
+        """`retried` attempts were already retried away, `pushbacks` of them 429/503."""
+        if status in PUSHBACK_STATUSES:
+            pushbacks += 1
+        with self._lock:
+            self.requests += 1 + retried
+            self.latency = latency if self.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * self.latency)
+            if pushbacks:
+                self.pushbacks += pushbacks
+                delay = max(self.base, self.delay) * self.backoff ** pushbacks
+                if retry_after:
+                    delay = max(delay, retry_after)
+                self.delay = min(delay, self.max_delay)
+            elif self.delay:
+                self.delay *= self.recover
+                if self.delay < self.base / 4:
+                    self.delay = 0.0
+
+    def summary(self) -> dict:
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            return {
+                "requests":    self.requests,
+                "rate_per_s":  self.requests / elapsed,
+                "latency_s":   self.latency or 0.0,
+                "pushbacks":   self.pushbacks,
+                "delay_s":     self.delay,
+                "state":       "backing off" if self.delay else "full speed",
+            }
+
+THROTTLE = AdaptiveThrottle()
+
+def _retry_after(resp) -> float | None:
+    try:
+        return float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+def check_api_dns() -> bool:
+    """
+    Resolve the API host once per run (for the debug log).  A success is
+    remembered; a failure is retried on the next call.
+    """
+    global _dns_checked
+    if _dns_checked:
+        return True
+    parts = urlsplit(API_ENDPOINT)
+    host = parts.hostname
+    try:
+        addr = socket.getaddrinfo(host, parts.port or 443)
+        print(f"[DEBUG] DNS lookup succeeded for {host} → {addr[0][4][0]}")
+    except Exception as dns_err:
+        print(f"[ERROR] DNS resolution failed for {host}: {dns_err}")
+        return False
+    _dns_checked = True
+    return True
+
 def get_valid_api_key() -> str:
     """
     Prompt the user once for X-API-KEY, store it in ~/.decal_api_key.json,
@@ -45,49 +198,324 @@ def get_valid_api_key() -> str:
     API_KEY = api_key
     return API_KEY
 
-def fetch_pdf_via_api(part_number: str, pdf_dir: str) -> str | None:
+class ApiKeyRejected(RuntimeError):
+    """The signed-URL API answered 403 to `key`: the part fails, the key needs replacing."""
+
+    def __init__(self, part_number, key):
+        super().__init__(f"API key rejected (403) for '{part_number}'")
+        self.part_number = part_number
+        self.key         = key
+
+_api_key_lock = threading.Lock()
+
+def replace_api_key(rejected: str | None) -> str:
+    """
+    Swap out a key the API refused (see ApiKeyRejected) and return the new one.
+    Under a lock: if API_KEY is no longer `rejected`, another caller already
+    replaced it and nothing is asked; otherwise KEY_FILE is dropped and
+    get_valid_api_key() prompts.  Call it from the main thread, so one bad
+    key means one prompt however many parts it failed.
+    """
     global API_KEY
+    with _api_key_lock:
+        if API_KEY is not None and API_KEY != rejected:
+            return API_KEY
+        print("[ERROR] API key seems invalid (403). Let's get a new one.")
+        try:
+            os.remove(KEY_FILE)
+        except OSError:
+            pass
+        API_KEY = None
+        return get_valid_api_key()  # re-prompt and write fresh KEY_FILE
+
+# ── Local drawing cache ────────────────────────────────────────────────────────
+PDF_CACHE_DIR     = os.path.expanduser("~/.decal_cache")
+PDF_CACHE_FRESH   = 24 * 3600          # seconds a cached PDF is used without asking the API
+PDF_CACHE_TTL     = 90 * 24 * 3600     # entries unused this long are evicted
+PDF_CACHE_MAX_MB  = 2048               # LRU-evict beyond this much PDF data
+PDF_CACHE_ENABLED = True
+
+class PdfCache:
+    """
+    Persistent, content-addressed drawing cache.  PDF bytes are stored once per
+    SHA-256 under <root>/pdfs/ab/<sha256>.pdf; a SQLite index maps each part
+    number to its blob plus the ETag / Last-Modified the signed URL returned
+    (the drawing revision) and when it was fetched and last used.
+
+    Entries younger than `fresh` seconds skip the API entirely; older ones are
+    revalidated with a conditional GET.  Entries unused for `ttl` seconds are
+    dropped, and least-recently-used entries go once the blobs exceed
+    `max_bytes`.  Eviction runs when the cache is opened and again only when
+    a put() takes the tracked blob total past `max_bytes`.  Thread-safe (one
+    connection behind a lock).
+    """
 
+    def __init__(self, root=PDF_CACHE_DIR, fresh=PDF_CACHE_FRESH,
+                 ttl=PDF_CACHE_TTL, max_bytes=PDF_CACHE_MAX_MB * 1024 * 1024):
+        self.root      = root
+        self.fresh     = fresh
+        self.ttl       = ttl
+        self.max_bytes = max_bytes
+        self._bytes    = 0   # blob bytes the index references; reset by evict()
+        self._lock     = threading.Lock()
+        os.makedirs(os.path.join(root, "pdfs"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"),
+                                   timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pdfs (
+                part          TEXT PRIMARY KEY,
+                sha256        TEXT NOT NULL,
+                size          INTEGER NOT NULL,
+                etag          TEXT,
+                last_modified TEXT,
+                fetched       REAL NOT NULL,
+                used          REAL NOT NULL
+            )""")
+        self._db.commit()
+        self.evict()
+        self.sweep_orphans()
+
+    def blob_path(self, sha):
+        return os.path.join(self.root, "pdfs", sha[:2], f"{sha}.pdf")
+
+    def lookup(self, part):
+        """Return the index row for `part` as a dict (+ 'path', 'fresh'), or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256, size, etag, last_modified, fetched FROM pdfs WHERE part = ?",
+                (part,)).fetchone()
+            if row is None:
+                return None
+            sha, size, etag, last_modified, fetched = row
+            path = self.blob_path(sha)
+            if not os.path.exists(path):
+                self._db.execute("DELETE FROM pdfs WHERE part = ?", (part,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE pdfs SET used = ? WHERE part = ?", (time.time(), part))
+            self._db.commit()
+        return {"sha256": sha, "size": size, "etag": etag, "last_modified": last_modified,
+                "fetched": fetched, "path": path,
+                "fresh": time.time() - fetched < self.fresh}
+
+    def put(self, part, src, sha, etag=None, last_modified=None):
+        """Store the download (a file path, or the PDF bytes) whose SHA-256 is `sha` for `part`."""
+        dst = self.blob_path(sha)
+        now = time.time()
+        # blob + row in one critical section, so evict() never sees the blob
+        # without the row that keeps it
+        with self._lock:
+            db = self._db
+            old = db.execute("SELECT sha256, size FROM pdfs WHERE part = ?", (part,)).fetchone()
+            shared = db.execute("SELECT 1 FROM pdfs WHERE sha256 = ? LIMIT 1", (sha,)).fetchone()
+            if not os.path.exists(dst):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                tmp = f"{dst}.{threading.get_ident()}.tmp"
+                if isinstance(src, str):
+                    shutil.copyfile(src, tmp)
+                else:
+                    with open(tmp, "wb") as f:
+                        f.write(src)
+                os.replace(tmp, dst)
+            size = os.path.getsize(dst)
+            db.execute(
+                "INSERT OR REPLACE INTO pdfs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (part, sha, size, etag, last_modified, now, now))
+            db.commit()
+            if not shared:
+                self._bytes += size
+            # a new revision replaces the part's old blob unless another part shares it
+            if old and old[0] != sha and self._remove_orphan(old[0]):
+                self._bytes -= old[1]
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def revalidated(self, part):
+        """The server answered 304: the cached revision is current again."""
+        with self._lock:
+            self._db.execute("UPDATE pdfs SET fetched = ? WHERE part = ?", (time.time(), part))
+            self._db.commit()
+
+    def checkout(self, entry, pdf_dir, part):
+        """
+        Place a working copy of a cached blob in pdf_dir (hard link if possible)
+        and return its path; with pdf_dir None, return the blob's bytes instead.
+        """
+        if pdf_dir is None:
+            with open(entry["path"], "rb") as f:
+                return f.read()
+        os.makedirs(pdf_dir, exist_ok=True)
+        dst = os.path.join(pdf_dir, f"{part}_{time.time_ns()}.pdf")
+        try:
+            os.link(entry["path"], dst)
+        except OSError:
+            shutil.copyfile(entry["path"], dst)
+        return dst
+
+    def evict(self):
+        """
+        Drop entries unused for `ttl`, then LRU entries beyond `max_bytes`, and
+        delete the blobs only those entries referenced.
+        """
+        with self._lock:
+            db = self._db
+            cutoff = time.time() - self.ttl
+            doomed = {sha for (sha,) in db.execute(
+                "SELECT DISTINCT sha256 FROM pdfs WHERE used < ?", (cutoff,))}
+            db.execute("DELETE FROM pdfs WHERE used < ?", (cutoff,))
+            total = kept = 0
+            # blobs shared by several parts count once, at their most recent use
+            for sha, size, used in db.execute(
+                    "SELECT sha256, size, MAX(used) FROM pdfs GROUP BY sha256 ORDER BY 3 DESC"
+                    ).fetchall():
+                total += size
+                if total > self.max_bytes:
+                    db.execute("DELETE FROM pdfs WHERE sha256 = ?", (sha,))
+                    doomed.add(sha)
+                else:
+                    kept += size
+            db.commit()
+            self._bytes = kept
+            for sha in doomed:
+                self._remove_orphan(sha)
+
+    def _remove_orphan(self, sha):
+        """
+        Delete blob `sha` if no row references it (caller holds the lock);
+        True when it was unreferenced.
+        """
+        if self._db.execute("SELECT 1 FROM pdfs WHERE sha256 = ? LIMIT 1", (sha,)).fetchone():
+            return False
+        try:
+            os.remove(self.blob_path(sha))
+        except OSError:
+            pass
+        return True
+
+    def sweep_orphans(self):
+        """
+        Remove blob files no index row references (e.g. left by a crash), and
+        .tmp files a crash during put() left behind once they are older than
+        `ttl` (a younger one may still be another process's write in flight).
+        Walks every blob directory, so it runs once when the cache is opened;
+        each blob is re-checked against the index under the lock before it goes.
+        """
+        blob_root = os.path.join(self.root, "pdfs")
+        cutoff = time.time() - self.ttl
+        for sub in os.listdir(blob_root):
+            sub_dir = os.path.join(blob_root, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                if name.endswith(".pdf"):
+                    with self._lock:
+                        self._remove_orphan(name[:-4])
+                elif name.endswith(".tmp"):
+                    path = os.path.join(sub_dir, name)
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                    except OSError:
+                        pass
+
+_pdf_cache      = None
+_pdf_cache_lock = threading.Lock()
+
+def get_pdf_cache() -> PdfCache | None:
+    """The run's shared PdfCache, or None when PDF_CACHE_ENABLED is off."""
+    global _pdf_cache
+    if not PDF_CACHE_ENABLED:
+        return None
+    if _pdf_cache is None:
+        with _pdf_cache_lock:
+            if _pdf_cache is None:
+                _pdf_cache = PdfCache()
+    return _pdf_cache
+
+def _write_pdf(data, pdf_dir, part_number):
+    """Write downloaded PDF bytes to a fresh file in pdf_dir; return its path."""
+    os.makedirs(pdf_dir, exist_ok=True)
+    pdf_path = os.path.join(pdf_dir, f"{part_number}_{time.time_ns()}.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(data)
+    return pdf_path
+
+def describe_pdf(pdf):
+    """A fetched PDF (path or bytes) for log lines."""
+    return pdf if isinstance(pdf, str) else f"{len(pdf) / 1024:.0f} KiB in memory"
+
+def _conditional_headers(entry):
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def fetch_pdf_via_api(part_number: str, pdf_dir: str | None = None) -> str | bytes | None:
+    """
+    Fetch the current drawing for `part_number` (local cache first, then the
+    signed-URL API).  Returns the PDF's bytes, or with `pdf_dir` the path of a
+    copy written there; None only when the API says there is no document (a
+    404, or an answer without a PDF URL).  Raises ApiKeyRejected on a 403, and
+    the underlying error on a DNS, HTTP or download failure, so the part is
+    retried by --resume; the caller decides when to replace_api_key().
+    """
     if API_KEY is None:
         raise RuntimeError("API_KEY has not been initialized!")
 
+    session = get_session()
+
+    # ── 0) local cache: a fresh copy needs no network at all ────────────────────
+    cache = get_pdf_cache()
+    entry = cache.lookup(part_number) if cache else None
+    if entry and entry["fresh"]:
+        pdf = cache.checkout(entry, pdf_dir, part_number)
+        print(f"[CACHE] {part_number} → {describe_pdf(pdf)}")
+        return pdf
+
     # helper to do the signed-URL POST
+    key = API_KEY
     def _do_request():
-        os.makedirs(pdf_dir, exist_ok=True)
         headers = {
             "Content-Type": "application/json",
-            "x-api-key":    API_KEY,
+            "x-api-key":    key,
         }
         body = {"part_number": part_number}
-        return requests.post(API_ENDPOINT, headers=headers, json=body, timeout=30)
+        THROTTLE.wait()
+        t0 = time.monotonic()
+        resp = session.post(API_ENDPOINT, headers=headers, json=body, timeout=30)
+        # 429/503s the adapter already retried show up in the retry history
+        retries = getattr(resp.raw, "retries", None)
+        history = getattr(retries, "history", ()) or ()
+        absorbed = sum(1 for h in history if h.status in PUSHBACK_STATUSES)
+        THROTTLE.record(time.monotonic() - t0, resp.status_code,
+                        _retry_after(resp), pushbacks=absorbed, retried=len(history))
+        return resp
 
-    # ── DNS debug ────────────────────────────────────────────────────────────────
-    host = API_ENDPOINT.split("/")[2]
-    try:
-        addr = socket.getaddrinfo(host, 443)
-        print(f"[DEBUG] DNS lookup succeeded for {host} → {addr[0][4][0]}")
-    except Exception as dns_err:
-        print(f"[ERROR] DNS resolution failed for {host}: {dns_err}")
-        return None
+    # ── DNS debug (once per run) ─────────────────────────────────────────────────
+    if not check_api_dns():
+        raise ConnectionError(f"Could not resolve the API host for '{part_number}'")
 
     # ── 1) POST to get signed URL ───────────────────────────────────────────────
     resp = _do_request()
     if resp.status_code == 403:
-        # invalid key → clear it and re-prompt once
-        print("[ERROR] API key seems invalid (403). Let's get a new one.")
-        try:
-            os.remove(KEY_FILE)
-        except OSError:
-            pass
-        API_KEY = None
-        API_KEY = get_valid_api_key()  # re-prompt and write fresh KEY_FILE
-        resp = _do_request()           # retry
+        # invalid key → fail this part; prompting is left to the main thread
+        raise ApiKeyRejected(part_number, key)
+    if resp.status_code == 404:
+        print(f"[ERROR] No document for '{part_number}' (404)")
+        return None
 
     try:
         resp.raise_for_status()
     except Exception as e:
         print(f"[ERROR] API call failed for '{part_number}': {e}")
-        return None
+        if entry:
+            print(f"[WARN] Using stale cached drawing for '{part_number}'")
+            return cache.checkout(entry, pdf_dir, part_number)
+        raise
 
     # ── 2) extract signed URL (JSON or raw text) ────────────────────────────────
     url = None
@@ -103,21 +531,212 @@ def fetch_pdf_via_api(part_number: str, pdf_dir: str) -> str | None:
         print(f"[ERROR] No PDF URL in API response for '{part_number}'")
         return None
 
-    # ── 3) download the PDF ────────────────────────────────────────────────────
-    pdf_name = f"{part_number}_{int(time.time())}.pdf"
-    pdf_path = os.path.join(pdf_dir, pdf_name)
-    r = requests.get(url, stream=True, timeout=30)
+    # ── 3) download the PDF (conditional on the cached revision) into memory ───
+    r = session.get(url, stream=True, timeout=30, headers=_conditional_headers(entry))
     try:
+        if r.status_code == 304 and entry:
+            cache.revalidated(part_number)
+            pdf = cache.checkout(entry, pdf_dir, part_number)
+            print(f"[CACHE] {part_number} unchanged (304) → {describe_pdf(pdf)}")
+            return pdf
         r.raise_for_status()
-        with open(pdf_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
+        data = b"".join(r.iter_content(chunk_size=64 * 1024))
     except Exception as download_err:
         print(f"[ERROR] Failed to download PDF: {download_err}")
-        return None
+        raise
     finally:
         r.close()
 
-    print(f"[OK] Downloaded PDF → {pdf_path}")
-    return pdf_path
+    if cache:
+        try:
+            cache.put(part_number, data, hashlib.sha256(data).hexdigest(),
+                      r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        except Exception as cache_err:
+            print(f"[WARN] Could not cache PDF for '{part_number}': {cache_err}")
+
+    pdf = _write_pdf(data, pdf_dir, part_number) if pdf_dir else data
+    print(f"[OK] Downloaded PDF → {describe_pdf(pdf)}")
+    return pdf
+
+
+# ── asyncio batch fetcher ──────────────────────────────────────────────────────
+ASYNC_CONCURRENCY = 8      # parts in flight at once (POST + GET)
+API_RATE_LIMIT    = 10.0   # signed-URL POSTs per second (API Gateway quota)
+API_RATE_BURST    = 10     # POSTs allowed back-to-back after an idle spell
+
+class TokenBucket:
+    """
+    asyncio token bucket: `rate` tokens per second refill, at most `burst`
+    banked.  acquire() waits until a whole token is available.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate   = float(rate)
+        self.burst  = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.stamp  = None
+        self._lock  = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self.stamp is not None:
+                    self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+async def _async_send(session, method, url, retries, backoff, bucket=None, **kw):
+    """
+    One aiohttp request with the same retry policy as the sync Session:
+    429/5xx and connection errors back off exponentially (Retry-After wins).
+    Rate-limited (API) calls also go through THROTTLE.
+    Returns the open response; the caller must release it.
+    """
+    import aiohttp
+
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            await bucket.acquire()
+            await asyncio.sleep(THROTTLE.reserve())
+        t0 = time.monotonic()
+        try:
+            resp = await session.request(method, url, **kw)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(backoff * (2 ** attempt))
+            continue
+        if bucket is not None:
+            THROTTLE.record(time.monotonic() - t0, resp.status, _retry_after(resp))
+        if resp.status not in RETRY_STATUSES or attempt == retries:
+            return resp
+        delay = backoff * (2 ** attempt)
+        try:
+            delay = max(delay, float(resp.headers.get("Retry-After", 0)))
+        except ValueError:
+            pass
+        resp.release()
+        await asyncio.sleep(delay)
+
+async def _fetch_one_async(session, bucket, part_number, pdf_dir, retries, backoff):
+    key = API_KEY
+    headers = {"Content-Type": "application/json", "x-api-key": key}
+
+    # ── 0) local cache ─────────────────────────────────────────────────────────
+    #    (PdfCache does blocking SQLite / file I/O: keep it off the event loop)
+    cache = await asyncio.to_thread(get_pdf_cache)
+    entry = await asyncio.to_thread(cache.lookup, part_number) if cache else None
+    if entry and entry["fresh"]:
+        return await asyncio.to_thread(cache.checkout, entry, pdf_dir, part_number)
 
+    # ── 1) POST to get signed URL (rate limited) ────────────────────────────────
+    resp = await _async_send(session, "POST", API_ENDPOINT, retries, backoff, bucket,
+                             headers=headers, json={"part_number": part_number})
+    try:
+        if resp.status == 403:
+            raise ApiKeyRejected(part_number, key)
+        if resp.status == 404:
+            return None
+        resp.raise_for_status()
+        txt = (await resp.text()).strip()
+    finally:
+        resp.release()
+
+    # ── 2) extract signed URL (JSON or raw text) ────────────────────────────────
+    url = None
+    try:
+        payload = json.loads(txt)
+        if isinstance(payload, dict):
+            url = payload.get("url")
+    except ValueError:
+        if txt.startswith("http"):
+            url = txt
+    if not url:
+        return None
+
+    # ── 3) download the PDF into memory ────────────────────────────────────────
+    r = await _async_send(session, "GET", url, retries, backoff,
+                          headers=_conditional_headers(entry))
+    try:
+        if r.status == 304 and entry:
+            await asyncio.to_thread(cache.revalidated, part_number)
+            return await asyncio.to_thread(cache.checkout, entry, pdf_dir, part_number)
+        r.raise_for_status()
+        data = await r.read()
+    finally:
+        r.release()
+    if cache:
+        await asyncio.to_thread(cache.put, part_number, data, hashlib.sha256(data).hexdigest(),
+                                r.headers.get("ETag"), r.headers.get("Last-Modified"))
+    if pdf_dir:
+        return await asyncio.to_thread(_write_pdf, data, pdf_dir, part_number)
+    return data
+
+async def fetch_pdfs_async(part_numbers, pdf_dir: str | None = None,
+                           concurrency: int = ASYNC_CONCURRENCY,
+                           rate: float = API_RATE_LIMIT,
+                           burst: int = API_RATE_BURST,
+                           retries: int = HTTP_RETRIES,
+                           backoff: float = HTTP_BACKOFF):
+    """
+    Async counterpart of fetch_pdf_via_api for a whole batch (needs aiohttp).
+    Runs up to `concurrency` parts at once — signed-URL POST then PDF GET —
+    with the POSTs paced by a TokenBucket(rate, burst).  Yields
+    (part_number, pdf) or (part_number, exception) as each one finishes, where
+    pdf is the PDF's bytes, or with `pdf_dir` the path of a copy written there,
+    and None when the API says there is no document (as fetch_pdf_via_api).
+
+    `part_numbers` is consumed lazily and advanced in a worker thread, so it
+    may block (e.g. to apply backpressure) without stalling the event loop.
+    """
+    import aiohttp
+
+    if API_KEY is None:
+        raise RuntimeError("API_KEY has not been initialized!")
+    if pdf_dir:
+        os.makedirs(pdf_dir, exist_ok=True)
+
+    bucket    = TokenBucket(rate, burst)
+    it        = iter(part_numbers)
+    done      = object()
+    timeout   = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+    # DNS is cached for the life of the connector, i.e. resolved once per run
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=None)
+
+    async def _one(part):
+        try:
+            return part, await _fetch_one_async(session, bucket, part, pdf_dir, retries, backoff)
+        except Exception as e:
+            return part, e
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        pending, puller, exhausted = set(), None, False
+        try:
+            while True:
+                # pull the next part concurrently with the downloads, so a
+                # blocking iterator never holds back finished results
+                if puller is None and not exhausted and len(pending) < concurrency:
+                    puller = asyncio.create_task(asyncio.to_thread(next, it, done))
+                waiting = pending | ({puller} if puller is not None else set())
+                if not waiting:
+                    break
+                finished, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    if task is puller:
+                        puller = None
+                        part = task.result()
+                        if part is done:
+                            exhausted = True
+                        else:
+                            pending.add(asyncio.create_task(_one(part)))
+                    else:
+                        pending.discard(task)
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,181 @@
+"""
+Microbenchmark: DecalExtract.extract_dimensions against the previous parser
+(four re.search calls on raw pattern strings) and against folding the same
+patterns into one alternation scanned once, over a corpus of drawing texts.
+
+    python bench_dimensions.py [PDF_DIR ...] [--repeat N]
+
+With PDF_DIR(s), page-0 text layers of every *.pdf found there (e.g. a run's
+temp_pdfs, or a folder of fetched drawings) form the corpus; otherwise a
+built-in set of title-block style texts is used.  All parsers must agree on
+(height_in, width_in) for every text; disagreements are listed.  Texts the
+raw patterns raise on (e.g. a bare "." read as a number) are counted apart.
+"""
+import os
+import re
+import sys
+import glob
+import time
+import random
+import argparse
+
+import fitz       # PyMuPDF
+import DecalExtract as de
+
+# ── Baseline: the four sequential re.search calls ─────────────────────────────
+
+def legacy_parse(text):
+    m = re.search(
+        r'Dimensions\s*\(\s*h\s*[x×]\s*w\s*\)\s*:\s*([\d.]+)\s*["”]?\s*[x×]\s*([\d.]+)\s*["”]?',
+        text, re.IGNORECASE
+    )
+    if m:
+        return float(m.group(1)), float(m.group(2))
+    m2 = re.search(r'OVER\s*ALL\s*LENGTH\s*(?:IS|=)\s*([\d.]+)\s*INCH', text, re.IGNORECASE)
+    if m2:
+        return float(m2.group(1)), None
+    mmm = re.search(r'([\d.]+)\s*mm\s*[x×]\s*([\d.]+)\s*mm', text, re.IGNORECASE)
+    if mmm:
+        return float(mmm.group(1)) / 25.4, float(mmm.group(2)) / 25.4
+    m3 = re.search(r'([\d.]+)\s*["”]\s*[x×]\s*([\d.]+)\s*["”]?', text)
+    if m3:
+        return float(m3.group(1)), float(m3.group(2))
+    return 0.0, 0.0
+
+# ── Contender: every pattern in one alternation, scanned once ─────────────────
+#    (a lookahead so hits may overlap; the best-priority hit wins)
+
+_FUSED = re.compile(
+    '(?=' + '|'.join(f'(?P<{name}>{rx.pattern})' for name, rx, _, _ in de.DIMENSION_PATTERNS) + ')',
+    re.IGNORECASE,
+)
+_RANK = {name: k for k, (name, _, _, _) in enumerate(de.DIMENSION_PATTERNS)}
+
+
+def fused_parse(text):
+    best, best_rank = None, len(_RANK)
+    for m in _FUSED.finditer(text):
+        rank = _RANK[m.lastgroup]
+        if rank < best_rank:
+            best, best_rank = m, rank
+            if rank == 0:
+                break
+    if best is None:
+        return 0.0, 0.0
+    first = _FUSED.groupindex[best.lastgroup]
+    nums = [float(v) for v in best.groups()[first:first + 2] if v is not None] + [0.0]
+    k = 1 / 25.4 if de.DIMENSION_PATTERNS[best_rank][2] == 'mm' else 1.0
+    return nums[0] * k, nums[1] * k
+
+# ── Corpus ─────────────────────────────────────────────────────────────────────
+
+_FILLER = (
+    "UNLESS OTHERWISE SPECIFIED DIMENSIONS ARE IN INCHES\nTOLERANCES: .XX ±.03 .XXX ±.010\n"
+    "MATERIAL: 3M 180mC VINYL, 0.004 THK\nDO NOT SCALE DRAWING\nTHIRD ANGLE PROJECTION\n"
+    "REV  DESCRIPTION  DATE  APPROVED\nA  INITIAL RELEASE  05/21/2025  PD\n"
+    "COLOR: BLACK ON TRANSPARENT\nSHEET 1 OF 1   SCALE 1:1   SIZE B\n"
+)
+
+_DIM_LINES = (
+    'Dimensions (h x w): {h}" x {w}"',
+    'DIMENSIONS (H × W): {h}” × {w}”',
+    'OVER ALL LENGTH IS {h} INCHES',
+    '{hm} mm x {wm} mm',
+    '{hm}MM X {wm}MM',
+    'DECAL SIZE {h}" x {w}"',
+    'Dimensions (h x w): . x {w}"\n{hm} mm x {wm} mm',
+    '',
+)
+
+
+def synthetic_corpus(n=2000, seed=7):
+    rnd = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        h, w = round(rnd.uniform(0.5, 12), 2), round(rnd.uniform(0.5, 30), 2)
+        line = rnd.choice(_DIM_LINES).format(h=h, w=w, hm=round(h * 25.4), wm=round(w * 25.4))
+        body = _FILLER * rnd.randint(1, 4)
+        cut = rnd.randint(0, len(body))
+        texts.append(f"PART NO. {rnd.randint(10000, 99999)}GT\n{body[:cut]}{line}\n{body[cut:]}")
+    return texts
+
+
+def pdf_corpus(dirs):
+    texts = []
+    for d in dirs:
+        for path in sorted(glob.glob(os.path.join(d, '**', '*.pdf'), recursive=True)):
+            try:
+                with fitz.open(path) as doc:
+                    texts.append(doc.load_page(0).get_text() or "")
+            except Exception as ex:
+                print(f"· [WARN] skipped {path}: {ex}")
+    return texts
+
+# ── Timing ─────────────────────────────────────────────────────────────────────
+
+def time_parser(fn, texts, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pdf_dirs', nargs='*', help="folders of drawing PDFs (searched recursively)")
+    parser.add_argument('--repeat', type=int, default=5, help="timing runs; the best is reported")
+    args = parser.parse_args(argv)
+
+    texts = pdf_corpus(args.pdf_dirs) if args.pdf_dirs else synthetic_corpus()
+    if not texts:
+        print("· No texts in the corpus; nothing to benchmark.")
+        return 1
+    chars = sum(len(t) for t in texts)
+    print(f"· Corpus: {len(texts)} texts, {chars / 1024:.0f} KiB "
+          f"({'PDF text layers' if args.pdf_dirs else 'synthetic'})")
+
+    # a) agreement (the legacy None width is the new 0.0)
+    #    (texts where a raw-pattern parser raises are only counted)
+    diffs, raised, timed = [], 0, []
+    for i, t in enumerate(texts):
+        d = de.extract_dimensions(t)
+        try:
+            h, w = legacy_parse(t)
+            f = fused_parse(t)
+        except ValueError:
+            raised += 1
+            continue
+        timed.append(t)
+        for other in ((h, w or 0.0), f):
+            if abs(other[0] - d.height_in) > 1e-9 or abs(other[1] - d.width_in) > 1e-9:
+                diffs.append((i, (h, w), f, d))
+                break
+    print(f"· Agreement: {len(timed) - len(diffs)}/{len(timed)} "
+          f"(+{raised} texts the raw patterns raise on)")
+    for i, old, fused, new in diffs[:10]:
+        print(f"   · text {i}: legacy={old} fused={fused} new={tuple(new[:2])} via {new.source}")
+
+    # b) speed, over the texts every parser handles
+    t_old = time_parser(legacy_parse, timed, args.repeat)
+    for name, fn in (('legacy 4×re.search', legacy_parse),
+                     ('one alternation', fused_parse),
+                     ('extract_dimensions', de.extract_dimensions)):
+        t = time_parser(fn, timed, args.repeat)
+        print(f"· {name:<20} {t * 1e3:8.2f} ms total  {t / len(timed) * 1e6:7.2f} µs/text  "
+              f"({t_old / t:.2f}× legacy)")
+
+    # c) which pattern carried each text
+    sources = {}
+    for t in texts:
+        src = de.extract_dimensions(t).source
+        sources[src] = sources.get(src, 0) + 1
+    print("· Sources: " + ", ".join(f"{k or 'none'}={v}" for k, v in
+                                    sorted(sources.items(), key=lambda kv: -kv[1])))
+    return 0 if not diffs else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
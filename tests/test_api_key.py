@@ -0,0 +1,40 @@
+"""
+helper.replace_api_key: however many parts fail with the same rejected key,
+the user is prompted once.
+"""
+import threading
+
+import DecalExtract_helper as helper
+
+
+def test_one_prompt_per_rejected_key(monkeypatch, tmp_path):
+    key_file = tmp_path / "key.json"
+    key_file.write_text('{"x_api_key": "old"}')
+    prompts = []
+
+    def fake_prompt():
+        prompts.append(threading.current_thread().name)
+        helper.API_KEY = f"new{len(prompts)}"
+        return helper.API_KEY
+
+    monkeypatch.setattr(helper, "KEY_FILE", str(key_file))
+    monkeypatch.setattr(helper, "API_KEY", "old")
+    monkeypatch.setattr(helper, "get_valid_api_key", fake_prompt)
+
+    got, start = [], threading.Barrier(8)
+    def worker():
+        start.wait()
+        got.append(helper.replace_api_key("old"))
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(prompts) == 1
+    assert got == ["new1"] * 8
+    assert not key_file.exists()                     # the refused key is not reused
+
+    # a later rejection of the replacement key prompts again
+    assert helper.replace_api_key("new1") == "new2"
+    assert len(prompts) == 2
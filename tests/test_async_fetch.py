@@ -0,0 +1,156 @@
+"""
+helper.fetch_pdfs_async against a local aiohttp stub of the drawing API:
+token-bucket pacing of the signed-URL POSTs, 429/5xx retry with
+Retry-After, per-part exceptions, the local PdfCache, and how the async
+pipeline reports a failed fetch.
+"""
+import asyncio
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+import DecalExtract_helper as helper
+
+
+class StubApi:
+    """
+    POST /api          → {"url": <base>/pdf/<part>}; NOURL → {}; GONE → 404; BAD → 500 always;
+                         DENIED → 403; RETRY → one 429 (Retry-After: RETRY_AFTER) first
+    GET  /pdf/<part>   → b"%PDF-<part>"; FLAKY → one 503 first
+    """
+    RETRY_AFTER = 0.3
+
+    def __init__(self):
+        self.posts = []          # (monotonic time, part)
+        self.gets  = []
+        self.seen  = set()
+        self.base  = None
+
+    def pdf(self, part):
+        return f"%PDF-{part}".encode()
+
+    async def api(self, request):
+        part = (await request.json())["part_number"]
+        self.posts.append((time.monotonic(), part))
+        if part == "BAD":
+            return web.Response(status=500)
+        if part == "DENIED":
+            return web.Response(status=403)
+        if part == "GONE":
+            return web.Response(status=404)
+        if part == "RETRY" and ("post", part) not in self.seen:
+            self.seen.add(("post", part))
+            return web.Response(status=429, headers={"Retry-After": str(self.RETRY_AFTER)})
+        if part == "NOURL":
+            return web.json_response({})
+        return web.json_response({"url": f"{self.base}/pdf/{part}"})
+
+    async def get_pdf(self, request):
+        part = request.match_info["part"]
+        self.gets.append((time.monotonic(), part))
+        if part == "FLAKY" and ("get", part) not in self.seen:
+            self.seen.add(("get", part))
+            return web.Response(status=503)
+        return web.Response(body=self.pdf(part), headers={"ETag": f'"{part}"'})
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    api = StubApi()
+    monkeypatch.setattr(helper, "API_KEY", "test-key")
+    monkeypatch.setattr(helper, "THROTTLE", helper.AdaptiveThrottle())
+    monkeypatch.setattr(helper, "_pdf_cache", helper.PdfCache(root=str(tmp_path / "cache")))
+    return api
+
+
+def run_batch(api, monkeypatch, parts, **kw):
+    """Serve the stub, run fetch_pdfs_async over `parts`; returns {part: result}."""
+    async def _main():
+        app = web.Application()
+        app.router.add_post("/api", api.api)
+        app.router.add_get("/pdf/{part}", api.get_pdf)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        api.base = f"http://127.0.0.1:{port}"
+        monkeypatch.setattr(helper, "API_ENDPOINT", f"{api.base}/api")
+        try:
+            out = {}
+            async for part, res in helper.fetch_pdfs_async(parts, **kw):
+                out[part] = res
+            return out
+        finally:
+            await runner.cleanup()
+    return asyncio.run(_main())
+
+
+def test_posts_are_paced_by_the_token_bucket(stub, monkeypatch):
+    parts = [f"P{k}" for k in range(10)]
+    rate, burst = 20.0, 2
+    out = run_batch(stub, monkeypatch, parts, concurrency=10, rate=rate, burst=burst,
+                    retries=0, backoff=0.01)
+
+    assert out == {p: stub.pdf(p) for p in parts}
+    times = sorted(t for t, _ in stub.posts)
+    # `burst` go at once, then one token per 1/rate seconds
+    assert times[-1] - times[0] >= (len(parts) - burst) / rate * 0.9
+
+
+def test_429_is_retried_after_retry_after(stub, monkeypatch):
+    out = run_batch(stub, monkeypatch, ["RETRY", "FLAKY"], concurrency=2,
+                    rate=100.0, burst=10, retries=2, backoff=0.01)
+
+    assert out == {"RETRY": stub.pdf("RETRY"), "FLAKY": stub.pdf("FLAKY")}
+    posts = [t for t, p in stub.posts if p == "RETRY"]
+    assert len(posts) == 2
+    assert posts[1] - posts[0] >= StubApi.RETRY_AFTER * 0.9      # Retry-After beat backoff
+    assert len([p for _, p in stub.gets if p == "FLAKY"]) == 2   # 503 on the GET retried too
+    assert helper.THROTTLE.summary()["pushbacks"] >= 1
+
+
+def test_failures_are_yielded_per_part(stub, monkeypatch):
+    parts = ["OK1", "BAD", "NOURL", "GONE", "DENIED", "OK2"]
+    out = run_batch(stub, monkeypatch, parts, concurrency=4,
+                    rate=100.0, burst=10, retries=1, backoff=0.01)
+
+    assert set(out) == set(parts)
+    assert out["OK1"] == stub.pdf("OK1") and out["OK2"] == stub.pdf("OK2")
+    assert isinstance(out["BAD"], aiohttp.ClientResponseError) and out["BAD"].status == 500
+    assert out["NOURL"] is None and out["GONE"] is None          # no document: not an error
+    assert isinstance(out["DENIED"], helper.ApiKeyRejected) and out["DENIED"].key == "test-key"
+    assert len([p for _, p in stub.posts if p == "BAD"]) == 2    # first try + one retry
+
+
+def test_fresh_cache_entries_skip_the_api(stub, monkeypatch, tmp_path):
+    parts = ["C1", "C2"]
+    first = run_batch(stub, monkeypatch, parts, rate=100.0, burst=10, retries=0)
+    n_posts = len(stub.posts)
+
+    second = run_batch(stub, monkeypatch, parts, rate=100.0, burst=10, retries=0)
+    assert second == first
+    assert len(stub.posts) == n_posts                            # served from PdfCache
+
+    kept = run_batch(stub, monkeypatch, ["C1"], pdf_dir=str(tmp_path / "pdfs"),
+                     rate=100.0, burst=10, retries=0)
+    with open(kept["C1"], "rb") as f:
+        assert f.read() == stub.pdf("C1")
+
+
+def test_async_pipeline_reports_fetch_errors(monkeypatch):
+    import DecalExtract as de
+    down = ConnectionError("network down")
+
+    async def fake_fetch(parts, pdf_dir=None, concurrency=None):
+        for part in parts:
+            yield part, down
+
+    monkeypatch.setattr(helper, "fetch_pdfs_async", fake_fetch)
+    out = list(de.run_part_pipeline([("P1", "T1")], None, None, [], fetch_mode="async"))
+
+    assert [(part, pdf, result, err) for _, part, _, pdf, result, err in out] == \
+           [("P1", None, None, down)]                   # 'failed', as in the thread fetcher
@@ -0,0 +1,120 @@
+"""
+run_crop_cascade runs detectors cheapest first and stops at the first clean
+hit from a confident enough one; DetectorStats tallies the traces it leaves.
+refine_crop_rect only nudges a box: never off the page, never further than
+its search radius from where it started.
+"""
+import cv2
+import numpy as np
+import pytest
+
+import DecalExtract as de
+
+
+def _page():
+    """Blank page with a framed decal at (200, 100)-(500, 300) and a stray mark."""
+    img = np.full((600, 800), 255, np.uint8)
+    cv2.rectangle(img, (200, 100), (499, 299), 0, 2)
+    cv2.circle(img, (600, 500), 30, 0, -1)
+    return de.PageAnalysis(img)
+
+
+CTX = de.CropContext(expected_ar=1.5, template_sets=[], dbg_dir=None, dbg_name=None)
+CLEAN = (180, 80, 520, 307)        # AR 1.5, nothing on its border
+INKED = (200, 100, 500, 300)       # AR 1.5, border on the frame
+
+
+def _det(name, cost, confidence, rects, calls):
+    def run(page, ctx):
+        calls.append(name)
+        return list(rects)
+    return de.CropDetector(name, cost, confidence, run)
+
+
+def _cascade(specs, ctx=CTX, refine=False):
+    calls, trace = [], {}
+    dets = [_det(*spec, calls) for spec in specs]
+    best = de.run_crop_cascade(_page(), ctx, detectors=dets, trace=trace, refine=refine)
+    return best, calls, trace
+
+
+def test_runs_cheapest_first_and_exits_on_a_clean_confident_hit():
+    best, calls, trace = _cascade([('costly', 9.0, 0.9, [INKED]),
+                                   ('cheap', 1.0, 0.6, [CLEAN]),
+                                   ('middle', 5.0, 0.6, [CLEAN])])
+    assert calls == ['cheap'] and trace['ran'] == ['cheap'] and trace['hits'] == ['cheap']
+    assert best[1:] == (CLEAN, 'cheap')
+
+
+def test_low_confidence_hit_does_not_end_the_cascade():
+    best, calls, _ = _cascade([('catch_all', 1.0, 0.2, [CLEAN]),
+                               ('next', 2.0, 0.6, [CLEAN]),
+                               ('never', 3.0, 0.6, [CLEAN])])
+    assert calls == ['catch_all', 'next']
+    assert best[2] == 'catch_all'                  # equal scores: the earlier pick stays
+
+
+def test_inked_border_needs_a_trusted_detector_to_exit():
+    _, calls, _ = _cascade([('loose', 1.0, 0.6, [INKED]),
+                            ('frame', 2.0, 0.95, [INKED]),
+                            ('never', 3.0, 0.6, [CLEAN])])
+    assert calls == ['loose', 'frame']
+
+
+def test_wrong_aspect_ratio_is_no_hit():
+    best, calls, trace = _cascade([('wide', 1.0, 0.95, [(100, 100, 700, 200)]),
+                                   ('empty', 2.0, 0.95, []),
+                                   ('good', 3.0, 0.6, [CLEAN])])
+    assert calls == ['wide', 'empty', 'good']
+    assert trace['hits'] == ['good'] and best[2] == 'good'
+
+
+def test_without_expected_ar_every_detector_runs():
+    ctx = CTX._replace(expected_ar=None)
+    best, calls, _ = _cascade([('a', 1.0, 0.95, [INKED]), ('b', 2.0, 0.6, [CLEAN])], ctx=ctx)
+    assert calls == ['a', 'b']
+    assert best[2] == 'b'                          # the clean box scores lower
+
+
+def test_detector_stats_counts_runs_hits_wins_and_cached():
+    stats = de.DetectorStats()
+    for specs in ([('a', 1.0, 0.6, [CLEAN])],
+                  [('a', 1.0, 0.6, []), ('b', 2.0, 0.95, [INKED])],
+                  [('a', 1.0, 0.2, [CLEAN]), ('b', 2.0, 0.95, [(0, 0, 10, 100)])]):
+        best, _, trace = _cascade(specs)
+        trace['detector'] = best[2] if best else None
+        stats.add(trace)
+    stats.add({'detector': 'b', 'cached': True})
+    stats.add({'detector': 'b', 'cached': True})
+    stats.add({'detector': 'a', 'cached': True})
+
+    assert stats.parts == 3
+    assert stats.runs == {'a': 3, 'b': 2}
+    assert stats.hits == {'a': 2, 'b': 1}
+    assert stats.wins == {'a': 2, 'b': 1}
+    assert stats.cached == {'b': 2, 'a': 1}
+    lines = stats.report()
+    assert 'over 3 parts' in lines[0]
+    assert lines[-1].startswith('· 3 part(s) reused a cached crop (b 2, a 1)')
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_refine_stays_on_the_page_and_inside_its_window(seed):
+    rng = np.random.default_rng(seed)
+    img = np.full((300, 400), 255, np.uint8)
+    for _ in range(40):
+        x, y = int(rng.integers(0, 400)), int(rng.integers(0, 300))
+        cv2.rectangle(img, (x, y), (x + int(rng.integers(1, 40)), y + int(rng.integers(1, 40))),
+                      0, int(rng.choice([-1, 1, 2])))
+    page = de.PageAnalysis(img, scale=0.5)
+    H, W = page.shape
+    for _ in range(25):
+        x0, y0 = rng.integers(-20, 200), rng.integers(-20, 150)
+        rect = (int(x0), int(y0), int(x0 + rng.integers(30, 260)), int(y0 + rng.integers(30, 200)))
+        big = (float(rng.uniform(1, 3) * W), float(rng.uniform(1, 3) * H))   # pulls outwards
+        for target in (None, big):
+            radius = int(rng.choice([8, 24]))
+            out = de.refine_crop_rect(page, rect, target, radius=radius, passes=3)
+            start = np.clip(rect, 0, [W, H, W, H])
+            assert 0 <= out[0] < out[2] <= W and 0 <= out[1] < out[3] <= H
+            assert np.all(np.abs(np.asarray(out) - start) <= page.px(radius))
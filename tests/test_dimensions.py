@@ -0,0 +1,56 @@
+"""
+extract_dimensions must read the same (height, width) as the legacy parser
+(four re.search calls, kept in bench_dimensions.py) on title-block texts.
+"""
+import pytest
+
+import DecalExtract as de
+from bench_dimensions import legacy_parse, synthetic_corpus
+
+TEXTS = [
+    'PART NO. 12345GT\nDimensions (h x w): 3.25" x 10.5"\nSCALE 1:1',
+    'DIMENSIONS (H × W): 2.5” × 7”',
+    'dimensions(h x w):4x9',
+    'NOTES:\nOVER ALL LENGTH IS 14.75 INCHES\nCOLOR: BLACK',
+    'OVERALL LENGTH = 6 INCH',
+    'DECAL 83 mm x 254 mm',
+    '83MM X 254MM\nTOLERANCES: .XX ±.03',
+    'DECAL SIZE 1.5" x 4.25"',
+    'Dimensions (h x w): 2" x 5"\n50 mm x 120 mm',           # first pattern wins
+    'OVER ALL LENGTH IS 12 INCHES\n3" x 4"',
+    'MATERIAL: 3M 180mC VINYL, 0.004 THK\nDO NOT SCALE DRAWING',
+    '',
+]
+
+
+def _same(text):
+    h, w = legacy_parse(text)
+    got = de.extract_dimensions(text)
+    assert got.height_in == pytest.approx(h, abs=1e-9)
+    assert got.width_in == pytest.approx(w or 0.0, abs=1e-9)   # legacy None width is 0.0
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_matches_legacy_parser(text):
+    _same(text)
+
+
+def test_matches_legacy_parser_on_synthetic_corpus():
+    checked = 0
+    for text in synthetic_corpus(n=400, seed=11):
+        try:
+            legacy_parse(text)
+        except ValueError:           # the raw patterns choke on a bare "."
+            continue
+        _same(text)
+        checked += 1
+    assert checked > 300
+
+
+def test_skips_unparseable_occurrence():
+    text = 'Dimensions (h x w): . x 2"\n51 mm x 102 mm'
+    with pytest.raises(ValueError):
+        legacy_parse(text)
+    got = de.extract_dimensions(text)
+    assert got.units == 'mm'
+    assert (got.height_in, got.width_in) == pytest.approx((51 / 25.4, 102 / 25.4))
@@ -0,0 +1,63 @@
+"""
+helper.fetch_pdf_via_api keeps "no document" (None) apart from a failed
+fetch (raised), so --resume retries the failures.
+"""
+import pytest
+import requests
+
+import DecalExtract_helper as helper
+
+
+class FakeResponse:
+    def __init__(self, status, payload=None):
+        self.status_code = status
+        self.payload = payload if payload is not None else {}
+        self.raw = None
+        self.headers = {}
+        self.text = ""
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+
+class FakeSession:
+    def __init__(self, status, payload=None):
+        self.resp = FakeResponse(status, payload)
+
+    def post(self, *args, **kw):
+        return self.resp
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(helper, "API_KEY", "test-key")
+    monkeypatch.setattr(helper, "THROTTLE", helper.AdaptiveThrottle())
+    monkeypatch.setattr(helper, "get_pdf_cache", lambda: None)
+    monkeypatch.setattr(helper, "check_api_dns", lambda: True)
+
+    def serve(status, payload=None):
+        monkeypatch.setattr(helper, "get_session", lambda: FakeSession(status, payload))
+    return serve
+
+
+@pytest.mark.parametrize("status, payload", [(404, None), (200, {})])
+def test_no_document_is_none(api, status, payload):
+    api(status, payload)
+    assert helper.fetch_pdf_via_api("P1") is None
+
+
+def test_http_error_raises(api):
+    api(502)
+    with pytest.raises(requests.HTTPError):
+        helper.fetch_pdf_via_api("P1")
+
+
+def test_dns_failure_raises(api, monkeypatch):
+    api(200, {"url": "http://example.invalid/p1.pdf"})
+    monkeypatch.setattr(helper, "check_api_dns", lambda: False)
+    with pytest.raises(ConnectionError):
+        helper.fetch_pdf_via_api("P1")
@@ -0,0 +1,85 @@
+"""
+find_ink_clusters (sweep-line + union-find + grid) forms exactly the clusters
+the original absorb loop of find_grouped_union_of_ink_contours did.
+"""
+import numpy as np
+
+import DecalExtract as de
+
+
+def absorb_loop(boxes, prox):
+    """The original O(n²) loop, repeated from the largest unassigned box."""
+    order = sorted(range(len(boxes)), key=lambda i: boxes[i][0])   # stable, by x
+    left, clusters = set(range(len(boxes))), []
+    while left:
+        cands = [i for i in order if i in left]
+        seed = max(cands, key=lambda i: (boxes[i][2] * boxes[i][3], -cands.index(i)))
+        x, y, w, h = boxes[seed]
+        gx0, gy0, gx1, gy1 = x, y, x + w, y + h
+        used = {seed}
+        absorbed = True
+        while absorbed:
+            absorbed = False
+            for i in cands:
+                if i in used:
+                    continue
+                x, y, w, h = boxes[i]
+                if x + w < gx0:
+                    dist = gx0 - (x + w)
+                elif x > gx1:
+                    dist = x - gx1
+                else:
+                    dist = 0
+                if dist <= prox and not (y + h < gy0 or y > gy1):
+                    used.add(i)
+                    absorbed = True
+                    gx0, gy0 = min(gx0, x), min(gy0, y)
+                    gx1, gy1 = max(gx1, x + w), max(gy1, y + h)
+        left -= used
+        clusters.append(((gx0, gy0, gx1, gy1), sorted(used)))
+    return clusters
+
+
+def page_of(boxes):
+    """A PageAnalysis whose blobs are exactly `boxes` (x, y, w, h)."""
+    page = de.PageAnalysis(np.full((1, 1), 255, np.uint8))
+    b = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    page.__dict__.update(boxes=b, areas=(b[:, 2] * b[:, 3]).astype(np.float64),
+                         components=(None, np.zeros((len(b), 5), np.int32), None))
+    return page
+
+
+def random_boxes(rng, n, prox):
+    boxes = []
+    for _ in range(n):
+        kind = rng.integers(0, 3)
+        if kind == 0 or not boxes:                               # anywhere
+            boxes.append([int(rng.integers(0, 2000)), int(rng.integers(0, 1500)),
+                          int(rng.integers(1, 120)), int(rng.integers(1, 120))])
+        elif kind == 1:                                          # chained off the last box
+            x, y, w, h = boxes[-1]
+            boxes.append([x + w + int(rng.integers(-20, prox + 3)), y + int(rng.integers(-h, h + 1)),
+                          int(rng.integers(1, 80)), int(rng.integers(1, 80))])
+        else:                                                    # touching exactly at an edge
+            x, y, w, h = boxes[int(rng.integers(0, len(boxes)))]
+            boxes.append([x + w + prox, y + h, int(rng.integers(1, 60)), int(rng.integers(1, 60))])
+    return boxes
+
+
+def test_clusters_match_the_absorb_loop():
+    rng = np.random.default_rng(7)
+    prox = 50
+    for n in (1, 2, 5, 30, 150, 400):
+        for _ in range(10):
+            boxes = random_boxes(rng, n, prox)
+            got = de.find_ink_clusters(page_of(boxes), min_area=0, proximity_px=prox)
+            want = absorb_loop(boxes, prox)
+            assert [(c.rect, sorted(c.members.tolist())) for c in got] == want
+
+
+def test_grouped_union_takes_the_first_cluster():
+    rng = np.random.default_rng(8)
+    boxes = random_boxes(rng, 60, 50)
+    rect, _ = absorb_loop(boxes, 50)[0]
+    first = de.find_ink_clusters(page_of(boxes), min_area=0, proximity_px=50, limit=1)
+    assert len(first) == 1 and first[0].rect == rect
@@ -0,0 +1,92 @@
+"""
+Multi-decal sibling search on raster (scanned) sheets: a lone decal next to
+a title block and notes must stay a single crop; framed decals of the same
+size are all found.
+"""
+import cv2
+import fitz
+import numpy as np
+
+import DecalExtract as de
+
+PX_PER_IN = 100
+SHEET_IN  = (11.0, 8.5)
+DECAL_IN  = (3.0, 1.8)   # w, h
+
+
+def _px(v):
+    return int(round(v * PX_PER_IN))
+
+
+def _draw_decal(img, x_in, y_in, label):
+    x0, y0 = _px(x_in), _px(y_in)
+    x1, y1 = x0 + _px(DECAL_IN[0]), y0 + _px(DECAL_IN[1])
+    cv2.rectangle(img, (x0, y0), (x1, y1), 0, 3)
+    cv2.putText(img, label, (x0 + 25, y0 + 70), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 3)
+    cv2.putText(img, "KEEP CLEAR", (x0 + 25, y0 + 120), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+
+
+def _draw_title_block(img):
+    x0, y0, x1, y1 = _px(7.6), _px(6.7), _px(10.2), _px(7.9)
+    cv2.rectangle(img, (x0, y0), (x1, y1), 0, 2)
+    for k in range(1, 4):                              # rows
+        y = y0 + k * (y1 - y0) // 4
+        cv2.line(img, (x0, y), (x1, y), 0, 1)
+    cv2.line(img, (x0 + (x1 - x0) // 3, y0), (x0 + (x1 - x0) // 3, y1), 0, 1)
+    for k, text in enumerate(("PART NO. 12345GT", "MATERIAL: VINYL", "SCALE 1:1", "SHEET 1 OF 1")):
+        cv2.putText(img, text, (x0 + (x1 - x0) // 3 + 10, y0 + 25 + k * 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, 0, 1)
+
+
+def _draw_notes(img):
+    for k, text in enumerate(("NOTES:", "1. APPLY TO CLEAN DRY SURFACE",
+                              "2. DO NOT SCALE DRAWING", "3. COLOR: BLACK ON WHITE")):
+        cv2.putText(img, text, (_px(0.5), _px(6.8) + k * 35), cv2.FONT_HERSHEY_SIMPLEX, 0.7, 0, 2)
+
+
+def _raster_pdf(img):
+    """One page holding `img` as a scanned image, plus the dims in its text layer."""
+    ok, png = cv2.imencode(".png", img)
+    assert ok
+    doc = fitz.open()
+    page = doc.new_page(width=SHEET_IN[0] * 72, height=SHEET_IN[1] * 72)
+    page.insert_image(page.rect, stream=png.tobytes())
+    page.insert_text((40, 30), f'Dimensions (h x w): {DECAL_IN[1]}" x {DECAL_IN[0]}"',
+                     fontsize=8, render_mode=3)   # invisible, like an OCR layer
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _sheet():
+    return np.full((_px(SHEET_IN[1]), _px(SHEET_IN[0])), 255, np.uint8)
+
+
+def _crop_all(pdf):
+    trace = {}
+    crops, h_in, w_in = de.crop_all_decals_from_pdf(pdf, [], trace=trace)
+    assert (h_in, w_in) == (DECAL_IN[1], DECAL_IN[0])
+    return crops, trace
+
+
+def test_lone_decal_with_title_block_has_no_siblings():
+    img = _sheet()
+    _draw_decal(img, 1.0, 1.0, "DANGER")
+    _draw_title_block(img)
+    _draw_notes(img)
+
+    crops, trace = _crop_all(_raster_pdf(img))
+    assert trace['detector'] == 'bracket'
+    assert len(crops) == trace['crops'] == 1
+
+
+def test_same_size_framed_decals_are_siblings():
+    img = _sheet()
+    for k, label in enumerate(("LEFT", "RIGHT", "RED")):
+        _draw_decal(img, 0.5 + k * 3.3, 1.0, label)
+    _draw_title_block(img)
+    _draw_notes(img)
+
+    crops, trace = _crop_all(_raster_pdf(img))
+    assert trace['detector'] == 'bracket'
+    assert len(crops) == trace['crops'] == 3
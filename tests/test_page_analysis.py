@@ -0,0 +1,76 @@
+"""
+PageAnalysis blob areas are contourArea of the outer outlines, as before the
+connected-components rewrite, so the "largest blob" the detectors start from
+does not change.
+"""
+import cv2
+import numpy as np
+
+import DecalExtract as de
+
+
+def _page():
+    """A solid 50×50 square beside a long 2px stroke with more ink pixels."""
+    img = np.full((800, 800), 255, np.uint8)
+    cv2.rectangle(img, (100, 100), (149, 149), 0, -1)         # 2500 px, contourArea 2401
+    cv2.line(img, (100, 300), (750, 300), 0, 2)                # ~1300 px each arm, but a
+    cv2.line(img, (750, 300), (750, 780), 0, 2)                # near-zero enclosed area
+    return img
+
+
+def test_areas_are_contour_areas():
+    img = _page()
+    cv2.rectangle(img, (300, 400), (500, 600), 0, 3)           # hollow frame …
+    cv2.circle(img, (400, 500), 20, 0, -1)                      # … with a mark inside
+    cv2.rectangle(img, (0, 700), (40, 799), 0, -1)              # touching the page edge
+    page = de.PageAnalysis(img)
+    cnts, _ = cv2.findContours(page.thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    assert page.n_blobs == len(cnts) == 4
+    assert sorted(page.areas) == sorted(cv2.contourArea(c) for c in cnts)
+    assert sorted(page.blob_perimeters(range(4))) == sorted(cv2.arcLength(c, True) for c in cnts)
+
+
+def test_counted_areas_match_contour_area_on_random_pages():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        img = np.full((300, 400), 255, np.uint8)
+        for _ in range(60):
+            x, y = int(rng.integers(0, 400)), int(rng.integers(0, 300))
+            kind = rng.integers(0, 3)
+            if kind == 0:
+                cv2.rectangle(img, (x, y), (x + int(rng.integers(0, 50)), y + int(rng.integers(0, 50))),
+                              0, int(rng.choice([-1, 1, 2])))
+            elif kind == 1:
+                cv2.line(img, (x, y), (int(rng.integers(0, 400)), int(rng.integers(0, 300))), 0, 1)
+            else:
+                cv2.circle(img, (x, y), int(rng.integers(1, 25)), 0, int(rng.choice([-1, 1])))
+        img[rng.random(img.shape) < 0.02] = 0                   # specks and pinch points
+        page = de.PageAnalysis(img)
+        areas = page.areas.tolist()
+        assert '_contours' not in page.__dict__                 # counted, not traced
+        assert areas == [cv2.contourArea(page.blob_contour(i)) for i in range(page.n_blobs)]
+
+
+def test_main_blob_is_the_largest_contour_area():
+    img = _page()
+    page = de.PageAnalysis(img)
+    stroke = int(np.argmax(page.components[1][:, cv2.CC_STAT_AREA]))
+    assert page.boxes[stroke].tolist()[2] > 600                # more pixels in the stroke …
+    assert de.crop_blob_bbox(img) == (100, 100, 150, 150)      # … the square is still the main blob
+
+
+def test_score_border_ink_matches_slice_sums():
+    rng = np.random.default_rng(0)
+    img = np.where(rng.random((300, 400)) < 0.3, 0, 255).astype(np.uint8)
+    page = de.PageAnalysis(img)
+    ink = page.ink.astype(np.int64)
+    rects = [(0, 0, 400, 300), (10, 20, 200, 150), (395, 290, 400, 300)]
+    edge = 5
+
+    def strips(x0, y0, x1, y1):
+        return (ink[y0:y0 + edge, x0:x1].sum() + ink[y1 - edge:y1, x0:x1].sum() +
+                ink[y0:y1, x0:x0 + edge].sum() + ink[y0:y1, x1 - edge:x1].sum())
+
+    got = de.score_border_ink(page.ink_integral, rects, edge)
+    assert got.dtype == np.int64
+    assert got.tolist() == [strips(*r) for r in rects]
@@ -0,0 +1,49 @@
+"""
+iter_parts reads the first two columns of an .xlsx, .csv or plain-text parts
+list, skips the header and blank rows, and drops repeated part numbers.
+"""
+import DecalExtract as de
+
+
+def _parts(path):
+    return list(de.iter_parts(str(path)))
+
+
+def test_xlsx(tmp_path):
+    import openpyxl
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in (('Part', 'TMS', 'Note'), ('A-1', 'T1', 'x'), (None, None),
+                (1002, 7, None), ('A-1', 'T9', None)):
+        ws.append(row)
+    path = tmp_path / 'parts.xlsx'
+    wb.save(path)
+    assert _parts(path) == [('A-1', 'T1'), ('1002', '7')]
+
+
+def test_csv(tmp_path):
+    path = tmp_path / 'parts.csv'
+    path.write_text('﻿PART,TMS\nA-1,T1\n,\nB-2\nA-1,T2\n', encoding='utf-8')
+    assert _parts(path) == [('A-1', 'T1'), ('B-2', '')]
+
+
+def test_txt_formats(tmp_path):
+    path = tmp_path / 'parts.txt'
+    path.write_text('# parts for run 3\nA-1\tT1\nB-2, T2\nC-3 T3\nD-4\n',
+                    encoding='utf-8')
+    assert _parts(path) == [('A-1', 'T1'), ('B-2', 'T2'), ('C-3', 'T3'), ('D-4', '')]
+
+
+def test_txt_header_is_matched_not_positional(tmp_path):
+    path = tmp_path / 'parts.txt'
+    path.write_text('\n﻿\npart\ttms\nA-1\tT1\n﻿PART TMS\nB-2\n',
+                    encoding='utf-8')
+    assert _parts(path) == [('A-1', 'T1'), ('B-2', '')]
+
+
+def test_duplicates_are_reported_once(tmp_path, capsys):
+    path = tmp_path / 'parts.txt'
+    path.write_text('A-1\tT1\nA-1\tT2\nA-1\tT3\nB-2\n', encoding='utf-8')
+    assert _parts(path) == [('A-1', 'T1'), ('B-2', '')]
+    out = capsys.readouterr().out
+    assert out.count('Duplicate part A-1') == 2
@@ -0,0 +1,62 @@
+"""
+helper.PdfCache evicts when it is opened and when a put() takes the blobs
+past max_bytes, not after every put; sweep_orphans also clears the .tmp
+files a crashed put() leaves once they outlive the TTL.
+"""
+import hashlib
+import os
+
+import DecalExtract_helper as helper
+
+
+def _put(cache, part, data):
+    sha = hashlib.sha256(data).hexdigest()
+    cache.put(part, data, sha)
+    return sha
+
+
+def test_evicts_only_past_max_bytes(monkeypatch, tmp_path):
+    cache = helper.PdfCache(root=str(tmp_path), max_bytes=350)
+    calls = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: (calls.append(1), evict()))
+
+    shas = [_put(cache, f"P{k}", bytes([k]) * 100) for k in range(3)]
+    _put(cache, "P0", bytes([0]) * 100)                      # same blob again: no growth
+    assert calls == []
+
+    _put(cache, "P3", bytes([3]) * 100)                      # 400 > 350: the LRU blob goes
+    assert calls == [1]
+    assert cache.lookup("P1") is None
+    assert not os.path.exists(cache.blob_path(shas[1]))
+    assert cache._bytes == 300
+
+
+def test_new_revision_drops_the_old_blob(tmp_path):
+    cache = helper.PdfCache(root=str(tmp_path))
+    old = _put(cache, "P1", b"%PDF-rev1")
+    _put(cache, "P2", b"%PDF-shared")
+    new = _put(cache, "P1", b"%PDF-rev2")
+    assert not os.path.exists(cache.blob_path(old))
+    assert cache._bytes == len(b"%PDF-rev2") + len(b"%PDF-shared")
+
+    _put(cache, "P1", b"%PDF-shared")                        # now shared with P2
+    assert not os.path.exists(cache.blob_path(new))
+    assert cache._bytes == len(b"%PDF-shared")
+
+
+def test_sweep_removes_stale_tmp_files(tmp_path):
+    cache = helper.PdfCache(root=str(tmp_path), ttl=3600)
+    sha = _put(cache, "P1", b"%PDF-kept")
+    blob = cache.blob_path(sha)
+    stale, fresh = f"{blob}.1.tmp", f"{blob}.2.tmp"          # as a crashed put() leaves them
+    for path in (stale, fresh):
+        with open(path, "wb") as f:
+            f.write(b"%PDF-partial")
+    old = os.path.getmtime(fresh) - 2 * 3600
+    os.utime(stale, (old, old))
+
+    cache.sweep_orphans()
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)                             # may be a write in flight
+    assert os.path.exists(blob)
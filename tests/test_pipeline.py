@@ -0,0 +1,61 @@
+"""
+run_part_pipeline: a 403 re-fetches the part with the new key instead of
+failing it, and an error reading the parts list reaches the consumer.
+"""
+import threading
+
+import pytest
+
+import DecalExtract as de
+import DecalExtract_helper as helper
+
+
+@pytest.fixture
+def api_key(monkeypatch, tmp_path):
+    prompts = []
+
+    def fake_prompt():
+        prompts.append(threading.current_thread().name)
+        helper.API_KEY = "new"
+        return helper.API_KEY
+
+    monkeypatch.setattr(helper, "KEY_FILE", str(tmp_path / "key.json"))
+    monkeypatch.setattr(helper, "API_KEY", "old")
+    monkeypatch.setattr(helper, "get_valid_api_key", fake_prompt)
+    return prompts
+
+
+def test_rejected_parts_are_fetched_again_with_the_new_key(monkeypatch, api_key):
+    fetched = []
+    all_in = threading.Barrier(3)
+
+    def fake_fetch(part, pdf_dir):
+        key = helper.API_KEY
+        fetched.append((part, key))
+        if key == "old":
+            all_in.wait(timeout=5)           # all three are in flight with the old key
+            raise helper.ApiKeyRejected(part, key)
+        return None                          # "no document": nothing to render
+
+    monkeypatch.setattr(de, "fetch_pdf_via_api", fake_fetch)
+    parts = [("P1", "T"), ("P2", "T"), ("P3", "T")]
+    out = list(de.run_part_pipeline(parts, None, None, [], fetch_workers=3, max_pending=3))
+
+    assert sorted(part for _, part, *_ in out) == ["P1", "P2", "P3"]
+    assert all(err is None for *_, err in out)                  # none reported as failed
+    assert len(api_key) == 1                                    # one prompt for the old key
+    assert sorted(p for p, k in fetched if k == "new") == ["P1", "P2", "P3"]
+
+
+def test_parts_list_error_is_raised_after_the_parts_in_flight(monkeypatch):
+    monkeypatch.setattr(de, "fetch_pdf_via_api", lambda part, pdf_dir: None)
+
+    def parts():
+        yield "P1", "T"
+        raise ValueError("corrupt sheet")
+
+    seen = []
+    with pytest.raises(ValueError, match="corrupt sheet"):
+        for item in de.run_part_pipeline(parts(), None, None, []):
+            seen.append(item[1])
+    assert seen == ["P1"]
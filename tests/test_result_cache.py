@@ -0,0 +1,86 @@
+"""
+crop_code_version() changes with every module constant that shapes a cached
+crop, including the dimension patterns and the pyramid settings, and hashes
+the source of every function on the crop path.
+"""
+import re
+
+import pytest
+
+import DecalExtract as de
+
+
+@pytest.mark.parametrize("name", ["MIN_PYRAMID_TPL", "REFINE_MARGIN", "COARSE_PEAKS"])
+def test_pyramid_settings_change_the_version(monkeypatch, name):
+    before = de.crop_code_version()
+    monkeypatch.setattr(de, name, getattr(de, name) + 1)
+    assert de.crop_code_version() != before
+
+
+@pytest.mark.parametrize("field, value", [
+    (1, re.compile(r'([\d.]+)\s*cm\s*x\s*([\d.]+)\s*cm')),           # pattern text
+    (1, None),                                                       # flags (set below)
+    (2, 'mm'),                                                       # units
+    (3, 0.25),                                                       # confidence
+])
+def test_dimension_patterns_change_the_version(monkeypatch, field, value):
+    before = de.crop_code_version()
+    first = list(de.DIMENSION_PATTERNS[0])
+    if value is None:
+        value = re.compile(first[1].pattern, first[1].flags & ~re.IGNORECASE)
+    first[field] = value
+    monkeypatch.setattr(de, "DIMENSION_PATTERNS", (tuple(first),) + de.DIMENSION_PATTERNS[1:])
+    assert de.crop_code_version() != before
+
+
+def test_code_version_covers_the_crop_call_graph():
+    names = de.crop_code_names()
+    assert "select_best_crop_box" in names                      # via _detect_templates
+    assert {d.run.__name__ for d in de.CROP_DETECTORS} <= set(names)
+    assert not {"main", "process_part_pdf", "run_part_pipeline", "ResultCache"} & set(names)
+
+
+def test_constants_on_the_crop_path_are_cache_params():
+    import ast
+    import inspect
+    refs = set()
+    for name in de.crop_code_names():
+        refs |= de._global_refs(ast.parse(inspect.getsource(getattr(de, name))).body[0])
+    # hashed separately (patterns, cascade), derived (NO_DIMENSIONS), a memory
+    # batch size (SWEEP_PAIR_CHUNK) or a run-time memo (_SCALED_TEMPLATE_SETS)
+    handled = {"CROP_DETECTORS", "DIMENSION_PATTERNS", "NO_DIMENSIONS",
+               "SWEEP_PAIR_CHUNK", "_SCALED_TEMPLATE_SETS"}
+    consts = {r for r in refs if r.lstrip("_").isupper() and hasattr(de, r)}
+    assert consts - handled <= set(de.RESULT_CACHE_PARAMS)
+
+
+def test_locked_cache_read_is_a_miss(monkeypatch):
+    import sqlite3
+
+    class LockedCache:
+        put_calls = []
+
+        def get(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+        def put(self, *args):
+            self.put_calls.append(args)
+
+    monkeypatch.setattr(de, "get_result_cache", lambda: LockedCache())
+    monkeypatch.setattr(de, "crop_decal_from_pdf",
+                        lambda pdf, sets, dbg_dir, dbg_name, trace: ("crop", 2.0, 3.0))
+    crops, h_in, w_in, trace = de.process_part_pdf(b"%PDF-1", "P1", None)
+    assert (crops, h_in, w_in) == (["crop"], 2.0, 3.0)       # computed, not failed
+    assert len(LockedCache.put_calls) == 1
+
+
+def test_missing_source_disables_the_cache(monkeypatch):
+    def no_source():
+        raise OSError("could not get source code")
+
+    monkeypatch.setattr(de, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(de, "_result_cache", None)
+    monkeypatch.setattr(de, "crop_code_version", no_source)
+    monkeypatch.setattr(de, "ResultCache", lambda: pytest.fail("opened without a code version"))
+    assert de.get_result_cache() is None
+    assert de._result_cache is False                            # decided once per process
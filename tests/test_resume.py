@@ -0,0 +1,59 @@
+"""
+main(resume_dir=...) replays journal.jsonl: a line torn by a crash is
+ignored, parts marked 'ok'/'missing' are not fed to the pipeline again, and
+cubiscan.csv is rebuilt from the journal before the remaining parts run.
+"""
+import csv
+import json
+
+import DecalExtract as de
+
+
+def _record(part, updated='Y'):
+    return {'ITEM_ID': part, 'NET_LENGTH': 1.0, 'NET_WIDTH': 2.0,
+            'IMAGE_FILE_NAME': f'T.{part}.105.jpg' if updated == 'Y' else '',
+            'UPDATED': updated}
+
+
+def test_resume_skips_finished_parts_and_rebuilds_csv(monkeypatch, tmp_path):
+    out_dir = tmp_path / 'decal_output_01012026'
+    out_dir.mkdir()
+    sheet = tmp_path / 'parts.txt'
+    sheet.write_text('A\tT\nB\tT\nC\tT\nD\tT\nE\tT\n', encoding='utf-8')
+
+    journal = de.RunJournal(str(out_dir))
+    journal.write_meta(input_sheet=str(sheet), seq=105, time_stamp='20260101_000000',
+                       multi=True, layers=False)
+    journal.append('A', 'T', 'ok', _record('A'))
+    journal.append('B', 'T', 'missing', _record('B', 'N'))
+    journal.append('C', 'T', 'failed', _record('C', 'N'), error='RuntimeError: boom')
+    journal.append('D', 'T', 'ok', [_record('D.1'), _record('D.2')])
+    journal.close()
+    with open(journal.journal_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'part': 'E', 'tms': 'T', 'status': 'ok',
+                            'record': _record('E')})[:25])      # crash mid-write
+
+    fed = []
+
+    def fake_pipeline(parts, tmp_dir, dbg_dir, template_sets, multi=False):
+        for i, (part, tms) in enumerate(parts, 1):
+            fed.append(part)
+            yield i, part, tms, None, None, None                # "no document"
+
+    monkeypatch.setattr(de, 'get_valid_api_key', lambda: 'key')
+    monkeypatch.setattr(de.helper, 'configure_session', lambda **kw: None)
+    monkeypatch.setattr(de, 'load_template_sets', lambda folder: [])
+    monkeypatch.setattr(de, 'run_part_pipeline', fake_pipeline)
+
+    de.main(None, None, resume_dir=str(out_dir))
+
+    assert fed == ['C', 'E']          # failed is retried, torn E never finished
+    with open(out_dir / 'cubiscan' / 'cubiscan.csv', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [r['ITEM_ID'] for r in rows] == ['A', 'B', 'D.1', 'D.2', 'C', 'E']
+    assert rows[0]['IMAGE_FILE_NAME'] == 'T.A.105.jpg'
+    assert {r['UPDATED'] for r in rows[4:]} == {'N'}
+
+    statuses = [(e['part'], e['status']) for e in de.RunJournal(str(out_dir)).entries()]
+    assert statuses[-2:] == [('C', 'missing'), ('E', 'missing')]
+    assert ('E', 'ok') not in statuses
@@ -0,0 +1,48 @@
+"""
+The compiled template bank serves the DETECT_DPI sets the detectors match
+with straight from the memory map, identical to resizing the DPI maps.
+"""
+import pickle
+
+import cv2
+import numpy as np
+
+import DecalExtract as de
+
+
+def _write_sets(root, n=2):
+    for k in range(1, n + 1):
+        folder = root / f"set{k}"
+        folder.mkdir(parents=True)
+        for quad in de.TEMPLATE_QUADS:
+            img = np.full((60 + 7 * k, 50 + 5 * k), 255, np.uint8)
+            cv2.line(img, (5, 5), (5, 40), 0, 2)
+            cv2.line(img, (5, 5), (40, 5), 0, 2)
+            cv2.imwrite(str(folder / f"{quad}.png"), img)
+
+
+def test_detect_scale_sets_come_from_the_bank(tmp_path):
+    _write_sets(tmp_path)
+    bank = de.load_template_sets(str(tmp_path))
+    scale = de.DETECT_DPI / de.DPI
+    mapped = de.scale_template_sets(bank, scale)
+    resized = de.scale_template_sets(list(bank), scale)          # the in-memory path
+
+    assert mapped is bank.scaled[de._scale_key(scale)]
+    for m, r in zip(mapped, resized):
+        for quad in de.TEMPLATE_QUADS:
+            assert isinstance(m.templates[quad], np.memmap)
+            assert np.array_equal(m.templates[quad], r.templates[quad])
+            assert m.offsets[quad] == r.offsets[quad]
+            assert all(np.array_equal(a, b) for a, b in zip(m.pyramids[quad], r.pyramids[quad]))
+
+    # a render worker re-maps the scaled sets too
+    assert de._scale_key(scale) in pickle.loads(pickle.dumps(bank)).scaled
+
+
+def test_bank_is_rebuilt_when_the_scales_change(tmp_path, monkeypatch):
+    _write_sets(tmp_path, n=1)
+    de.load_template_sets(str(tmp_path))
+    monkeypatch.setattr(de, "TEMPLATE_BANK_SCALES", (0.5,))
+    bank = de.load_template_sets(str(tmp_path))
+    assert set(bank.scaled) == {"0.5"}
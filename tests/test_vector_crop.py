@@ -0,0 +1,33 @@
+"""
+detect_vector_crop: a vector rectangle with the decal's aspect ratio but not
+its parsed size is not taken; the raster detectors get the page instead.
+"""
+import fitz
+
+import DecalExtract as de
+
+
+def _pdf(rect_pt):
+    doc = fitz.open()
+    page = doc.new_page(width=792, height=612)
+    page.draw_rect(fitz.Rect(*rect_pt), color=(0, 0, 0), width=1)
+    page.insert_text((40, 580), 'Dimensions (h x w): 1.5" x 2.5"', fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _vector_crop(rect_pt):
+    with de.DecalDocument(_pdf(rect_pt), dpi=de.DETECT_DPI) as doc:
+        dims = de.parse_dimensions_from_pdf(doc)
+        return de.detect_vector_crop(doc, dims.width_in / dims.height_in,
+                                     (dims.width_in * 72, dims.height_in * 72))
+
+
+def test_rect_at_the_parsed_size_is_the_crop():
+    x0, y0, x1, y1 = _vector_crop((100, 100, 280, 208))       # 2.5" × 1.5" at 72 pt/in
+    assert abs((x1 - x0) - 181) < 1 and abs((y1 - y0) - 109) < 1
+
+
+def test_same_shape_wrong_size_falls_back_to_raster():
+    assert _vector_crop((100, 100, 460, 316)) is None         # same AR, twice the size
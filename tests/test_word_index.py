@@ -0,0 +1,89 @@
+"""
+WordIndex answers band / nearest_above / first by bisecting; each must agree
+with a brute-force filter over page.get_text("words"), including words that
+sit exactly on the query edges.
+"""
+import random
+
+import fitz
+import pytest
+
+import DecalExtract as de
+
+VOCAB = ["red", "Blue", "GREEN", "black", "12mm", "note", "title", "30.5mm"]
+
+
+@pytest.fixture(scope="module")
+def doc():
+    rng = random.Random(7)
+    pdf = fitz.open()
+    page = pdf.new_page(width=612, height=792)
+    for row in range(40):
+        y = 40 + row * 18 + (0 if row % 5 else 0.5)
+        x = 30
+        while x < 540:
+            word = rng.choice(VOCAB)
+            page.insert_text((x, y), word, fontsize=rng.choice((8, 10, 12)))
+            x += rng.randint(50, 90)
+    d = de.DecalDocument(pdf.tobytes())
+    pdf.close()
+    yield d
+    d.close()
+
+
+def _brute(doc):
+    words = [{"text": w[4], "x0": w[0], "top": w[1], "x1": w[2], "bottom": w[3]}
+             for w in doc.page.get_text("words")]
+    return sorted(words, key=lambda w: (w["top"], w["x0"]))
+
+
+def _edges(values, rng, n=60):
+    values = sorted(set(values))
+    picks = [rng.choice(values) for _ in range(n)]     # exactly on a word edge
+    picks += [rng.uniform(0, 800) for _ in range(n)]
+    return picks + [min(values), max(values), -1.0, 1e6]
+
+
+def test_band_matches_brute_force(doc):
+    rng = random.Random(1)
+    words = _brute(doc)
+    index = doc.word_index
+    edges = _edges([w["top"] for w in words], rng)
+    for _ in range(300):
+        y0, y1 = sorted((rng.choice(edges), rng.choice(edges)))
+        assert index.band(y0, y1) == [w for w in words if y0 <= w["top"] < y1]
+    top = words[0]["top"]
+    assert index.band(top, top) == []                   # [y0, y1) is half-open
+    assert words[0] in index.band(top, top + 1e-9)
+
+
+def test_nearest_above_matches_brute_force(doc):
+    rng = random.Random(2)
+    words = _brute(doc)
+    index = doc.word_index
+    keysets = [("red",), ("blue", "green"), ("BLACK", "red", "note"), ("missing",)]
+    for keys in keysets:
+        wanted = {k.lower() for k in keys}
+        for y in _edges([w["bottom"] for w in words], rng) + [None]:
+            hits = [w for w in words if w["text"].strip().lower() in wanted
+                    and (y is None or w["bottom"] <= y)]
+            best = max(hits, key=lambda w: (w["bottom"], -w["top"], -w["x0"]), default=None)
+            assert index.nearest_above(keys, y) == best
+    for text in VOCAB:
+        got = index.lookup(text)
+        assert sorted(got, key=lambda w: (w["top"], w["x0"])) == \
+            [w for w in words if w["text"].strip().lower() == text.lower()]
+        assert [w["bottom"] for w in got] == sorted(w["bottom"] for w in got)
+
+
+def test_first_matches_brute_force(doc):
+    rng = random.Random(3)
+    words = _brute(doc)
+    index = doc.word_index
+
+    def is_mm(t):
+        return t.lower().endswith("mm")
+
+    for y0 in _edges([w["top"] for w in words], rng):
+        hit = next((w for w in words if w["top"] >= y0 and is_mm(w["text"])), None)
+        assert index.first(is_mm, y0) == hit